@@ -0,0 +1,64 @@
+"""
+ASGI entry point serving /api/chat asynchronously.
+
+Streaming chat turns run on the event loop with the chain's astream, so one
+process can hold many concurrent SSE streams without tying up a thread per
+visitor. Every other route is served by the Flask app in main.py.
+
+Run with:
+    uvicorn asgi:app --host 0.0.0.0 --port 5000
+"""
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Mount, Route
+from a2wsgi import WSGIMiddleware
+from handlers.response_handler import aget_response, astream_response
+from helpers.sse_helper import asse_stream
+from helpers.feedback_queue import shutdown_feedback_queue
+from services.llm_model import shutdown_llm_clients
+from main import app as flask_app, warm_up
+import uuid
+import json
+
+CORS_HEADERS = {
+    'Access-Control-Allow-Origin': '*',
+    'Access-Control-Allow-Methods': 'POST, OPTIONS',
+    'Access-Control-Allow-Headers': 'Content-Type',
+    'Access-Control-Expose-Headers': 'X-Session-Id',
+}
+
+async def chat(request: Request):
+    """Async counterpart of main.chat with the same request/response contract."""
+    if request.method == 'OPTIONS':
+        return Response(status_code=204, headers=CORS_HEADERS)
+
+    try:
+        data = await request.json()
+    except json.JSONDecodeError:
+        data = None
+    data = data or {}
+    user_input = data.get('message')
+    session_id = data.get('session_id') or str(uuid.uuid4())
+    stream = data.get('stream', False)
+    messages = data.get('messages', [])
+
+    if not user_input:
+        return JSONResponse({"error": "No message provided"}, status_code=400, headers=CORS_HEADERS)
+
+    if stream:
+        chunks = astream_response(user_input, session_id=session_id, messages=messages)
+
+        return StreamingResponse(asse_stream(chunks), media_type='text/event-stream', headers={
+            **CORS_HEADERS,
+            'Cache-Control': 'no-cache',
+            'X-Session-Id': session_id
+        })
+
+    response = await aget_response(user_input, session_id=session_id, messages=messages)
+    return JSONResponse({"response": response, "session_id": session_id}, headers=CORS_HEADERS)
+
+app = Starlette(routes=[
+    Route('/api/chat', chat, methods=['POST', 'OPTIONS']),
+    Mount('/', app=WSGIMiddleware(flask_app)),
+], on_startup=[warm_up], on_shutdown=[shutdown_feedback_queue, shutdown_llm_clients])
@@ -0,0 +1,72 @@
+"""
+Benchmark museum data lookups: the previous linear scans over
+get_all_museum_data() against the catalog's precomputed indexes. The tour
+schedule is timed through JSON encoding, as the endpoint serves it.
+
+    python -m benchmarks.bench_catalog [iterations]
+"""
+import json
+import sys
+import time
+
+from helpers.museum_data import get_all_museum_data
+from helpers.museum_catalog import get_catalog, json_default
+
+ITERATIONS = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+DAY = "Saturday"
+
+def tours_scan():
+    museum_data = get_all_museum_data()
+    available_guides = []
+    for guide in museum_data['tour_guides']:
+        if DAY in guide['availability']:
+            available_guides.append({
+                'id': guide['id'],
+                'name': guide['name'],
+                'specialties': guide['specialties'],
+                'languages': guide['languages'],
+                'availability': guide['availability'][DAY],
+                'rating': guide['rating']
+            })
+    return json.dumps(available_guides)
+
+def tours_catalog():
+    return json.dumps(get_catalog().guide_schedule(DAY), default=json_default)
+
+def language_scan():
+    return [guide for guide in get_all_museum_data()['tour_guides'] if "French" in guide['languages']]
+
+def language_catalog():
+    return get_catalog().guides_speaking("French")
+
+def price_scan():
+    for ticket in get_all_museum_data()['ticket_prices']:
+        if ticket['type'] == "Group":
+            return ticket['price']
+
+def price_catalog():
+    return get_catalog().ticket_price("Group")
+
+def us_per_call(function):
+    start = time.perf_counter()
+    for _ in range(ITERATIONS):
+        function()
+    return (time.perf_counter() - start) / ITERATIONS * 1e6
+
+def main():
+    """Time each lookup both ways."""
+    start = time.perf_counter()
+    get_catalog()
+    assert tours_scan() == tours_catalog()
+    print("=== Museum Catalog Benchmark ===")
+    print(f"catalog build: {(time.perf_counter() - start) * 1000:.2f} ms, version {get_catalog().version}")
+    print()
+    for name, scan, indexed in [
+        ("tour schedule", tours_scan, tours_catalog),
+        ("guides by language", language_scan, language_catalog),
+        ("ticket price", price_scan, price_catalog),
+    ]:
+        print(f"{name:<20} scan {us_per_call(scan):6.2f} us   catalog {us_per_call(indexed):6.2f} us")
+
+if __name__ == "__main__":
+    main()
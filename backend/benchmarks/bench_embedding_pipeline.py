@@ -0,0 +1,89 @@
+"""
+Benchmark index-build throughput against a local stub embedding server:
+one request for the whole corpus (the previous add_texts path) versus the
+batched, parallel pipeline, with flaky requests, a build into the NumPy
+index on disk, and a crash halfway through a build followed by a resumed
+run.
+
+The server answers Ollama's /api/embed with a fixed cost per request and
+per document and processes four requests at a time. The corpus is the
+museum data plus synthetic exhibits standing in for the full collection:
+    python -m benchmarks.bench_embedding_pipeline [exhibits]
+"""
+import copy
+import os
+import sys
+import tempfile
+
+from helpers import museum_data
+from helpers.embedding_pipeline import EmbeddingPipeline
+from helpers.indexer import museum_documents, reindex
+from helpers.museum_catalog import MuseumCatalog
+from helpers.numpy_vectorstore import NumpyVectorStore
+from benchmarks.fakes import FakeEmbeddingServer, HttpEmbeddings, MemoryVectorStore
+
+EXHIBITS = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+
+def collection_catalog():
+    """The museum data with EXHIBITS synthetic exhibits added."""
+    data = copy.deepcopy(museum_data.get_all_museum_data())
+    for i in range(EXHIBITS):
+        data['exhibits'].append({
+            "id": f"col-{i:06d}",
+            "name": f"Collection object {i}",
+            "description": f"Object {i} from the permanent collection, catalogued with its provenance and condition notes.",
+            "location": f"Storage wing {i % 12}",
+            "duration": "5 minutes",
+            "highlights": [f"Inventory number {i}", f"Acquired in {1900 + i % 120}"],
+        })
+    return MuseumCatalog(data)
+
+def run(label, pipeline, catalog, store=None, **server_options):
+    server = FakeEmbeddingServer(**server_options).start()
+    # Each run gets a fresh server; a resumed build keeps its store
+    store = store if store is not None else MemoryVectorStore(None)
+    store.embedding_function = HttpEmbeddings(server.base_url)
+    try:
+        result = reindex(store, catalog, pipeline=pipeline)
+        stats = result["embedding"]
+        summary = f"{stats['docs_per_sec']:8.0f} docs/sec   {stats['seconds']:6.2f} s   {stats['retries']:3d} retries"
+        if stats['resumed']:
+            summary += f"   {stats['resumed']} resumed from the checkpoint"
+    except Exception:
+        summary = f"failed after {len(pipeline.checkpoint_for(store).load())} documents were checkpointed"
+    finally:
+        server.stop()
+    print(f"{label:<38} {summary}   {server.requests:5d} requests, peak {server.peak} at the server")
+    return store
+
+def main():
+    """Build the index under each configuration and print its throughput."""
+    with tempfile.TemporaryDirectory() as root:
+        benchmark(root)
+
+def benchmark(root):
+    catalog = collection_catalog()
+    total = len(museum_documents(catalog))
+    checkpoints = os.path.join(root, "checkpoint")
+    print("=== Embedding Pipeline Benchmark ===")
+    print(f"{total} documents; stub server: 5 ms per request + 0.4 ms per document, 4 requests in parallel")
+    print()
+
+    pipeline = lambda **options: EmbeddingPipeline(checkpoint_directory=checkpoints, **options)
+    run("one request (previous path)", pipeline(batch_size=total, concurrency=1), catalog)
+    run("batches of 32, 1 in flight", pipeline(batch_size=32, concurrency=1), catalog)
+    run("batches of 32, 4 in flight", pipeline(batch_size=32, concurrency=4), catalog)
+    run("batches of 128, 4 in flight", pipeline(batch_size=128, concurrency=4), catalog)
+    run("batches of 32, 8 in flight", pipeline(batch_size=32, concurrency=8), catalog)
+    run("batches of 32, 4 in flight, 10% 503s", pipeline(batch_size=32, concurrency=4, backoff=0.01), catalog, failure_rate=0.1)
+    run("batches of 32, 4 in flight, numpy", pipeline(batch_size=32, concurrency=4), catalog,
+        store=NumpyVectorStore(os.path.join(root, "vectors")))
+
+    print()
+    resumable = pipeline(batch_size=32, concurrency=4, max_retries=2, backoff=0.01, checkpoint_size=512)
+    crashed_after = (total // 32) // 2
+    store = run(f"server dies after {crashed_after} requests", resumable, catalog, fail_after=crashed_after)
+    run("resumed build", resumable, catalog, store=store)
+
+if __name__ == "__main__":
+    main()
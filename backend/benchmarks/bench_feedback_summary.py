@@ -0,0 +1,59 @@
+"""
+Benchmark the feedback summary: a full rescan of the log (the previous
+behaviour) against the running aggregates, as the log grows.
+
+    python -m benchmarks.bench_feedback_summary
+"""
+import os
+import tempfile
+import time
+
+from helpers.feedback_store import FeedbackStore
+from helpers.feedback_aggregates import FeedbackAggregates
+
+SIZES = [100, 1000, 10000]
+REPEATS = 20
+
+def record(i):
+    return {
+        'timestamp': f"2030-01-{1 + i % 28:02d}T12:00:00",
+        'responses': {'What aspects of your visit could be improved?': {'text': "More benches."}},
+        'overall_sentiment': {'polarity': 0.5, 'subjectivity': 0.5, 'sentiment': 'positive'},
+    }
+
+def rescan(store):
+    """The previous summary: read and sum every record."""
+    total = polarity = 0
+    for feedback in store:
+        total += 1
+        polarity += feedback['overall_sentiment']['polarity']
+    return polarity / total
+
+def timed(func):
+    start = time.perf_counter()
+    for _ in range(REPEATS):
+        func()
+    return (time.perf_counter() - start) / REPEATS * 1000
+
+def main():
+    """Compare summary latency for several log sizes."""
+    print("=== Feedback Summary Benchmark ===")
+    print()
+    for size in SIZES:
+        directory = tempfile.mkdtemp()
+        store = FeedbackStore(os.path.join(directory, "feedback.jsonl"), fsync=False)
+        aggregates = FeedbackAggregates(store, os.path.join(directory, "aggregates.json"))
+        for i in range(size):
+            store.append(record(i))
+
+        print(f"{size:>6} records:")
+        print(f"  rescan:            {timed(lambda: rescan(store)):8.3f} ms")
+        print(f"  aggregates:        {timed(aggregates.summary):8.3f} ms")
+        print(f"  aggregates, range: {timed(lambda: aggregates.summary('2030-01-01', '2030-01-07')):8.3f} ms")
+        start = time.perf_counter()
+        aggregates.rebuild()
+        print(f"  rebuild:           {(time.perf_counter() - start) * 1000:8.3f} ms")
+        store.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Benchmark the intent router: p50/p99 chat latency of catalog questions
+answered by the router against the same questions sent through the RAG
+chain, plus the router's cost on questions that fall through.
+
+Runs fully offline: fake embeddings and vectorstore, and a local fake Groq
+server streaming its answer with a delay per token:
+    python -m benchmarks.bench_intent_router [token_delay_ms]
+"""
+import os
+import sys
+import time
+
+from benchmarks.fakes import FakeGroqServer, use_offline_retrieval
+
+use_offline_retrieval()
+
+from handlers import response_handler
+from helpers.intent_router import intent_router
+
+TOKEN_DELAY = float(sys.argv[1]) / 1000 if len(sys.argv) > 1 else 0.01
+ROUNDS = 10
+
+CATALOG_QUESTIONS = [
+    "What time do you close on Wednesday?", "How much is a senior ticket?", "Which guides speak Japanese?",
+    "¿A qué hora abren el sábado?", "¿Cuánto cuesta la entrada de estudiante?", "¿Hay guías que hablen portugués?",
+    "Combien coûte un billet enfant ?", "Quels sont vos horaires le lundi ?", "Y a-t-il un guide qui parle chinois ?",
+    "Wann schließt ihr am Freitag?", "Was kostet ein Ticket für Rentner?", "Gibt es Führungen auf Spanisch?",
+    "周六几点开门？", "学生票多少钱？", "有会说德语的导游吗？",
+    "土曜日は何時に開館しますか？", "子供のチケットはいくらですか？", "中国語を話せるガイドはいますか？",
+]
+
+OTHER_QUESTIONS = [
+    "Tell me about the Renaissance Art exhibit", "Is the cafe open on Monday?", "How much is the highlights tour?",
+    "Where can I buy tickets?", "Can I book a tour with Hans on Tuesday?", "What can kids do at the museum?",
+    "¿Qué exposiciones me recomiendan?", "Où se trouve la boutique ?", "Kann ich eine Führung buchen?", "推荐哪个展览？",
+]
+
+def percentile(timings, fraction):
+    ordered = sorted(timings)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+def chat_turn(question):
+    stream = response_handler.get_response(question, session_id="bench", stream=True, messages=[{"role": "user", "content": question}])
+    return "".join(stream)
+
+def run(label, questions, turn):
+    timings = []
+    for _ in range(ROUNDS):
+        for question in questions:
+            start = time.perf_counter()
+            turn(question)
+            timings.append(time.perf_counter() - start)
+    p50, p99 = percentile(timings, 0.5) * 1000, percentile(timings, 0.99) * 1000
+    print(f"{label:<36} p50 {p50:9.3f} ms   p99 {p99:9.3f} ms")
+
+def main():
+    """Time catalog and other questions with and without the router."""
+    server = FakeGroqServer(response="The museum is open from nine to five on most days, see the hours above.", token_delay=TOKEN_DELAY).start()
+    os.environ["GROQ_API_BASE"] = server.base_url
+    response_handler.api_key = "fake-key"
+
+    print("=== Intent Router Benchmark ===")
+    print(f"fake LLM: {TOKEN_DELAY * 1000:.0f} ms per streamed token")
+    print()
+    try:
+        run("router decision only", CATALOG_QUESTIONS + OTHER_QUESTIONS, intent_router.analyze)
+        run("catalog questions, routed", CATALOG_QUESTIONS, chat_turn)
+        run("other questions, fall through", OTHER_QUESTIONS, chat_turn)
+        response_handler.INTENT_ROUTER_ENABLED = False
+        run("catalog questions, RAG chain", CATALOG_QUESTIONS, chat_turn)
+    finally:
+        server.stop()
+
+    stats = intent_router.stats()
+    print()
+    print(f"routed {stats['routed']} of {stats['queries']} chat turns (hit rate {stats['hit_rate']:.0%}), by intent {stats['by_intent']}")
+
+if __name__ == "__main__":
+    main()
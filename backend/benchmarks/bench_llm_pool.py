@@ -0,0 +1,70 @@
+"""
+Benchmark per-turn latency and connection reuse of the pooled LLM registry
+against building a new ChatGroq client on every turn.
+
+Runs fully offline against a local fake Groq server:
+    python -m benchmarks.bench_llm_pool
+"""
+import os
+import time
+import statistics
+
+from langchain.prompts import ChatPromptTemplate
+from langchain_groq import ChatGroq
+from helpers.chat_helper import ChatHelper
+from constance.prompts import SYSTEM_PROMPT, HUMAN_PROMPT
+from services.llm_model import get_chain, clear_registry
+from benchmarks.fakes import FakeGroqServer
+
+TURNS = 50
+PAYLOAD = {"query": "What are the opening hours?", "context": "Museum Hours: 9:00 AM - 5:00 PM", "chat_history": []}
+
+def per_request_turn():
+    """One chat turn the old way: new prompt, new client, new connection."""
+    prompt = ChatPromptTemplate.from_messages([
+        ("system", SYSTEM_PROMPT),
+        ("system", "Previous conversation:\n{chat_history}"),
+        ("human", HUMAN_PROMPT),
+    ])
+    llm = ChatGroq(model="llama3-8b-8192", temperature=0.5, api_key="fake-key")
+    return (prompt | llm).invoke(PAYLOAD)
+
+def pooled_turn():
+    """One chat turn through the cached prompt, chain and pooled client."""
+    chat_helper = ChatHelper(system_prompt=SYSTEM_PROMPT, human_prompt=HUMAN_PROMPT)
+    chain = get_chain(chat_helper.prompt, model_name="llama3-8b-8192", temperature=0.5, api_key="fake-key")
+    return chain.invoke(PAYLOAD)
+
+def run(label, turn, server):
+    """Time a series of turns and report latency and connections opened."""
+    connections_before = server.connections
+    timings = []
+    for _ in range(TURNS):
+        start = time.perf_counter()
+        turn()
+        timings.append(time.perf_counter() - start)
+    print(f"{label}:")
+    print(f"  mean per turn: {statistics.mean(timings) * 1000:.2f} ms")
+    print(f"  p50 per turn:  {statistics.median(timings) * 1000:.2f} ms")
+    print(f"  connections opened: {server.connections - connections_before}")
+    return statistics.mean(timings)
+
+def main():
+    """Compare per-request clients with the pooled registry."""
+    print("=== LLM Client Pool Benchmark ===")
+    print()
+    
+    server = FakeGroqServer().start()
+    os.environ["GROQ_API_BASE"] = server.base_url
+    try:
+        fresh = run("New client per turn", per_request_turn, server)
+        pooled = run("Pooled client", pooled_turn, server)
+    finally:
+        clear_registry()
+        server.stop()
+    
+    print()
+    print(f"Saved per turn: {(fresh - pooled) * 1000:.2f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Benchmark re-indexing the museum data after edits: embedding calls and
+documents embedded for a full rebuild versus the incremental indexer, with
+an embedding model that costs a fixed delay per document.
+
+    python -m benchmarks.bench_reindex [ms_per_document]
+"""
+import copy
+import sys
+import time
+
+from helpers import museum_data
+from helpers.indexer import reindex
+from helpers.museum_catalog import MuseumCatalog
+from benchmarks.fakes import FakeEmbeddings, MemoryVectorStore
+
+DELAY = float(sys.argv[1]) / 1000 if len(sys.argv) > 1 else 0.02
+
+class SlowEmbeddings(FakeEmbeddings):
+    """Fake embeddings that take DELAY seconds per document, like a local model."""
+
+    def __init__(self):
+        super().__init__()
+        self.documents = 0
+
+    def embed_documents(self, texts):
+        self.documents += len(texts)
+        time.sleep(DELAY * len(texts))
+        return super().embed_documents(texts)
+
+# Edits accumulate, as they would in museum_data.py
+DATA = copy.deepcopy(museum_data.get_all_museum_data())
+
+def edited(change):
+    change(DATA)
+    return MuseumCatalog(DATA)
+
+def run(label, store, catalog):
+    embeddings = store.embedding_function
+    calls, documents = embeddings.calls, embeddings.documents
+    start = time.perf_counter()
+    result = reindex(store, catalog)
+    elapsed = time.perf_counter() - start
+    changes = f"+{len(result['added'])} ~{len(result['updated'])} -{len(result['removed'])}"
+    print(f"{label:<28} {changes:<12} {embeddings.calls - calls} call(s), "
+          f"{embeddings.documents - documents:3d} docs embedded, {elapsed * 1000:7.1f} ms")
+
+def main():
+    """Index the data once, then re-index after typical edits."""
+    print("=== Incremental Re-index Benchmark ===")
+    print(f"embedding cost: {DELAY * 1000:.0f} ms per document")
+    print()
+    base = MuseumCatalog(DATA)
+
+    rebuild = MemoryVectorStore(SlowEmbeddings())
+    run("full rebuild", rebuild, base)
+
+    store = MemoryVectorStore(SlowEmbeddings())
+    reindex(store, base)
+    run("unchanged data", store, base)
+    run("one exhibit edited", store, edited(
+        lambda data: data['exhibits'][0].update(description="Now with a new Sumerian tablet.")))
+    run("ticket price changed", store, edited(
+        lambda data: data['ticket_prices'][1].update(price=13.00)))
+    run("guide removed", store, edited(
+        lambda data: data['tour_guides'].pop()))
+
+if __name__ == "__main__":
+    main()
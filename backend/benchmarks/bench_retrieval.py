@@ -0,0 +1,119 @@
+"""
+Benchmark retrieval quality and latency on a fixed, labelled query set:
+the current top-2 vector search against the hybrid retriever, at k=2 and
+with k adapted to the query.
+
+Recall@k is the share of a query's relevant documents that were returned;
+MRR is the mean reciprocal rank of the first relevant one. Runs offline with
+bag-of-words fake embeddings by default, which makes the vector side weaker
+than a real model; pass --ollama to embed with the configured Ollama model:
+    python -m benchmarks.bench_retrieval [--ollama]
+"""
+import sys
+import time
+
+from helpers.hybrid_retriever import hybrid_retriever
+from helpers.indexer import get_document_id, reindex
+from benchmarks.fakes import FakeEmbeddings, MemoryVectorStore
+
+ROUNDS = 20
+
+# Query -> IDs of the documents that answer it
+QUERIES = {
+    "What time do you close on Wednesday?": ["hours"],
+    "Are you open on Sunday?": ["hours"],
+    "What are your opening hours?": ["hours"],
+    "Where is the museum located?": ["museum_info"],
+    "Is there parking and a cafe?": ["museum_info"],
+    "How much is a student ticket?": ["ticket:Student"],
+    "What does a family ticket cost?": ["ticket:Family"],
+    "Do you have group rates?": ["ticket:Group"],
+    "What ticket prices do you have?": ["ticket:Adult", "ticket:Child", "ticket:Senior", "ticket:Student", "ticket:Family", "ticket:Group"],
+    "Are there any discounts for students?": ["offer:Student Discount", "ticket:Student"],
+    "When is entry free?": ["offer:Free Entry Day"],
+    "What special offers do you have?": ["offer:Free Entry Day", "offer:Student Discount", "offer:Family Pass"],
+    "Tell me about the Renaissance Art exhibit": ["exhibit:exh-002"],
+    "Where can I see dinosaur fossils?": ["exhibit:exh-004"],
+    "Do you have Egyptian mummies?": ["exhibit:exh-001"],
+    "Is there anything hands-on for kids?": ["exhibit:exh-005", "tour:tour-004"],
+    "What exhibits do you have?": ["exhibit:exh-001", "exhibit:exh-002", "exhibit:exh-003", "exhibit:exh-004", "exhibit:exh-005"],
+    "Which guides speak Japanese?": ["guide:guide-002"],
+    "Is there a guide who speaks German?": ["guide:guide-004"],
+    "Who is Maria Rodriguez?": ["guide:guide-003"],
+    "Which guide specializes in ancient civilizations?": ["guide:guide-001"],
+    "How long is the highlights tour?": ["tour:tour-001"],
+    "Do you have a tour for families?": ["tour:tour-004", "offer:Family Pass"],
+    "What tours do you offer?": ["tour:tour-001", "tour:tour-002", "tour:tour-003", "tour:tour-004"],
+    "Is there a science tour?": ["tour:tour-003"],
+    "¿Cuánto cuesta la entrada de estudiante?": ["ticket:Student"],
+    "¿Qué guías hablan español?": ["guide:guide-003"],
+    "Quels sont vos horaires le lundi ?": ["hours"],
+    "学生票多少钱？": ["ticket:Student"],
+    "日本語を話せるガイドはいますか？": ["guide:guide-002"],
+}
+
+def percentile(timings, fraction):
+    ordered = sorted(timings)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+def vector_top2(query, vector, store):
+    return store.similarity_search_by_vector(vector, k=2)
+
+def hybrid_top2(query, vector, store):
+    return hybrid_retriever.retrieve(query, vector, store, k=2)[0]
+
+def hybrid_adaptive(query, vector, store):
+    return hybrid_retriever.retrieve(query, vector, store)[0]
+
+def run(label, retrieve, store, vectors):
+    recall = reciprocal = returned = 0.0
+    misses = []
+    for query, relevant in QUERIES.items():
+        ids = [get_document_id(document) for document in retrieve(query, vectors[query], store)]
+        found = [i for i in ids if i in relevant]
+        recall += len(found) / len(relevant)
+        returned += len(ids)
+        first = next((rank for rank, i in enumerate(ids, start=1) if i in relevant), None)
+        reciprocal += 1 / first if first else 0.0
+        if not found:
+            misses.append(query)
+
+    timings = []
+    for _ in range(ROUNDS):
+        for query in QUERIES:
+            start = time.perf_counter()
+            retrieve(query, vectors[query], store)
+            timings.append(time.perf_counter() - start)
+
+    total = len(QUERIES)
+    p50, p99 = percentile(timings, 0.5) * 1000, percentile(timings, 0.99) * 1000
+    print(f"{label:<18} recall {recall / total:5.1%}   MRR {reciprocal / total:.3f}   "
+          f"avg k {returned / total:4.2f}   p50 {p50:7.3f} ms   p99 {p99:7.3f} ms")
+    return misses
+
+def main():
+    """Index the museum data and score each retriever on the query set."""
+    if "--ollama" in sys.argv:
+        from helpers.storage_helper import embeddings
+    else:
+        embeddings = FakeEmbeddings(size=256)
+    store = MemoryVectorStore(embeddings)
+    reindex(store)
+    vectors = {query: embeddings.embed_query(query) for query in QUERIES}
+    hybrid_retriever.plan(next(iter(QUERIES)))  # build the keyword index outside the timings
+
+    print("=== Retrieval Benchmark ===")
+    print(f"{len(QUERIES)} labelled queries, {len(store.records)} documents, "
+          f"{'Ollama' if '--ollama' in sys.argv else 'fake'} embeddings")
+    print()
+    results = [
+        ("vector, k=2", run("vector, k=2", vector_top2, store, vectors)),
+        ("hybrid, k=2", run("hybrid, k=2", hybrid_top2, store, vectors)),
+        ("hybrid, adaptive", run("hybrid, adaptive", hybrid_adaptive, store, vectors)),
+    ]
+    print()
+    for label, misses in results:
+        print(f"{label}: no relevant document for {len(misses)} queries {misses}")
+
+if __name__ == "__main__":
+    main()
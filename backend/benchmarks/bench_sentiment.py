@@ -0,0 +1,70 @@
+"""
+Benchmark sentiment scoring in texts/sec: one TextBlob per text (the
+previous analyze_sentiment), the batch API cold and warm, and bulk
+re-scoring in the process pool. Also checks that combined overall scores
+match analyzing the joined answers.
+
+    python -m benchmarks.bench_sentiment [texts]
+"""
+import random
+import sys
+import time
+
+from textblob import TextBlob
+
+from helpers.sentiment_service import SentimentService, combine
+
+TEXTS = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+
+PHRASES = [
+    "The dinosaur hall was amazing", "too crowded near the entrance",
+    "the guide was friendly and very knowledgeable", "not enough benches",
+    "the cafe was expensive", "I loved the Egyptian collection",
+    "signs were confusing", "a wonderful day out for the kids",
+    "the audio guide did not work", "beautiful paintings",
+]
+
+def make_texts(count, seed=7):
+    rng = random.Random(seed)
+    return [f"Visit {i}: " + ". ".join(rng.sample(PHRASES, 3)) + "." for i in range(count)]
+
+def textblob_rate(texts):
+    start = time.perf_counter()
+    for text in texts:
+        TextBlob(text).sentiment
+    return len(texts) / (time.perf_counter() - start)
+
+def batch_rate(service, texts):
+    start = time.perf_counter()
+    service.score_batch(texts)
+    return len(texts) / (time.perf_counter() - start)
+
+def main():
+    """Report texts/sec for each scoring path."""
+    texts = make_texts(TEXTS)
+    service = SentimentService(cache_size=TEXTS)
+
+    print("=== Sentiment Benchmark ===")
+    print(f"{TEXTS} distinct texts")
+    print()
+    print(f"TextBlob per text:  {textblob_rate(texts):9.0f} texts/s")
+    print(f"batch, cold cache:  {batch_rate(service, texts):9.0f} texts/s")
+    print(f"batch, warm cache:  {batch_rate(service, texts):9.0f} texts/s")
+    for workers in (1, 2, 4):
+        start = time.perf_counter()
+        service.rescore(texts, workers=workers)
+        elapsed = time.perf_counter() - start
+        service.shutdown()
+        print(f"rescore, {workers} worker{'s' if workers > 1 else ' '}: {TEXTS / elapsed:9.0f} texts/s (incl. pool start)")
+
+    # Overall score from per-answer scores versus re-analyzing the joined answers
+    errors = []
+    for i in range(0, 600, 3):
+        answers = texts[i:i + 3]
+        joined = TextBlob(" ".join(answers)).sentiment.polarity
+        errors.append(abs(combine(service.score_batch(answers)).polarity - joined))
+    print()
+    print(f"overall polarity vs joined text: max error {max(errors):.4f}, mean {sum(errors) / len(errors):.4f}")
+
+if __name__ == "__main__":
+    main()
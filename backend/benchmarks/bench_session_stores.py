@@ -0,0 +1,92 @@
+"""
+Round-trip check and benchmark of the chat session backends.
+
+Every backend runs the same script: append, read back, truncate at the
+turn cap, clear one session, then report stats. The results and the stats
+fields must match the memory store's, then append and get are timed.
+SQLite runs on a temporary file; Redis runs on fakeredis when installed,
+or on a live server with --redis-url:
+    python -m benchmarks.bench_session_stores [--redis-url redis://localhost:6379/15]
+"""
+import os
+import sys
+import tempfile
+import time
+
+from helpers import session_store
+from helpers.session_store import MemorySessionStore, RedisSessionStore, SQLiteSessionStore
+
+ROUNDS = 2000
+
+def round_trip(store):
+    """Exercise a store and return what it reported."""
+    store.clear_all()
+    store.append("a", "user", "What time do you open on Monday?")
+    store.append("a", "assistant", "We open at 9:00 AM.")
+    store.append("b", "user", "How much is a student ticket?")
+    first = store.get("a")
+    for turn in range(session_store.MAX_TURNS + 2):
+        store.append("c", "user", f"question {turn}")
+        store.append("c", "assistant", f"answer {turn}")
+    truncated = store.get("c")
+    store.clear("b")
+    cleared = store.get("b")
+    return {
+        "first": (list(first[0]), first[1]),
+        "truncated": (len(truncated[0]), truncated[0][0], truncated[1][:40]),
+        "cleared": (list(cleared[0]), cleared[1]),
+        "stats": store.stats(),
+    }
+
+def check(label, store, expected):
+    result = round_trip(store)
+    for field in ("first", "truncated", "cleared"):
+        assert result[field] == expected[field], f"{label}: {field} {result[field]!r} != {expected[field]!r}"
+    stats = result["stats"]
+    assert stats["sessions"] == expected["stats"]["sessions"], f"{label}: stats {stats}"
+    assert stats["messages"] == expected["stats"]["messages"], f"{label}: stats {stats}"
+    assert stats["approx_bytes"] > 0, f"{label}: stats {stats}"
+    print(f"{label:<8} round trip ok   stats {stats}")
+
+def timed(label, store):
+    store.clear_all()
+    start = time.perf_counter()
+    for i in range(ROUNDS):
+        store.append(f"s{i % 50}", "user", "Which guides speak Japanese?")
+    appended = time.perf_counter()
+    for i in range(ROUNDS):
+        store.get(f"s{i % 50}")
+    done = time.perf_counter()
+    store.clear_all()
+    print(f"{label:<8} append {(appended - start) / ROUNDS * 1e6:8.1f} us   get {(done - appended) / ROUNDS * 1e6:8.1f} us")
+
+def redis_store():
+    if "--redis-url" in sys.argv:
+        return RedisSessionStore(sys.argv[sys.argv.index("--redis-url") + 1], prefix="bench-chat")
+    try:
+        import fakeredis
+    except ImportError:
+        return None
+    return RedisSessionStore(client=fakeredis.FakeRedis(), prefix="bench-chat")
+
+def main():
+    """Check every backend against the memory store, then time them."""
+    print("=== Session Store Benchmark ===")
+    print()
+    memory = MemorySessionStore()
+    expected = round_trip(memory)
+    with tempfile.TemporaryDirectory() as root:
+        stores = {"memory": memory, "sqlite": SQLiteSessionStore(os.path.join(root, "sessions.sqlite3"))}
+        redis = redis_store()
+        if redis is not None:
+            stores["redis"] = redis
+        for label, store in stores.items():
+            check(label, store, expected)
+        if redis is None:
+            print("redis    skipped: fakeredis is not installed and no --redis-url given")
+        print()
+        for label, store in stores.items():
+            timed(label, store)
+
+if __name__ == "__main__":
+    main()
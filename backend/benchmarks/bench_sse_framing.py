@@ -0,0 +1,58 @@
+"""
+Benchmark SSE framing: frames written and bytes on the wire for different
+coalescing windows, plus raw encoder throughput in frames per second.
+
+    python -m benchmarks.bench_sse_framing
+"""
+import time
+
+from helpers.sse_helper import sse_stream, encode_event
+
+TOKENS = 2000
+# Groq streams llama3-8b at roughly one token every couple of milliseconds
+TOKEN_INTERVAL = 0.002
+WINDOWS_MS = [0, 10, 30, 50]
+ANSWER = "### Museum Hours\n- **Monday**: 9:00 AM - 5:00 PM\n- **Wednesday**: 9:00 AM - 8:00 PM\n"
+
+def tokens(interval=TOKEN_INTERVAL):
+    """Yield markdown tokens the way the LLM streams them, with newlines inside chunks."""
+    pieces = ANSWER.replace(" ", " \x00").replace("\n", "\n\x00").split("\x00")
+    for i in range(TOKENS):
+        if interval:
+            time.sleep(interval)
+        yield pieces[i % len(pieces)]
+
+def run_window(window_ms):
+    """Stream the tokens through the encoder with one coalescing window."""
+    frames, wire_bytes = 0, 0
+    start = time.perf_counter()
+    for frame in sse_stream(tokens(), window_ms=window_ms):
+        frames += 1
+        wire_bytes += len(frame.encode())
+    elapsed = time.perf_counter() - start
+    print(f"  window {window_ms:>3} ms: {frames:>5} frames, {wire_bytes:>7} bytes, {elapsed:.2f} s")
+
+def encoder_throughput():
+    """Frames per second of the encoder with tokens available immediately."""
+    start = time.perf_counter()
+    frames = sum(1 for _ in sse_stream(tokens(interval=0), window_ms=0))
+    elapsed = time.perf_counter() - start
+    print(f"  {frames / elapsed:,.0f} frames/sec")
+
+def main():
+    """Compare coalescing windows and measure encoder speed."""
+    print("=== SSE Framing Benchmark ===")
+    print(f"{TOKENS} tokens, one every {TOKEN_INTERVAL * 1000:.0f} ms")
+    print()
+    print("Writes per stream:")
+    for window_ms in WINDOWS_MS:
+        run_window(window_ms)
+    print()
+    print("Encoder throughput (no coalescing):")
+    encoder_throughput()
+    print()
+    print("Multi-line framing example:")
+    print(encode_event("### Hours\n- Monday"), end="")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+Micro-benchmark of per-token overhead on the SSE path of main.chat.
+
+A fake LLM streams thousands of one-character chunks. The script times
+iterating the bare chain, then the full Flask route through the test client,
+and reports the extra cost the route adds per token.
+    python -m benchmarks.bench_sse_overhead
+"""
+import time
+
+from benchmarks.fakes import get_fake_llm, use_offline_retrieval
+
+CHUNKS = 5000
+ROUNDS = 3
+RESPONSE = ("The museum is open daily. " * (CHUNKS // 26 + 1))[:CHUNKS]
+
+def main():
+    """Compare raw chain streaming with the full SSE route."""
+    print("=== SSE Per-Token Overhead Benchmark ===")
+    print(f"{CHUNKS} chunks per response, best of {ROUNDS}")
+    print()
+
+    use_offline_retrieval()
+    from handlers import response_handler
+    from helpers.chat_helper import ChatHelper
+    from constance.prompts import SYSTEM_PROMPT, HUMAN_PROMPT
+    from main import app
+
+    chain = ChatHelper.get_prompt(SYSTEM_PROMPT, HUMAN_PROMPT) | get_fake_llm(RESPONSE)
+    response_handler.get_chain = lambda prompt, **kwargs: chain
+    payload = {"query": "When are you open?", "context": "", "chat_history": []}
+
+    baseline = float("inf")
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        for _ in chain.stream(payload):
+            pass
+        baseline = min(baseline, time.perf_counter() - start)
+
+    client = app.test_client()
+    route = float("inf")
+    for i in range(ROUNDS):
+        start = time.perf_counter()
+        response = client.post("/api/chat", json={"message": "When are you open?", "session_id": f"bench-{i}", "stream": True})
+        body = response.get_data()
+        route = min(route, time.perf_counter() - start)
+
+    print(f"Bare chain:  {baseline / CHUNKS * 1e6:.1f} us per token")
+    print(f"SSE route:   {route / CHUNKS * 1e6:.1f} us per token")
+    print(f"Route added: {(route - baseline) / CHUNKS * 1e6:.1f} us per token")
+    print(f"Bytes on the wire: {len(body)}")
+
+if __name__ == "__main__":
+    main()
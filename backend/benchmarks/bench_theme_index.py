@@ -0,0 +1,74 @@
+"""
+Benchmark the feedback theme index: update cost per answer and top-k query
+latency overall, per exhibit and per time window, then memory over two
+years of answers that each add a never repeated word.
+
+    python -m benchmarks.bench_theme_index [answers]
+"""
+from datetime import date, timedelta
+import random
+import sys
+import time
+
+from helpers.theme_index import ThemeIndex
+
+ANSWERS = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+QUERIES = 2000
+
+PHRASES = [
+    "the cafe was too expensive", "loved the Greek vases", "Dr. Johnson was a brilliant guide",
+    "the dinosaur skeletons in Natural History", "not enough benches", "the restrooms were dirty",
+    "Renaissance Art was breathtaking", "the audio guides kept failing", "wifi was slow",
+    "the kids enjoyed Interactive Science", "long queue at the cloakroom", "gift shop prices were fair",
+]
+
+def make_answers(count, seed=11):
+    rng = random.Random(seed)
+    return [
+        (". ".join(rng.sample(PHRASES, 2)) + f". Visit number {i}.",
+         rng.uniform(-1, 1),
+         f"2030-{1 + i % 12:02d}-{1 + i % 28:02d}")
+        for i in range(count)
+    ]
+
+def query_us(index, scope):
+    start = time.perf_counter()
+    for _ in range(QUERIES):
+        index.top(10, scope)
+    return (time.perf_counter() - start) / QUERIES * 1e6
+
+def long_tail(days=730, per_day=100):
+    """Feed answers with a unique word each and report what the index holds."""
+    index = ThemeIndex()
+    rng = random.Random(5)
+    start = time.perf_counter()
+    first = date(2030, 1, 1)
+    for n in range(days * per_day):
+        day = (first + timedelta(days=n // per_day)).isoformat()
+        index.add_text(f"{rng.choice(PHRASES)}, souvenir{n}", rng.uniform(-1, 1), day)
+    elapsed = time.perf_counter() - start
+    counted = sum(len(counter.counts) for scope in index._scopes.values() for counter in scope.values())
+    top = [entry["theme"] for entry in index.top(5)["entities"]]
+    print(f"{days * per_day} long-tail answers: {elapsed / (days * per_day) * 1e6:.1f} us per update, "
+          f"{index.stats()['scopes']} scopes, {counted} counts held, top entities {top}")
+
+def main():
+    """Index synthetic answers, then time queries."""
+    answers = make_answers(ANSWERS)
+    index = ThemeIndex()
+
+    start = time.perf_counter()
+    for text, polarity, day in answers:
+        index.add_text(text, polarity, day)
+    elapsed = time.perf_counter() - start
+
+    print("=== Theme Index Benchmark ===")
+    print(f"{ANSWERS} answers: {elapsed / ANSWERS * 1e6:.1f} us per update, {index.stats()}")
+    print()
+    for scope in ["all", "exhibit:exh-001", "day:2030-03-03", "week:2030-W10", "month:2030-03"]:
+        print(f"top 10 {scope:<18} {query_us(index, scope):8.1f} us")
+    print()
+    long_tail()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Benchmark bulk ticket issuance: the serial QR loop versus the worker pool,
+and time to the first ticket when streaming.
+
+    python -m benchmarks.bench_ticket_issuance
+"""
+import time
+
+from helpers import qr_helper
+
+BATCH_SIZES = [1, 10, 100, 1000]
+
+def serial(num_tickets):
+    """The previous behaviour: build and render every QR code in turn."""
+    tickets = []
+    for _ in range(num_tickets):
+        ticket_data = {
+            'visitor_name': "School Group",
+            'ticket_type': "Student",
+            'visit_date': "2030-01-01",
+            'price': qr_helper.get_ticket_price("Student")
+        }
+        qr_code, ticket_id = qr_helper.generate_ticket_qr(ticket_data)
+        ticket_data['qr_code'] = qr_code
+        tickets.append(ticket_data)
+    return tickets
+
+def pooled(num_tickets):
+    """Time the pool until the first ticket and until the whole batch."""
+    start = time.perf_counter()
+    first = None
+    for ticket in qr_helper.issue_tickets("School Group", "Student", "2030-01-01", num_tickets, inline_qr=True):
+        if first is None:
+            first = time.perf_counter() - start
+    return first, time.perf_counter() - start
+
+def main():
+    """Compare serial and pooled issuance for several batch sizes."""
+    print("=== Ticket Issuance Benchmark ===")
+    print(f"{qr_helper.QR_WORKERS} QR workers")
+    print()
+    
+    # Start the pool outside the measurement
+    list(qr_helper.issue_tickets("Warmup", "Adult", "2030-01-01", qr_helper.PARALLEL_THRESHOLD, inline_qr=True))
+    
+    for num_tickets in BATCH_SIZES:
+        start = time.perf_counter()
+        serial(num_tickets)
+        serial_time = time.perf_counter() - start
+        first, pooled_time = pooled(num_tickets)
+        print(f"{num_tickets:>5} tickets:")
+        print(f"  serial:       {serial_time * 1000:9.1f} ms ({num_tickets / serial_time:7.1f} tickets/s)")
+        print(f"  pooled:       {pooled_time * 1000:9.1f} ms ({num_tickets / pooled_time:7.1f} tickets/s)")
+        print(f"  first ticket: {first * 1000:9.1f} ms")
+    
+    qr_helper.shutdown_executor()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Benchmark the signed ticket token against the previous JSON QR payload:
+payload size, QR version, render time and encode/verify throughput.
+
+    python -m benchmarks.bench_ticket_token
+"""
+from datetime import datetime
+import json
+import time
+import uuid
+
+import qrcode
+
+from helpers import qr_helper
+from helpers.ticket_token import issue_token, decode_token
+
+ITERATIONS = 20000
+RENDER_ITERATIONS = 200
+
+def json_payload():
+    """The previous payload: the whole ticket dict as JSON."""
+    return json.dumps({
+        'visitor_name': "Test Visitor",
+        'ticket_type': "Adult",
+        'visit_date': "2030-01-01",
+        'purchase_date': datetime.now().isoformat(),
+        'price': 25.0,
+        'ticket_id': str(uuid.uuid4()),
+        'generated_at': datetime.now().isoformat()
+    })
+
+def token_payload():
+    """The signed base45 token."""
+    return issue_token("Adult", "2030-01-01", 25.0)
+
+def qr_version(data):
+    """Smallest QR version the encoder picks for the payload."""
+    qr = qrcode.QRCode(**qr_helper.QR_SETTINGS)
+    qr.add_data(data)
+    qr.make(fit=True)
+    return qr.version, qr.modules_count
+
+def rate(func, iterations):
+    """Calls per second of func."""
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return iterations / (time.perf_counter() - start)
+
+def main():
+    """Compare the two payload formats."""
+    print("=== Ticket Payload Benchmark ===")
+    print()
+
+    legacy, token = json_payload(), token_payload()
+    for name, payload, encode, verify in [
+        ("json", legacy, json_payload, lambda: json.loads(legacy)),
+        ("token", token, token_payload, lambda: decode_token(token)),
+    ]:
+        version, modules = qr_version(payload)
+        render = rate(lambda: qr_helper.render_qr_png(payload), RENDER_ITERATIONS)
+        print(f"{name}:")
+        print(f"  payload:  {len(payload.encode('utf-8')):6d} bytes")
+        print(f"  QR:       version {version} ({modules}x{modules} modules)")
+        print(f"  PNG:      {len(qr_helper.render_qr_png(payload)):6d} bytes, {render:8.0f} renders/s")
+        print(f"  encode:   {rate(encode, ITERATIONS):8.0f} /s")
+        print(f"  verify:   {rate(verify, ITERATIONS):8.0f} /s")
+    print()
+    print("JSON verify is only a parse; it can't detect a forged ticket.")
+
+if __name__ == "__main__":
+    main()
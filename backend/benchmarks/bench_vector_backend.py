@@ -0,0 +1,122 @@
+"""
+Benchmark the vectorstore backends: cold start (import, then open and first
+query), resident memory and query latency of Chroma against the
+memory-mapped NumPy index, on the museum documents plus optional padding.
+
+Each backend is measured in a fresh child process so import and load costs
+are not hidden by an earlier run. Embeddings are offline fakes of the
+nomic-embed-text dimension; search cost doesn't depend on their quality.
+    python -m benchmarks.bench_vector_backend [extra_documents]
+"""
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+DIMENSION = 768
+QUERIES = 500
+
+def rss_mb():
+    """Resident set size of this process in MB."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def child(backend, directory):
+    """Open a built index, query it, and print the measurements as JSON."""
+    rng = random.Random(7)
+    vectors = [[rng.gauss(0, 1) for _ in range(DIMENSION)] for _ in range(QUERIES)]
+    start_rss = rss_mb()
+    start = time.perf_counter()
+    if backend == "numpy":
+        from helpers.numpy_vectorstore import NumpyVectorStore
+        imported = time.perf_counter()
+        store = NumpyVectorStore(directory)
+    else:
+        from langchain_community.vectorstores import Chroma
+        imported = time.perf_counter()
+        store = Chroma(persist_directory=directory, collection_name="museum_data")
+    store.similarity_search_by_vector(vectors[0], k=2)
+    opened = time.perf_counter()
+
+    timings = []
+    for i, vector in enumerate(vectors):
+        where = {"type": {"$in": ["ticket", "offer"]}} if i % 2 else None
+        begin = time.perf_counter()
+        store.similarity_search_by_vector(vector, k=3, filter=where)
+        timings.append(time.perf_counter() - begin)
+    timings.sort()
+    print(json.dumps({
+        "import_ms": (imported - start) * 1000,
+        "open_ms": (opened - imported) * 1000,
+        "rss_mb": rss_mb() - start_rss,
+        "p50_ms": timings[len(timings) // 2] * 1000,
+        "p99_ms": timings[int(len(timings) * 0.99)] * 1000,
+    }))
+
+def build(store, extra):
+    """Index the museum documents and padding documents into a store."""
+    from helpers.indexer import reindex
+    reindex(store)
+    batch = 500
+    for offset in range(0, extra, batch):
+        count = min(batch, extra - offset)
+        store.add_texts(
+            [f"Archive note {offset + i}: gallery records and object history" for i in range(count)],
+            metadatas=[{"type": "archive"}] * count,
+            ids=[f"archive:{offset + i}" for i in range(count)],
+        )
+
+def measure(backend, directory):
+    result = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_vector_backend", "--child", backend, directory],
+        capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        return None
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def main():
+    """Build both indexes in a temporary directory and measure each in a child process."""
+    from helpers.numpy_vectorstore import NumpyVectorStore
+    from benchmarks.fakes import FakeEmbeddings
+
+    extra = int(sys.argv[1]) if len(sys.argv) > 1 else 0
+    embeddings = FakeEmbeddings(size=DIMENSION)
+    with tempfile.TemporaryDirectory() as root:
+        directories = {"numpy": os.path.join(root, "vectors"), "chroma": os.path.join(root, "chroma")}
+        numpy_store = NumpyVectorStore(directories["numpy"], embedding_function=embeddings)
+        build(numpy_store, extra)
+        documents = len(numpy_store)
+
+        available = {"numpy": True}
+        try:
+            from langchain_community.vectorstores import Chroma
+            build(Chroma(persist_directory=directories["chroma"], embedding_function=embeddings, collection_name="museum_data"), extra)
+            available["chroma"] = True
+        except ImportError:
+            available["chroma"] = False
+
+        print("=== Vector Backend Benchmark ===")
+        print(f"{documents} documents, {DIMENSION} dimensions, {QUERIES} queries (half with a type filter)")
+        print()
+        for backend in ("chroma", "numpy"):
+            result = measure(backend, directories[backend]) if available[backend] else None
+            if result is None:
+                print(f"{backend:<8} skipped: chromadb is not installed" if not available[backend] else f"{backend:<8} failed")
+                continue
+            print(f"{backend:<8} import {result['import_ms']:7.1f} ms   open + first query {result['open_ms']:7.1f} ms   "
+                  f"memory +{result['rss_mb']:6.1f} MB   "
+                  f"p50 {result['p50_ms']:7.3f} ms   p99 {result['p99_ms']:7.3f} ms")
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--child":
+        child(sys.argv[2], sys.argv[3])
+    else:
+        main()
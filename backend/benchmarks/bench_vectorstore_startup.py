@@ -0,0 +1,60 @@
+"""
+Benchmark first-token latency of get_response with a per-request vectorstore
+versus the shared, warm vectorstore.
+
+Run from the backend directory (needs Ollama serving nomic-embed-text):
+    python -m benchmarks.bench_vectorstore_startup
+"""
+import time
+import statistics
+
+from handlers import response_handler
+from helpers.storage_helper import get_or_create_vectorstore, init_vectorstore
+from benchmarks.fakes import get_fake_llm
+
+QUESTIONS = [
+    "What are the opening hours?",
+    "How much is a student ticket?",
+    "Which exhibits are on the first floor?",
+    "Who guides the Renaissance Art tour?",
+]
+ROUNDS = 5
+
+def time_to_first_token(question):
+    """Return seconds until get_response yields its first chunk."""
+    start = time.perf_counter()
+    stream = response_handler.get_response(question, session_id="bench", stream=True, messages=[{"role": "user", "content": question}])
+    next(stream)
+    elapsed = time.perf_counter() - start
+    stream.close()
+    return elapsed
+
+def run(label):
+    """Time every question for a few rounds and print the summary."""
+    timings = [time_to_first_token(q) for _ in range(ROUNDS) for q in QUESTIONS]
+    print(f"{label}:")
+    print(f"  p50 first token: {statistics.median(timings) * 1000:.1f} ms")
+    print(f"  max first token: {max(timings) * 1000:.1f} ms")
+    return statistics.median(timings)
+
+def main():
+    """Compare per-request construction with the shared instance."""
+    print("=== Vectorstore Startup Benchmark ===")
+    print()
+    
+    # Keep the LLM out of the measurement
+    response_handler.get_chain = lambda prompt, **kwargs: prompt | get_fake_llm()
+    
+    original = response_handler.get_vectorstore
+    response_handler.get_vectorstore = get_or_create_vectorstore
+    per_request = run("Per-request construction")
+    
+    response_handler.get_vectorstore = original
+    init_vectorstore()
+    shared = run("Shared instance")
+    
+    print()
+    print(f"Speedup: {per_request / shared:.1f}x")
+
+if __name__ == "__main__":
+    main()
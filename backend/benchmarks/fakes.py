@@ -0,0 +1,344 @@
+"""
+Offline stand-ins used by the benchmark scripts.
+"""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import math
+import random
+import threading
+import time
+import zlib
+
+import httpx
+
+from langchain_core.documents import Document
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+
+
+def get_fake_llm(response="Hello from the museum assistant!", sleep=None):
+    """
+    Build a chat model that streams a canned response one character at a time.
+
+    Args:
+        response (str): Text the model answers with on every call.
+        sleep (float): Optional delay in seconds between streamed characters.
+
+    Returns:
+        FakeListChatModel: A LangChain chat model usable in place of ChatGroq.
+    """
+    return FakeListChatModel(responses=[response], sleep=sleep)
+
+
+class FakeEmbeddings:
+    """Deterministic bag-of-words embeddings, so similar texts get similar vectors."""
+
+    def __init__(self, size=64):
+        self.size = size
+        self.calls = 0
+
+    def _embed(self, text):
+        vector = [0.0] * self.size
+        for word in text.lower().split():
+            # crc32 rather than hash(), which is salted per process
+            vector[zlib.crc32(word.encode()) % self.size] += 1.0
+        return vector
+
+    def embed_query(self, text):
+        self.calls += 1
+        return self._embed(text)
+
+    def embed_documents(self, texts):
+        self.calls += 1
+        return [self._embed(text) for text in texts]
+
+
+class FakeVectorStore:
+    """Vectorstore stand-in that always returns the same context documents."""
+
+    def __init__(self, documents=None):
+        self.documents = documents or [
+            Document(page_content="Museum Hours:\nMonday: 9:00 AM - 5:00 PM\n", metadata={"type": "hours"}),
+        ]
+
+    def similarity_search(self, query, k=4, **kwargs):
+        return self.documents[:k]
+
+    def similarity_search_by_vector(self, embedding, k=4, **kwargs):
+        return self.documents[:k]
+
+
+class MemoryVectorStore:
+    """
+    In-memory stand-in for the Chroma calls the indexer and retrievers make:
+    get, add_texts and add_embeddings (upserts), delete and cosine similarity
+    search with a type filter. Embeds through the given embedding function.
+    """
+
+    def __init__(self, embedding_function):
+        self.embedding_function = embedding_function
+        self.records = {}
+
+    @property
+    def embeddings(self):
+        return self.embedding_function
+
+    def get(self, include=None, **kwargs):
+        ids = list(self.records)
+        return {"ids": ids, "metadatas": [self.records[i][2] for i in ids]}
+
+    def add_texts(self, texts, metadatas=None, ids=None, **kwargs):
+        texts = list(texts)
+        return self.add_embeddings(texts, self.embedding_function.embed_documents(texts), metadatas, ids)
+
+    def add_embeddings(self, texts, embeddings, metadatas=None, ids=None):
+        for i, text in enumerate(texts):
+            self.records[ids[i]] = (text, embeddings[i], dict(metadatas[i]) if metadatas else {})
+        return ids
+
+    def delete(self, ids=None, **kwargs):
+        for i in ids or []:
+            self.records.pop(i, None)
+
+    def similarity_search_by_vector(self, embedding, k=4, filter=None, **kwargs):
+        allowed = None
+        if filter:
+            allowed = filter["type"]["$in"] if isinstance(filter["type"], dict) else [filter["type"]]
+
+        def cosine(vector):
+            dot = sum(a * b for a, b in zip(embedding, vector))
+            norm = math.sqrt(sum(a * a for a in embedding)) * math.sqrt(sum(b * b for b in vector))
+            return dot / norm if norm else 0.0
+
+        scored = [
+            (cosine(vector), text, metadata) for text, vector, metadata in self.records.values()
+            if allowed is None or metadata.get("type") in allowed
+        ]
+        scored.sort(key=lambda item: -item[0])
+        return [Document(page_content=text, metadata=metadata) for _, text, metadata in scored[:k]]
+
+
+def use_offline_retrieval():
+    """
+    Swap the shared vectorstore and the embedding model for offline fakes.
+
+    Must run before main.py is imported, since main warms the vectorstore.
+    """
+    from helpers import storage_helper
+
+    storage_helper.get_or_create_vectorstore = FakeVectorStore
+    storage_helper.embeddings.embeddings = FakeEmbeddings()
+
+
+class FakeGroqServer:
+    """
+    Local HTTP server speaking the subset of the Groq chat completions API
+    used by ChatGroq, with keep-alive support and a connection counter.
+
+    Args:
+        response (str): Text returned for every completion.
+        handshake_delay (float): Seconds spent on each new connection, standing
+            in for TCP and TLS setup against the real API.
+        token_delay (float): Seconds between streamed tokens.
+    """
+
+    def __init__(self, response="Hello from the museum assistant!", handshake_delay=0.02, token_delay=0.0):
+        self.response = response
+        self.handshake_delay = handshake_delay
+        self.token_delay = token_delay
+        self.connections = 0
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _handler_class(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def log_message(self, format, *args):
+                pass
+
+            def handle(self):
+                with fake._lock:
+                    fake.connections += 1
+                time.sleep(fake.handshake_delay)
+                super().handle()
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                with fake._lock:
+                    fake.requests += 1
+                if body.get("stream"):
+                    self._stream(body)
+                else:
+                    self._complete(body)
+
+            def _complete(self, body):
+                payload = json.dumps({
+                    "id": "chatcmpl-fake",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": body.get("model"),
+                    "choices": [{
+                        "index": 0,
+                        "message": {"role": "assistant", "content": fake.response},
+                        "finish_reason": "stop",
+                    }],
+                    "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+                }).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def _stream(self, body):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                tokens = fake.response.split(" ")
+                for i, token in enumerate(tokens):
+                    content = token if i == 0 else " " + token
+                    chunk = {
+                        "id": "chatcmpl-fake",
+                        "object": "chat.completion.chunk",
+                        "created": int(time.time()),
+                        "model": body.get("model"),
+                        "choices": [{"index": 0, "delta": {"content": content}, "finish_reason": None}],
+                    }
+                    self._write_chunk(f"data: {json.dumps(chunk)}\n\n".encode())
+                    if fake.token_delay:
+                        time.sleep(fake.token_delay)
+                self._write_chunk(b"data: [DONE]\n\n")
+                self._write_chunk(b"")
+
+            def _write_chunk(self, data):
+                self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+                self.wfile.flush()
+
+        return Handler
+
+
+class HttpEmbeddings:
+    """
+    Embeddings client for FakeEmbeddingServer, posting to Ollama's /api/embed
+    the way OllamaEmbeddings does. httpx pools connections across threads.
+    """
+
+    def __init__(self, base_url, model="nomic-embed-text", timeout=30.0):
+        self.model = model
+        self.client = httpx.Client(base_url=base_url, timeout=timeout)
+
+    def embed_documents(self, texts):
+        response = self.client.post("/api/embed", json={"model": self.model, "input": list(texts)})
+        response.raise_for_status()
+        return response.json()["embeddings"]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+class FakeEmbeddingServer:
+    """
+    Local HTTP server speaking Ollama's /api/embed with a simple cost model:
+    each request takes request_delay plus document_delay per input, and at
+    most `parallel` requests are processed at once (like OLLAMA_NUM_PARALLEL);
+    the rest queue.
+
+    Args:
+        size (int): Embedding dimension.
+        request_delay (float): Seconds of fixed cost per request.
+        document_delay (float): Seconds per input text.
+        parallel (int): Requests processed concurrently.
+        failure_rate (float): Share of requests answered with a 503.
+        fail_after (int): Answer every request after this many with a 503, as if the server died.
+    """
+
+    def __init__(self, size=128, request_delay=0.005, document_delay=0.0004, parallel=4, failure_rate=0.0, fail_after=None):
+        self.embeddings = FakeEmbeddings(size)
+        self.request_delay = request_delay
+        self.document_delay = document_delay
+        self.failure_rate = failure_rate
+        self.fail_after = fail_after
+        self.requests = 0
+        self.failures = 0
+        self.documents = 0
+        self.active = 0
+        self.peak = 0
+        self._slots = threading.Semaphore(parallel)
+        self._lock = threading.Lock()
+        self._random = random.Random(7)
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _handler_class(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                texts = body["input"] if isinstance(body["input"], list) else [body["input"]]
+                with fake._lock:
+                    fake.requests += 1
+                    failed = (fake.fail_after is not None and fake.requests > fake.fail_after) or fake._random.random() < fake.failure_rate
+                    fake.failures += failed
+                if failed:
+                    self._send(503, {"error": "server busy"})
+                    return
+                with fake._slots:
+                    with fake._lock:
+                        fake.active += 1
+                        fake.peak = max(fake.peak, fake.active)
+                    time.sleep(fake.request_delay + fake.document_delay * len(texts))
+                    with fake._lock:
+                        fake.active -= 1
+                        fake.documents += len(texts)
+                self._send(200, {"model": body.get("model"), "embeddings": [fake.embeddings._embed(text) for text in texts]})
+
+            def _send(self, status, payload):
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        return Handler
@@ -0,0 +1,121 @@
+"""
+Load test comparing concurrent SSE chat streams on the Flask route with a
+fixed thread pool against the async ASGI route on a single event loop.
+
+Runs fully offline: retrieval is faked and the LLM is a local fake Groq
+server that streams tokens with a fixed delay.
+    python -m benchmarks.load_chat_streams [concurrent_streams]
+"""
+import os
+import sys
+import time
+import socket
+import asyncio
+import threading
+import statistics
+from concurrent.futures import ThreadPoolExecutor
+from wsgiref.simple_server import WSGIServer, WSGIRequestHandler, make_server
+
+import httpx
+import uvicorn
+
+from benchmarks.fakes import FakeGroqServer, use_offline_retrieval
+
+STREAMS = int(sys.argv[1]) if len(sys.argv) > 1 else 64
+# A typical gunicorn gthread worker
+FLASK_THREADS = 8
+TOKENS = 50
+TOKEN_DELAY = 0.02
+
+class QuietHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+class ThreadPoolWSGIServer(WSGIServer):
+    """WSGI server that handles requests on a fixed-size thread pool."""
+
+    pool = ThreadPoolExecutor(max_workers=FLASK_THREADS)
+
+    def process_request(self, request, client_address):
+        self.pool.submit(self._handle, request, client_address)
+
+    def _handle(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def start_flask(flask_app):
+    server = make_server("127.0.0.1", free_port(), flask_app, server_class=ThreadPoolWSGIServer, handler_class=QuietHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}", server.shutdown
+
+def start_asgi(asgi_app):
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(asgi_app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    def stop():
+        server.should_exit = True
+    return f"http://127.0.0.1:{port}", stop
+
+async def one_stream(client, url, session_id):
+    start = time.perf_counter()
+    first_chunk = None
+    async with client.stream("POST", f"{url}/api/chat", json={"message": "What are the opening hours?", "session_id": session_id, "stream": True}) as response:
+        async for _ in response.aiter_bytes():
+            if first_chunk is None:
+                first_chunk = time.perf_counter() - start
+    return first_chunk, time.perf_counter() - start
+
+async def run_load(url):
+    async with httpx.AsyncClient(timeout=None, limits=httpx.Limits(max_connections=STREAMS)) as client:
+        start = time.perf_counter()
+        results = await asyncio.gather(*(one_stream(client, url, f"load-{url}-{i}") for i in range(STREAMS)))
+        return time.perf_counter() - start, results
+
+def report(label, url):
+    wall, results = asyncio.run(run_load(url))
+    first_chunks = [first for first, _ in results]
+    print(f"{label}:")
+    print(f"  wall time:          {wall:.2f} s")
+    print(f"  streams per second: {STREAMS / wall:.1f}")
+    print(f"  p50 first chunk:    {statistics.median(first_chunks) * 1000:.0f} ms")
+    print(f"  max first chunk:    {max(first_chunks) * 1000:.0f} ms")
+    return wall
+
+def main():
+    """Run the same streaming load against both servers."""
+    print("=== Concurrent Chat Stream Load Test ===")
+    print(f"{STREAMS} concurrent streams, {TOKENS} tokens each, {TOKEN_DELAY * 1000:.0f} ms per token")
+    print()
+
+    fake_llm = FakeGroqServer(response=" ".join(["token"] * TOKENS), handshake_delay=0, token_delay=TOKEN_DELAY).start()
+    os.environ["GROQ_API_BASE"] = fake_llm.base_url
+    os.environ["GROQ_API_KEY"] = "fake-key"
+    os.environ["LLM_MAX_CONNECTIONS"] = os.environ["LLM_MAX_KEEPALIVE_CONNECTIONS"] = str(STREAMS)
+    use_offline_retrieval()
+
+    from main import app as flask_app
+    from asgi import app as asgi_app
+
+    url, stop = start_flask(flask_app)
+    flask_wall = report(f"Flask, {FLASK_THREADS} threads", url)
+    stop()
+
+    url, stop = start_asgi(asgi_app)
+    asgi_wall = report("ASGI, 1 event loop", url)
+    stop()
+
+    fake_llm.stop()
+    print()
+    print(f"Concurrent-stream capacity gain: {flask_wall / asgi_wall:.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Concurrent feedback submissions: write throughput of the append-only store
+and a check that no submission is lost, compared with the previous
+one-file-per-second layout.
+
+Runs offline against temporary directories.
+    python -m benchmarks.load_feedback_writes [submissions] [threads]
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from benchmarks.fakes import use_offline_retrieval
+
+SUBMISSIONS = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+THREADS = int(sys.argv[2]) if len(sys.argv) > 2 else 16
+
+def feedback(i):
+    return {
+        "visitor_name": f"Visitor {i}",
+        "visit_date": "2030-01-01",
+        "responses": {
+            "How would you rate your overall museum experience?": {"rating": 1 + i % 5},
+            "What aspects of your visit could be improved?": {"text": "More benches in the galleries."}
+        }
+    }
+
+def legacy_save(feedback_dir, feedback_data):
+    """The previous save_feedback: one file per second of submission."""
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    with open(f"{feedback_dir}/feedback_{timestamp}.json", 'w') as f:
+        json.dump(feedback_data, f, indent=2)
+
+def run(submit):
+    """Submit SUBMISSIONS from THREADS threads; return submissions/s."""
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=THREADS) as pool:
+        list(pool.map(submit, range(SUBMISSIONS)))
+    return SUBMISSIONS / (time.perf_counter() - start)
+
+def main():
+    """Compare the legacy files with the store, directly and over HTTP."""
+    os.environ["FEEDBACK_DIR"] = tempfile.mkdtemp()
+    use_offline_retrieval()
+
+    from helpers.feedback_store import FeedbackStore
+    from helpers.feedback_queue import get_feedback_queue
+    from main import app
+
+    print("=== Feedback Write Load Test ===")
+    print(f"{SUBMISSIONS} submissions from {THREADS} threads")
+    print()
+
+    legacy_dir = tempfile.mkdtemp()
+    rate = run(lambda i: legacy_save(legacy_dir, feedback(i)))
+    print(f"legacy files:       {rate:8.0f} /s, {len(os.listdir(legacy_dir))} of {SUBMISSIONS} kept")
+
+    for fsync in (False, True):
+        store = FeedbackStore(os.path.join(tempfile.mkdtemp(), "feedback.jsonl"), fsync=fsync)
+        rate = run(lambda i: store.append(feedback(i)))
+        ids = {record["id"] for record in store}
+        print(f"store, fsync {'on ' if fsync else 'off'}:  {rate:8.0f} /s, {len(ids)} of {SUBMISSIONS} kept")
+        store.close()
+
+    client = app.test_client()
+    start = time.perf_counter()
+    latencies = []
+    def submit(i):
+        sent = time.perf_counter()
+        response = client.post("/api/museum/feedback", json=feedback(i))
+        latencies.append(time.perf_counter() - sent)
+        assert response.status_code == 202, response.status_code
+    rate = run(submit)
+    get_feedback_queue().drain()
+    elapsed = time.perf_counter() - start
+    summary = client.get("/api/museum/feedback/summary").get_json()
+    latencies.sort()
+    print(f"POST /api/museum/feedback: {rate:8.0f} /s accepted, p50 {latencies[len(latencies) // 2] * 1000:.2f} ms, "
+          f"{SUBMISSIONS / elapsed:.0f} /s stored, {summary['total_feedback']} of {SUBMISSIONS} kept")
+
+if __name__ == "__main__":
+    main()
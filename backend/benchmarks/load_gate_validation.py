@@ -0,0 +1,76 @@
+"""
+Load generator for gate validation: batch throughput on one core, replay
+rejection, and how long a restart takes to replay the used-ticket log.
+
+Runs offline against a temporary log, both directly and through the Flask
+batch endpoint.
+    python -m benchmarks.load_gate_validation [tickets] [batch_size]
+"""
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks.fakes import use_offline_retrieval
+
+TICKETS = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+BATCH_SIZE = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+# The rate the gate scanners need to sustain per core
+TARGET_RATE = 2000
+
+def run_batches(validate, tokens):
+    """Validate all tokens in batches; return (admitted, validations/s)."""
+    admitted = 0
+    start = time.perf_counter()
+    for i in range(0, len(tokens), BATCH_SIZE):
+        admitted += validate(tokens[i:i + BATCH_SIZE])
+    return admitted, len(tokens) / (time.perf_counter() - start)
+
+def report(name, tokens, validate):
+    admitted, rate = run_batches(validate, tokens)
+    replayed, replay_rate = run_batches(validate, tokens)
+    status = "ok" if rate >= TARGET_RATE else f"below {TARGET_RATE}/s"
+    print(f"{name}:")
+    print(f"  first pass:  {admitted:6d} admitted, {rate:9.0f} validations/s ({status})")
+    print(f"  second pass: {replayed:6d} admitted, {replay_rate:9.0f} validations/s")
+    assert admitted == len(tokens) and replayed == 0
+
+def main():
+    """Issue tickets, then scan every ticket twice."""
+    log_dir = tempfile.mkdtemp()
+    os.environ["GATE_LOG_PATH"] = os.path.join(log_dir, "used_tickets.log")
+    use_offline_retrieval()
+
+    from helpers import gate_helper
+    from helpers.ticket_token import issue_token
+    from main import app
+
+    print("=== Gate Validation Load Test ===")
+    print(f"{TICKETS} tickets, {BATCH_SIZE} scans per batch, fsync {'on' if gate_helper.GATE_LOG_FSYNC else 'off'}")
+    print()
+
+    direct_tokens = [issue_token("Adult", "2030-01-01", 25.0) for _ in range(TICKETS)]
+    http_tokens = [issue_token("Adult", "2030-01-01", 25.0) for _ in range(TICKETS)]
+
+    report("validate_scans", direct_tokens, lambda scans: sum(
+        result['valid'] for result in gate_helper.validate_scans(scans, gate="bench")
+    ))
+
+    client = app.test_client()
+    report("POST /api/museum/tickets/validate/batch", http_tokens, lambda scans: client.post(
+        "/api/museum/tickets/validate/batch", json={"scans": scans, "gate": "bench"}
+    ).get_json()["admitted"])
+
+    # A restart replays the log and still rejects every ticket
+    gate_helper.get_used_ticket_index().close()
+    start = time.perf_counter()
+    index = gate_helper.UsedTicketIndex(os.environ["GATE_LOG_PATH"])
+    replay_time = time.perf_counter() - start
+    results = gate_helper.validate_scans(direct_tokens[:BATCH_SIZE] + http_tokens[:BATCH_SIZE], index=index)
+    print()
+    print(f"restart: replayed {index.stats()['used_tickets']} tickets in {replay_time * 1000:.1f} ms, "
+          f"{sum(not result['valid'] for result in results)}/{len(results)} rescans rejected")
+    index.close()
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,70 @@
 from helpers.chat_helper import ChatHelper
-from services.llm_model import get_llm_model
-from helpers.storage_helper import get_or_create_vectorstore
+from services.llm_model import get_chain, aclose_retired
+from helpers.storage_helper import get_vectorstore, get_document_id, embeddings
+from helpers.response_cache import ResponseCache, replay_chunks
+from helpers.museum_catalog import get_catalog
+from helpers.intent_router import intent_router
+from helpers.hybrid_retriever import hybrid_retriever
+from helpers.prompt_budget import PromptBudget, count_tokens
+from helpers.log_helper import get_logger, anonymize
 from constance.prompts import SYSTEM_PROMPT, HUMAN_PROMPT
-from langchain.chains import LLMChain
-from typing import Generator, Union
+from typing import AsyncGenerator, Generator, Union
+import asyncio
 import os
+import time
 from dotenv import load_dotenv
 
 load_dotenv()
 
 api_key = os.getenv("GROQ_API_KEY")
 
+logger = get_logger(__name__)
+
+# Keeps long conversations inside llama3-8b-8192's context window
+prompt_budget = PromptBudget()
+PROMPT_TEMPLATE_TOKENS = count_tokens(SYSTEM_PROMPT) + count_tokens(HUMAN_PROMPT) + count_tokens("Previous conversation:")
+
+# Hours, price and guide language questions are answered from the catalog
+INTENT_ROUTER_ENABLED = os.getenv("INTENT_ROUTER_ENABLED", "true").lower() == "true"
+
+# "hybrid" fuses keyword and vector search with type filters and adaptive k;
+# "vector" keeps the plain top-2 similarity search
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "hybrid").lower()
+
+# Opt-in answer cache for FAQ-style questions
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "false").lower() == "true"
+response_cache = ResponseCache(
+    threshold=float(os.getenv("RESPONSE_CACHE_THRESHOLD", "0.95")),
+    max_entries=int(os.getenv("RESPONSE_CACHE_SIZE", "512")),
+)
+
+def has_prior_turns(chat_history: list) -> bool:
+    """Checks whether the conversation already has an assistant reply."""
+    return any(message.get("role") == "assistant" for message in chat_history)
+
+class _Turn:
+    """Everything one chat turn needs between retrieval and saving the reply."""
+
+    __slots__ = (
+        "chat_helper", "session_id", "user_input", "messages", "cache_key", "answer",
+        "intent", "chain", "payload", "started", "log_fields",
+    )
+
+    def __init__(self, chat_helper, session_id, user_input, messages):
+        self.chat_helper = chat_helper
+        self.session_id = session_id
+        self.user_input = user_input
+        self.messages = messages
+        self.cache_key = None
+        # Set when the turn is answered without the LLM, from the cache or the router
+        self.answer = None
+        self.intent = None
+        self.chain = None
+        self.payload = None
+        self.started = time.perf_counter()
+        # Sizes and decisions only; visitor text never goes to the log
+        self.log_fields = {"session": anonymize(session_id), "query_chars": len(user_input)}
+
 def get_response(
     user_input: str,
     session_id: str,
@@ -29,50 +83,149 @@ def get_response(
     Returns:
         Union[str, Generator[str, None, None]]: A response string or a generator for streamed output.
     """
+    turn = _prepare_turn(user_input, session_id, messages)
 
-    # Load vectorstore and retrieve top-k relevant context
-    vectorstore = get_or_create_vectorstore()
-    results = vectorstore.similarity_search(user_input, k=2)
-    context = "\n".join([doc.page_content for doc in results])
+    if turn.answer is not None:
+        if stream:
+            return _replay_response(turn)
+        _finish_turn(turn, turn.answer)
+        return turn.answer
 
-    # Get the Groq LLM model
-    llm = get_llm_model(
-        model_name="llama3-8b-8192", 
-        temperature=0.5, 
-        api_key=api_key
-    )
+    # Stream or generate full response
+    if stream:
+        return _stream_response(turn)
+
+    response = turn.chain.invoke(turn.payload)
+    response = response.get("output_text", "") if isinstance(response, dict) else getattr(response, "content", str(response))
+    _finish_turn(turn, response)
+    return response
+
+async def aget_response(user_input: str, session_id: str, messages: list = None) -> str:
+    """
+    Async variant of get_response for the non-streaming ASGI endpoint.
 
+    Blocking retrieval and session store work runs in a worker thread; the
+    LLM call itself is awaited on the event loop.
+    """
+    turn = await asyncio.to_thread(_prepare_turn, user_input, session_id, messages)
+
+    if turn.answer is not None:
+        response = turn.answer
+    else:
+        response = await turn.chain.ainvoke(turn.payload)
+        response = getattr(response, "content", str(response))
+
+    await asyncio.to_thread(_finish_turn, turn, response)
+    # Clients retired by a key rotation are closed on the loop that used them
+    await aclose_retired()
+    return response
+
+async def astream_response(user_input: str, session_id: str, messages: list = None) -> AsyncGenerator[str, None]:
+    """
+    Async variant of get_response(stream=True) built on the chain's astream.
+
+    Yields:
+        str: Response chunks as the model produces them.
+    """
+    turn = await asyncio.to_thread(_prepare_turn, user_input, session_id, messages)
+
+    if turn.answer is not None:
+        for chunk in replay_chunks(turn.answer):
+            yield chunk
+        response = turn.answer
+    else:
+        parts = []
+        async for chunk in turn.chain.astream(turn.payload):
+            parts.append(chunk.content)
+            yield chunk.content
+        turn.log_fields["chunks"] = len(parts)
+        response = "".join(parts)
+
+    await asyncio.to_thread(_finish_turn, turn, response)
+    await aclose_retired()
+
+def _prepare_turn(user_input, session_id, messages) -> _Turn:
     # Initialize the ChatHelper with system and human prompts
     chat_helper = ChatHelper(system_prompt=SYSTEM_PROMPT, human_prompt=HUMAN_PROMPT)
+    turn = _Turn(chat_helper, session_id, user_input, messages)
+
+    chat_history = messages if messages else chat_helper.get_memory_list(session_id)
+
+    # Catalog questions skip retrieval and the LLM altogether; follow-ups
+    # ("and on Sunday?") need the conversation, so they go to the chain
+    if INTENT_ROUTER_ENABLED and not has_prior_turns(chat_history):
+        route = intent_router.route(user_input)
+        if route is not None:
+            turn.answer = route.answer
+            turn.intent = route.intent
+            return turn
+
+    # Embed the question once and retrieve top-k relevant context from the shared vectorstore
+    vectorstore = get_vectorstore()
+    query_vector = embeddings.embed_query(user_input)
+    if RETRIEVAL_MODE == "hybrid":
+        results, plan = hybrid_retriever.retrieve(user_input, query_vector, vectorstore)
+        turn.log_fields["retrieval"] = {"types": list(plan.types), "k": plan.k}
+    else:
+        results = vectorstore.similarity_search_by_vector(query_vector, k=2)
+    context = "\n".join([doc.page_content for doc in results])
+    turn.log_fields["context_ids"] = [get_document_id(doc) for doc in results]
 
-    # Compose the full chain
-    chain = chat_helper.prompt | llm
+    # Fresh FAQ-style questions may be answered from the cache
+    if RESPONSE_CACHE_ENABLED and not has_prior_turns(chat_history):
+        turn.cache_key = (query_vector, turn.log_fields["context_ids"], get_catalog().version)
+        turn.answer = response_cache.lookup(*turn.cache_key)
+        if turn.answer is not None:
+            return turn
+
+    # Reuse the cached chain and its pooled Groq client
+    turn.chain = get_chain(
+        chat_helper.prompt,
+        model_name="llama3-8b-8192",
+        temperature=0.5,
+        api_key=api_key
+    )
+
+    # Fit the history into the tokens left after the prompt, context and question
+    fixed_tokens = PROMPT_TEMPLATE_TOKENS + count_tokens(context) + count_tokens(user_input)
+    chat_history, budget_report = prompt_budget.fit(fixed_tokens, chat_history)
+    turn.log_fields.update(budget_report)
 
     # Prepare payload for the chain
-    payload = {
+    turn.payload = {
         "query": user_input,
         "context": context,
-        "chat_history": messages if messages else chat_helper.get_memory_list(session_id)
+        "chat_history": chat_history
     }
+    return turn
 
-    print("Payload:", payload)
+def _stream_response(turn):
+    # Collect chunks in a list and join once; += is quadratic on long answers
+    parts = []
+    for chunk in turn.chain.stream(turn.payload):
+        parts.append(chunk.content)
+        yield chunk.content
+    turn.log_fields["chunks"] = len(parts)
 
-    # Stream or generate full response
-    if stream:
-        response = ""
-        for chunk in chain.stream(payload):
-            response += chunk.content
-            yield chunk.content
-        print("Stream ended")
-    else:
-        response = chain.invoke(payload)
+    _finish_turn(turn, "".join(parts))
+
+def _replay_response(turn):
+    yield from replay_chunks(turn.answer)
+    _finish_turn(turn, turn.answer)
+
+def _finish_turn(turn, response):
+    if turn.cache_key is not None and turn.answer is None:
+        response_cache.store(*turn.cache_key, response)
 
     # Store the chat in memory if not using external messages
-    if not messages:
-        chat_helper.add_user_message(session_id, user_input)
-        chat_helper.add_assistant_message(session_id, response)
-        print("Updated Memory:", chat_helper.get_memory_list(session_id))
-
-    # Return final response
-    if not stream:
-        return response.get("output_text", "") if isinstance(response, dict) else str(response)
+    if not turn.messages:
+        turn.chat_helper.add_user_message(turn.session_id, turn.user_input)
+        turn.chat_helper.add_assistant_message(turn.session_id, response)
+
+    turn.log_fields.update({
+        "cached": turn.cache_key is not None and turn.answer is not None,
+        "intent": turn.intent,
+        "response_chars": len(response),
+        "duration_ms": round((time.perf_counter() - turn.started) * 1000, 1),
+    })
+    logger.info("chat turn", extra={"fields": turn.log_fields})
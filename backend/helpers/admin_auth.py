@@ -0,0 +1,26 @@
+"""
+Token check for the /api/admin routes.
+
+Admin routes reload and re-index the vectorstore, rebuild aggregates and
+expose internal stats, so they fail closed: with no ADMIN_TOKEN configured
+every admin request is refused. Tokens are compared in constant time.
+"""
+from typing import Optional, Tuple
+import hmac
+
+def check_admin_token(supplied: Optional[str], expected: Optional[str]) -> Optional[Tuple[str, int]]:
+    """
+    Check the token sent with an admin request.
+
+    Args:
+        supplied (str): The X-Admin-Token header, if any.
+        expected (str): The configured ADMIN_TOKEN, if any.
+
+    Returns:
+        tuple: (error message, HTTP status) when the request is refused, None when allowed.
+    """
+    if not expected:
+        return "Admin routes are disabled until ADMIN_TOKEN is set", 403
+    if supplied is None or not hmac.compare_digest(supplied.encode("utf-8"), expected.encode("utf-8")):
+        return "Unauthorized", 401
+    return None
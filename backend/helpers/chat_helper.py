@@ -1,54 +1,70 @@
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Tuple
 from langchain.prompts import ChatPromptTemplate
+from helpers.session_store import SessionStore, create_session_store, USER, ASSISTANT
 
 class ChatHistory:
-    """Manages chat messages with session-based storage."""
+    """Manages chat messages with session-based storage in the configured session store."""
     
-    _store: Dict[str, List[Dict[str, str]]] = {}
+    _store: SessionStore = create_session_store()
 
     def __init__(self, session_id: str):
         self.session_id = session_id
-        if session_id not in self._store:
-            self._store[session_id] = []
 
     def add_user_message(self, message: str):
         """Stores user message under the session."""
-        self._store[self.session_id].append({"role": "user", "content": message})
+        self._store.append(self.session_id, USER, message)
 
     def add_assistant_message(self, message: str):
         """Stores assistant message under the session."""
-        self._store[self.session_id].append({"role": "assistant", "content": message})
+        self._store.append(self.session_id, ASSISTANT, message)
 
     def get_chat_history(self) -> List[Dict[str, str]]:
         """Retrieves chat history for the session."""
-        return self._store.get(self.session_id, [])
-    
-    
+        messages, summary = self._store.get(self.session_id)
+        history = [{"role": role, "content": content} for role, content in messages]
+        if summary:
+            history.insert(0, {"role": "system", "content": f"Earlier in this conversation the user asked: {summary}"})
+        return history
 
     @classmethod
     def clear_session(cls, session_id: str):
         """Clears history for a specific session."""
-        if session_id in cls._store:
-            del cls._store[session_id]
+        cls._store.clear(session_id)
 
     @classmethod
     def clear_all(cls):
         """Clears all stored chat histories."""
-        cls._store.clear()
+        cls._store.clear_all()
+
+    @classmethod
+    def stats(cls) -> Dict[str, int]:
+        """Reports session counts and approximate memory usage of the store."""
+        return cls._store.stats()
 
 
 class ChatHelper:
     """Handles chat prompts and memory retrieval."""
     
+    _prompts: Dict[Tuple[str, str], ChatPromptTemplate] = {}
+
     def __init__(self, system_prompt: str, human_prompt: str):
         self.system_prompt = system_prompt
         self.human_prompt = human_prompt
+        self.prompt = self.get_prompt(system_prompt, human_prompt)
 
-        self.prompt = ChatPromptTemplate.from_messages([
-            ("system", self.system_prompt),
-            ("system", "Previous conversation:\n{chat_history}"),
-            ("human", self.human_prompt),
-        ])
+    @classmethod
+    def get_prompt(cls, system_prompt: str, human_prompt: str) -> ChatPromptTemplate:
+        """Returns the compiled prompt template, building it once per prompt pair."""
+        key = (system_prompt, human_prompt)
+        prompt = cls._prompts.get(key)
+        if prompt is None:
+            prompt = ChatPromptTemplate.from_messages([
+                ("system", system_prompt),
+                ("system", "Previous conversation:\n{chat_history}"),
+                ("human", human_prompt),
+            ])
+            prompt = cls._prompts.setdefault(key, prompt)
+        return prompt
 
     def get_memory_string(self, session_id: str) -> str:
         """Returns chat history as a formatted string."""
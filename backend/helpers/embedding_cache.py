@@ -0,0 +1,175 @@
+"""
+Query embedding cache sitting in front of the vectorstore embedding function.
+"""
+from langchain_core.embeddings import Embeddings
+from collections import OrderedDict
+from array import array
+from typing import Dict, List, Optional
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+
+_whitespace = re.compile(r"\s+")
+
+def normalize_query(text: str) -> str:
+    """
+    Normalize a user query so trivially different phrasings share a cache key.
+
+    Args:
+        text (str): The raw user text.
+
+    Returns:
+        str: NFKC-normalized, case-folded text with collapsed whitespace and
+        trailing punctuation removed.
+    """
+    text = unicodedata.normalize("NFKC", text).casefold()
+    text = _whitespace.sub(" ", text).strip()
+    return text.rstrip(" ?!.。？！")
+
+class CachedEmbeddings(Embeddings):
+    """
+    Wraps an embedding model with an in-memory LRU and an optional SQLite tier.
+
+    Only query embeddings are cached; document embeddings go straight to the
+    wrapped model since they are computed once at index time.
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        model_name: str,
+        max_entries: int = 1024,
+        ttl: float = 86400,
+        disk_path: Optional[str] = None,
+        disk_max_entries: int = 100000,
+    ):
+        self.embeddings = embeddings
+        self.model_name = model_name
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.disk_max_entries = disk_max_entries
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._disk_hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._disk = None
+        self._disk_writes = 0
+        if disk_path:
+            self._open_disk(disk_path)
+
+    def _open_disk(self, disk_path: str):
+        os.makedirs(os.path.dirname(disk_path) or ".", exist_ok=True)
+        self._disk = sqlite3.connect(disk_path, check_same_thread=False)
+        self._disk.execute("PRAGMA journal_mode=WAL")
+        self._disk.execute(
+            "CREATE TABLE IF NOT EXISTS query_embeddings ("
+            "model TEXT NOT NULL, text TEXT NOT NULL, vector BLOB NOT NULL, "
+            "created_at REAL NOT NULL, PRIMARY KEY (model, text))"
+        )
+        self._disk.execute(
+            "CREATE INDEX IF NOT EXISTS query_embeddings_created ON query_embeddings (created_at)"
+        )
+        self._disk.commit()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embeds documents with the wrapped model, bypassing the cache."""
+        return self.embeddings.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        """
+        Embeds a query, serving repeated questions from the cache.
+
+        The normalized text is only the cache key; on a miss the model
+        embeds the query as the visitor wrote it.
+        """
+        key = normalize_query(text)
+        now = time.time()
+
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._memory.move_to_end(key)
+                    self._hits += 1
+                    return list(entry[1])
+                del self._memory[key]
+                self._evictions += 1
+
+        vector = self._disk_get(key, now)
+        if vector is not None:
+            with self._lock:
+                self._disk_hits += 1
+                self._remember(key, vector, now)
+            return list(vector)
+
+        vector = self.embeddings.embed_query(text)
+        with self._lock:
+            self._misses += 1
+            self._remember(key, vector, now)
+        self._disk_put(key, vector, now)
+        return list(vector)
+
+    def _remember(self, key: str, vector: List[float], now: float):
+        # Caller holds self._lock
+        self._memory[key] = (now + self.ttl, tuple(vector))
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self._evictions += 1
+
+    def _disk_get(self, key: str, now: float) -> Optional[List[float]]:
+        if self._disk is None:
+            return None
+        with self._lock:
+            row = self._disk.execute(
+                "SELECT vector, created_at FROM query_embeddings WHERE model = ? AND text = ?",
+                (self.model_name, key),
+            ).fetchone()
+        if row is None or row[1] + self.ttl <= now:
+            return None
+        return array("d", row[0]).tolist()
+
+    def _disk_put(self, key: str, vector: List[float], now: float):
+        if self._disk is None:
+            return
+        with self._lock:
+            self._disk.execute(
+                "INSERT OR REPLACE INTO query_embeddings (model, text, vector, created_at) VALUES (?, ?, ?, ?)",
+                (self.model_name, key, array("d", vector).tobytes(), now),
+            )
+            self._disk_writes += 1
+            # Evict expired and overflow rows every so often rather than per write
+            if self._disk_writes % 100 == 0:
+                self._disk.execute("DELETE FROM query_embeddings WHERE created_at <= ?", (now - self.ttl,))
+                self._disk.execute(
+                    "DELETE FROM query_embeddings WHERE rowid IN ("
+                    "SELECT rowid FROM query_embeddings ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+                    (self.disk_max_entries,),
+                )
+            self._disk.commit()
+
+    def stats(self) -> Dict[str, float]:
+        """Returns hit/miss counters and the current cache size."""
+        with self._lock:
+            lookups = self._hits + self._disk_hits + self._misses
+            return {
+                "hits": self._hits,
+                "disk_hits": self._disk_hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "entries": len(self._memory),
+                "hit_rate": (self._hits + self._disk_hits) / lookups if lookups else 0.0,
+            }
+
+    def clear(self):
+        """Drops every cached embedding from memory and disk."""
+        with self._lock:
+            self._memory.clear()
+            if self._disk is not None:
+                self._disk.execute("DELETE FROM query_embeddings WHERE model = ?", (self.model_name,))
+                self._disk.commit()
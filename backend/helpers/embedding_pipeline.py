@@ -0,0 +1,346 @@
+"""
+Batched, parallel embedding for index builds.
+
+A single add_texts call sends every changed document to the embedding
+server in one serial request: fine for the museum records, but a catalog of
+tens of thousands of chunks would run for minutes with no progress, and one
+failure would lose all of it. The pipeline instead:
+
+- splits the documents into batches of EMBEDDING_BATCH_SIZE,
+- keeps at most EMBEDDING_CONCURRENCY batches at the server at a time,
+- retries a batch that failed on a transport error, a 5xx or a 429 up to
+  EMBEDDING_MAX_RETRIES times with exponential backoff and jitter,
+- saves embedded vectors every INDEX_CHECKPOINT_SIZE documents, logging
+  progress in documents per second,
+- writes everything to the vectorstore once, at the end.
+
+Checkpoints are segment files in INDEX_CHECKPOINT_DIRECTORY, each holding
+one checkpoint's IDs, text hashes and vectors, so checkpoint I/O grows
+linearly with the build. Writing them to the vectorstore instead would
+rewrite a NumPy index on every checkpoint. After a crash the next run
+reuses every checkpointed vector whose text is unchanged and embeds only
+the rest; the segments are removed once the vectorstore has been written.
+
+Segments are kept in a subdirectory per embedding model and target store,
+and each one records both, so a build never resumes from vectors another
+model computed or that were meant for another index. Builds into the same
+store are serialized by helpers/indexer.py.
+"""
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, List, Optional, Tuple
+import glob
+import hashlib
+import os
+import random
+import threading
+import time
+import httpx
+import numpy as np
+from helpers.log_helper import get_logger
+
+logger = get_logger(__name__)
+
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "32"))
+EMBEDDING_CONCURRENCY = int(os.getenv("EMBEDDING_CONCURRENCY", "4"))
+EMBEDDING_MAX_RETRIES = int(os.getenv("EMBEDDING_MAX_RETRIES", "3"))
+# Seconds before the first retry; doubles on every further attempt
+EMBEDDING_RETRY_BACKOFF = float(os.getenv("EMBEDDING_RETRY_BACKOFF", "0.5"))
+INDEX_CHECKPOINT_SIZE = int(os.getenv("INDEX_CHECKPOINT_SIZE", "512"))
+INDEX_CHECKPOINT_DIRECTORY = os.getenv("INDEX_CHECKPOINT_DIRECTORY", "db/embedding_checkpoint")
+# Documents per Chroma upsert, below chromadb's max_batch_size
+CHROMA_UPSERT_BATCH = 4096
+
+def is_retryable(error: Exception) -> bool:
+    """
+    Whether an embedding request failed in a way a retry can fix.
+
+    Transport errors, timeouts, 5xx responses and 429s are retried; a 4xx
+    or any other error (a bad model name, malformed input) is not.
+
+    Args:
+        error (Exception): The error raised by the embedding model.
+
+    Returns:
+        bool: True for transient failures.
+    """
+    if isinstance(error, (httpx.TransportError, ConnectionError, TimeoutError)):
+        return True
+    # httpx.HTTPStatusError carries the response; ollama.ResponseError the status code
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return isinstance(status, int) and (status == 429 or status >= 500)
+
+def text_hash(text: str) -> str:
+    """Short hash telling whether a checkpointed vector still matches its text."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+def embedding_model_name(embeddings) -> str:
+    """Name of an embedding model, e.g. "nomic-embed-text", for keying checkpoints."""
+    # CachedEmbeddings has model_name, OllamaEmbeddings model
+    return str(getattr(embeddings, "model_name", None) or getattr(embeddings, "model", None) or type(embeddings).__name__)
+
+def vectorstore_name(vectorstore) -> str:
+    """Where a vectorstore keeps its index, for keying checkpoints."""
+    if hasattr(vectorstore, "directory"):
+        return f"numpy:{os.path.abspath(vectorstore.directory)}"
+    collection = getattr(vectorstore, "_collection", None)
+    if collection is not None:
+        return f"chroma:{os.path.abspath(getattr(vectorstore, '_persist_directory', None) or '')}:{collection.name}"
+    return type(vectorstore).__name__
+
+def upsert_embeddings(vectorstore, ids: List[str], texts: List[str], vectors: List[List[float]], metadatas: List[Dict]):
+    """
+    Write documents with already computed embeddings to a vectorstore.
+
+    Args:
+        vectorstore: A NumpyVectorStore, or any store with add_embeddings, or Chroma.
+        ids (list): Document IDs; existing ones are replaced.
+        texts (list): Document texts.
+        vectors (list): One embedding per text.
+        metadatas (list): One metadata dict per text.
+    """
+    if hasattr(vectorstore, "add_embeddings"):
+        vectorstore.add_embeddings(texts, vectors, metadatas=metadatas, ids=ids)
+        return
+    # langchain's Chroma only takes texts, so this goes to the chromadb collection
+    # it wraps, as its add_texts does. Chroma._collection is private API: checked
+    # against langchain-community==0.0.13 and chromadb==0.4.18 (requirements.txt),
+    # re-check when upgrading either.
+    for start in range(0, len(ids), CHROMA_UPSERT_BATCH):
+        end = start + CHROMA_UPSERT_BATCH
+        vectorstore._collection.upsert(ids=ids[start:end], embeddings=vectors[start:end], metadatas=metadatas[start:end], documents=texts[start:end])
+
+class EmbeddingCheckpoint:
+    """
+    Vectors embedded by an unfinished build, as numbered segment files.
+
+    Args:
+        directory (str): Directory for the segment files of every build.
+        model (str): Embedding model that computed the vectors.
+        store (str): Vectorstore they are meant for, see vectorstore_name.
+    """
+
+    def __init__(self, directory: str = INDEX_CHECKPOINT_DIRECTORY, model: str = "", store: str = ""):
+        self.model = model
+        self.store = store
+        key = hashlib.sha256(f"{model}\0{store}".encode("utf-8")).hexdigest()[:16]
+        self.directory = os.path.join(directory, key)
+
+    def _segments(self) -> List[str]:
+        return sorted(glob.glob(os.path.join(self.directory, "segment-*.npz")))
+
+    def load(self) -> Dict[str, Tuple[str, np.ndarray]]:
+        """
+        Read every saved segment.
+
+        Returns:
+            dict: Document ID -> (text hash, vector); later segments win.
+        """
+        saved = {}
+        for path in self._segments():
+            with np.load(path) as segment:
+                # Segments from before they were keyed have no header
+                if "model" not in segment.files or str(segment["model"]) != self.model or str(segment["store"]) != self.store:
+                    logger.warning("Ignoring checkpoint segment of another build", extra={"fields": {"path": path}})
+                    continue
+                for document_id, digest, vector in zip(segment["ids"], segment["hashes"], segment["vectors"]):
+                    saved[str(document_id)] = (str(digest), vector)
+        return saved
+
+    def write(self, ids: List[str], hashes: List[str], vectors: List[List[float]]):
+        """Save one checkpoint's vectors as a new segment, atomically."""
+        if not ids:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        segments = self._segments()
+        number = int(os.path.basename(segments[-1])[len("segment-"):-len(".npz")]) + 1 if segments else 0
+        path = os.path.join(self.directory, f"segment-{number:06d}.npz")
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(
+                f, model=np.array(self.model), store=np.array(self.store),
+                ids=np.array(ids), hashes=np.array(hashes), vectors=np.asarray(vectors, dtype=np.float32),
+            )
+        os.replace(tmp_path, path)
+
+    def clear(self):
+        """Remove every segment."""
+        for path in self._segments():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        try:
+            os.rmdir(self.directory)
+        except OSError:
+            pass
+
+class EmbeddingPipeline:
+    """
+    Embeds documents in parallel batches, checkpoints them and writes them to a vectorstore.
+
+    Args:
+        batch_size (int): Texts per embedding request.
+        concurrency (int): Embedding requests in flight at once.
+        max_retries (int): Retries of a failed batch before giving up.
+        backoff (float): Seconds before the first retry, doubled on each attempt.
+        checkpoint_size (int): Documents embedded between checkpoints.
+        checkpoint_directory (str): Where checkpoints are saved, per model and store.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = EMBEDDING_BATCH_SIZE,
+        concurrency: int = EMBEDDING_CONCURRENCY,
+        max_retries: int = EMBEDDING_MAX_RETRIES,
+        backoff: float = EMBEDDING_RETRY_BACKOFF,
+        checkpoint_size: int = INDEX_CHECKPOINT_SIZE,
+        checkpoint_directory: str = INDEX_CHECKPOINT_DIRECTORY,
+    ):
+        self.batch_size = max(1, batch_size)
+        self.concurrency = max(1, concurrency)
+        self.max_retries = max(0, max_retries)
+        self.backoff = backoff
+        self.checkpoint_size = max(1, checkpoint_size)
+        self.checkpoint_directory = checkpoint_directory
+
+    def checkpoint_for(self, vectorstore, embeddings=None) -> EmbeddingCheckpoint:
+        """
+        The checkpoint of a build into a vectorstore.
+
+        Args:
+            vectorstore: The vectorstore being built.
+            embeddings (Embeddings): Model embedding it; the vectorstore's by default.
+
+        Returns:
+            EmbeddingCheckpoint: Segments saved by earlier runs of the same build.
+        """
+        embeddings = embeddings or vectorstore.embeddings
+        return EmbeddingCheckpoint(self.checkpoint_directory, embedding_model_name(embeddings), vectorstore_name(vectorstore))
+
+    def _embed_batch(self, embeddings, texts: List[str]) -> Tuple[List[List[float]], int]:
+        for attempt in range(self.max_retries + 1):
+            try:
+                return embeddings.embed_documents(texts), attempt
+            except Exception as e:
+                if attempt == self.max_retries or not is_retryable(e):
+                    raise
+                delay = self.backoff * 2 ** attempt * random.uniform(0.5, 1.5)
+                logger.warning("Embedding batch failed, retrying", extra={"fields": {
+                    "texts": len(texts), "attempt": attempt + 1, "delay": round(delay, 3), "error": str(e),
+                }})
+                time.sleep(delay)
+
+    def run(
+        self,
+        vectorstore,
+        ids: List[str],
+        texts: List[str],
+        metadatas: List[Dict],
+        embeddings=None,
+        on_progress: Optional[Callable[[int, int, float], None]] = None,
+    ) -> Dict:
+        """
+        Embed documents and upsert them into a vectorstore.
+
+        Documents embedded before a failure are checkpointed before the
+        error is raised, so a retried run only embeds what is left.
+
+        Args:
+            vectorstore: The vectorstore to write to.
+            ids (list): Document IDs.
+            texts (list): Document texts.
+            metadatas (list): Document metadata.
+            embeddings (Embeddings): Model to embed with; the vectorstore's by default.
+            on_progress (callable): Called with (done, total, docs/sec) after each checkpoint.
+
+        Returns:
+            dict: Documents embedded and resumed from a checkpoint, batches,
+            retries, checkpoints, seconds and docs/sec.
+        """
+        embeddings = embeddings or vectorstore.embeddings
+        segments = self.checkpoint_for(vectorstore, embeddings)
+        total = len(ids)
+        start_time = time.perf_counter()
+        stats = {"embedded": 0, "resumed": 0, "batches": 0, "retries": 0, "checkpoints": 0}
+        hashes = [text_hash(text) for text in texts]
+
+        # Vectors checkpointed by an interrupted run, if their text is unchanged
+        vectors: List[Optional[List[float]]] = [None] * total
+        saved = segments.load()
+        for i, document_id in enumerate(ids):
+            hit = saved.get(document_id)
+            if hit is not None and hit[0] == hashes[i]:
+                vectors[i] = hit[1].tolist()
+        stats["resumed"] = total - vectors.count(None)
+        pending = [i for i, vector in enumerate(vectors) if vector is None]
+        batches = iter(range(0, len(pending), self.batch_size))
+        buffered: List[int] = []
+
+        def checkpoint():
+            if not buffered:
+                return
+            segments.write([ids[i] for i in buffered], [hashes[i] for i in buffered], [vectors[i] for i in buffered])
+            buffered.clear()
+            stats["checkpoints"] += 1
+            rate = stats["embedded"] / max(time.perf_counter() - start_time, 1e-9)
+            logger.info("Embedding progress", extra={"fields": {
+                "embedded": stats["embedded"], "resumed": stats["resumed"], "total": total,
+                "docs_per_sec": round(rate, 1), "retries": stats["retries"],
+            }})
+            if on_progress:
+                on_progress(stats["embedded"] + stats["resumed"], total, rate)
+
+        def collect(start, batch_vectors):
+            positions = pending[start:start + self.batch_size]
+            for i, vector in zip(positions, batch_vectors):
+                vectors[i] = vector
+            buffered.extend(positions)
+            stats["embedded"] += len(positions)
+
+        # The pool bounds requests at the server; a short queue keeps it busy during checkpoints
+        pool = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="embed")
+        in_flight = {}
+
+        def submit_next():
+            start = next(batches, None)
+            if start is not None:
+                batch_texts = [texts[i] for i in pending[start:start + self.batch_size]]
+                in_flight[pool.submit(self._embed_batch, embeddings, batch_texts)] = start
+
+        try:
+            for _ in range(2 * self.concurrency):
+                submit_next()
+            while in_flight:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    start = in_flight.pop(future)
+                    batch_vectors, retries = future.result()
+                    collect(start, batch_vectors)
+                    stats["batches"] += 1
+                    stats["retries"] += retries
+                    submit_next()
+                if len(buffered) >= self.checkpoint_size:
+                    checkpoint()
+            pool.shutdown(wait=True)
+            upsert_embeddings(vectorstore, ids, texts, vectors, metadatas)
+        except BaseException:
+            # Keep what finished; a rerun embeds only the rest
+            pool.shutdown(wait=True, cancel_futures=True)
+            for future, start in in_flight.items():
+                if not future.cancelled() and future.exception() is None:
+                    collect(start, future.result()[0])
+            checkpoint()
+            raise
+        segments.clear()
+
+        stats["seconds"] = time.perf_counter() - start_time
+        stats["docs_per_sec"] = stats["embedded"] / max(stats["seconds"], 1e-9)
+        logger.info("Embedding finished", extra={"fields": {
+            "embedded": stats["embedded"], "resumed": stats["resumed"], "total": total,
+            "docs_per_sec": round(stats["docs_per_sec"], 1), "retries": stats["retries"],
+        }})
+        return stats
+
+embedding_pipeline = EmbeddingPipeline()
@@ -0,0 +1,237 @@
+"""
+Running feedback aggregates for the summary endpoint.
+
+Totals, per-day and per-question buckets are updated as each record is
+appended to the feedback store, so a summary never rescans the log. The
+aggregates are snapshotted to FEEDBACK_DIR/aggregates.json together with
+the log byte offset they cover; on start-up only records appended after
+that offset are replayed. They can be rebuilt from the log at any time.
+
+Every worker process keeps its own aggregates over the whole shared log:
+the store passes each process the records the others appended, and
+summary() takes those in before answering. Any worker's snapshot is
+therefore valid for the log up to its offset, whichever worker wrote it.
+"""
+from typing import Dict, Optional
+import json
+import os
+import threading
+from helpers.feedback_store import FeedbackStore, FEEDBACK_DIR, get_feedback_store
+from helpers.log_helper import get_logger
+
+logger = get_logger(__name__)
+
+AGGREGATES_PATH = os.path.join(FEEDBACK_DIR, "aggregates.json")
+# Snapshot after this many new records; the rest is replayed from the log
+SAVE_EVERY = int(os.getenv("FEEDBACK_AGGREGATES_SAVE_EVERY", "50"))
+SNAPSHOT_VERSION = 2
+
+def _bucket() -> Dict:
+    return {
+        'count': 0,
+        'polarity_sum': 0.0,
+        'subjectivity_sum': 0.0,
+        'sentiment_counts': {'positive': 0, 'neutral': 0, 'negative': 0},
+    }
+
+def _add_sentiment(bucket: Dict, sentiment: Dict):
+    bucket['count'] += 1
+    bucket['polarity_sum'] += sentiment.get('polarity', 0)
+    bucket['subjectivity_sum'] += sentiment.get('subjectivity', 0)
+    label = sentiment.get('sentiment', 'neutral')
+    bucket['sentiment_counts'][label] = bucket['sentiment_counts'].get(label, 0) + 1
+
+def _merge(target: Dict, bucket: Dict):
+    target['count'] += bucket['count']
+    target['polarity_sum'] += bucket['polarity_sum']
+    target['subjectivity_sum'] += bucket['subjectivity_sum']
+    for label, count in bucket['sentiment_counts'].items():
+        target['sentiment_counts'][label] = target['sentiment_counts'].get(label, 0) + count
+
+def _empty_state() -> Dict:
+    # offset: log bytes covered; records: how many records that is
+    return {'offset': 0, 'records': 0, 'total': _bucket(), 'days': {}, 'questions': {}}
+
+def _add_record(state: Dict, record: Dict):
+    state['records'] += 1
+    sentiment = record.get('overall_sentiment') or {}
+    _add_sentiment(state['total'], sentiment)
+    day = (record.get('timestamp') or '')[:10]
+    if day:
+        _add_sentiment(state['days'].setdefault(day, _bucket()), sentiment)
+
+    for question, answer in (record.get('responses') or {}).items():
+        bucket = state['questions'].setdefault(question, {**_bucket(), 'rating_sum': 0, 'rating_count': 0})
+        if isinstance(answer, dict):
+            _add_sentiment(bucket, answer.get('sentiment') or {})
+            if isinstance(answer.get('rating'), (int, float)):
+                bucket['rating_sum'] += answer['rating']
+                bucket['rating_count'] += 1
+        else:
+            _add_sentiment(bucket, {})
+
+def _averages(bucket: Dict) -> Dict:
+    count = bucket['count']
+    counts = bucket['sentiment_counts']
+    return {
+        'total_feedback': count,
+        'average_sentiment': max(counts, key=counts.get) if count else 'neutral',
+        'average_polarity': bucket['polarity_sum'] / count if count else 0,
+        'average_subjectivity': bucket['subjectivity_sum'] / count if count else 0,
+        'sentiment_distribution': dict(counts),
+    }
+
+class FeedbackAggregates:
+    """
+    Aggregates kept in step with a feedback store.
+
+    Args:
+        store (FeedbackStore): The store to follow.
+        path (str): Snapshot file.
+    """
+
+    def __init__(self, store: FeedbackStore, path: str = AGGREGATES_PATH):
+        self.store = store
+        self.path = path
+        self._lock = threading.Lock()
+        # Serializes snapshot writes so an older snapshot never replaces a newer one
+        self._save_lock = threading.Lock()
+        self._saving = False
+        self._state = self._load()
+        self._unsaved = 0
+
+        with store.writes_paused():
+            if self._state['offset'] > store.offset():
+                logger.warning("Feedback aggregates are ahead of the log, rebuilding")
+                self._state = _empty_state()
+            # Catch up on records appended after the last snapshot
+            replayed = 0
+            for offset, record in store.read_from(self._state['offset']):
+                _add_record(self._state, record)
+                self._state['offset'] = offset
+                replayed += 1
+            store.subscribe(self.add)
+        if replayed:
+            self.save()
+        logger.info("Loaded feedback aggregates", extra={"fields": {"records": self._state['records'], "replayed": replayed}})
+
+    def _load(self) -> Dict:
+        if not os.path.exists(self.path):
+            return _empty_state()
+        try:
+            with open(self.path, "r") as f:
+                snapshot = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            logger.warning("Unreadable feedback aggregates snapshot, rebuilding")
+            return _empty_state()
+        if snapshot.get('version') != SNAPSHOT_VERSION:
+            return _empty_state()
+        return snapshot['state']
+
+    def add(self, record: Dict):
+        """
+        Fold one new record into the aggregates.
+
+        Runs while the store blocks appends, so a due snapshot is written
+        from a background thread rather than here.
+        """
+        with self._lock:
+            _add_record(self._state, record)
+            self._state['offset'] = self.store.offset()
+            self._unsaved += 1
+            due = self._unsaved >= SAVE_EVERY and not self._saving
+            if due:
+                self._saving = True
+        if due:
+            threading.Thread(target=self._background_save, name="feedback-aggregates-save", daemon=True).start()
+
+    def _background_save(self):
+        # Records added while a snapshot was being written are caught up here
+        while True:
+            try:
+                self.save()
+            except OSError:
+                logger.exception("Failed to save feedback aggregates snapshot")
+                with self._lock:
+                    self._saving = False
+                return
+            with self._lock:
+                if self._unsaved < SAVE_EVERY:
+                    self._saving = False
+                    return
+
+    def save(self):
+        """Write a snapshot atomically; only the copy of the state holds the lock."""
+        with self._save_lock:
+            with self._lock:
+                data = json.dumps({'version': SNAPSHOT_VERSION, 'state': self._state})
+                self._unsaved = 0
+            tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w") as f:
+                f.write(data)
+            os.replace(tmp_path, self.path)
+
+    def rebuild(self) -> int:
+        """
+        Recompute the aggregates from the raw log.
+
+        Returns:
+            int: Number of records aggregated.
+        """
+        state = _empty_state()
+        with self.store.writes_paused():
+            for offset, record in self.store.read_from(0):
+                _add_record(state, record)
+                state['offset'] = offset
+            with self._lock:
+                self._state = state
+        self.save()
+        return state['records']
+
+    def summary(self, date_from: Optional[str] = None, date_to: Optional[str] = None) -> Dict:
+        """
+        Summarize all feedback, or the feedback submitted between two dates.
+
+        Args:
+            date_from (str): First day (YYYY-MM-DD), inclusive.
+            date_to (str): Last day (YYYY-MM-DD), inclusive.
+
+        Returns:
+            dict: Counts, averages and sentiment distribution.
+        """
+        # Take in what other workers appended since this one last wrote
+        self.store.refresh()
+        with self._lock:
+            if date_from is None and date_to is None:
+                summary = _averages(self._state['total'])
+                summary['questions'] = {
+                    question: {
+                        **_averages(bucket),
+                        'average_rating': bucket['rating_sum'] / bucket['rating_count'] if bucket['rating_count'] else None,
+                    }
+                    for question, bucket in self._state['questions'].items()
+                }
+                return summary
+
+            total = _bucket()
+            for day, bucket in self._state['days'].items():
+                if (date_from is None or day >= date_from) and (date_to is None or day <= date_to):
+                    _merge(total, bucket)
+        return _averages(total)
+
+_aggregates = None
+_aggregates_lock = threading.Lock()
+
+def get_feedback_aggregates() -> FeedbackAggregates:
+    """
+    Get the process-wide aggregates for the shared feedback store.
+
+    Returns:
+        FeedbackAggregates: The shared aggregates.
+    """
+    global _aggregates
+    if _aggregates is None:
+        with _aggregates_lock:
+            if _aggregates is None:
+                _aggregates = FeedbackAggregates(get_feedback_store())
+    return _aggregates
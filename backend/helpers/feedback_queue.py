@@ -0,0 +1,307 @@
+"""
+Background ingestion of visitor feedback.
+
+The feedback endpoint stamps and enqueues a submission and answers at once
+with its ID. Worker threads take submissions off the queue in batches,
+score them with analyze_feedback_batch and append each batch to the
+feedback store with one write. A full queue is reported to the caller
+instead of piling up requests, and shutdown drains whatever is still
+queued.
+
+A batch the store refuses is retried with exponential backoff. If it still
+can't be stored it is appended to FEEDBACK_SPILL_PATH and reported as
+deferred; the spilled records are stored when the next queue starts.
+"""
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List, Optional
+import atexit
+import json
+import os
+import queue
+import random
+import threading
+import time
+import uuid
+from helpers.feedback_store import FEEDBACK_DIR
+from helpers.sentiment_helper import analyze_feedback_batch, save_feedback_batch
+from helpers.log_helper import get_logger
+
+logger = get_logger(__name__)
+
+FEEDBACK_QUEUE_SIZE = int(os.getenv("FEEDBACK_QUEUE_SIZE", "1000"))
+FEEDBACK_QUEUE_WORKERS = int(os.getenv("FEEDBACK_QUEUE_WORKERS", "2"))
+FEEDBACK_BATCH_SIZE = int(os.getenv("FEEDBACK_BATCH_SIZE", "32"))
+FEEDBACK_DRAIN_TIMEOUT = float(os.getenv("FEEDBACK_DRAIN_TIMEOUT", "30"))
+# Submissions whose status can still be looked up
+FEEDBACK_STATUS_SIZE = int(os.getenv("FEEDBACK_STATUS_SIZE", "10000"))
+FEEDBACK_SAVE_RETRIES = int(os.getenv("FEEDBACK_SAVE_RETRIES", "3"))
+# Seconds before the first retry of a failed save; doubles on every further attempt
+FEEDBACK_SAVE_BACKOFF = float(os.getenv("FEEDBACK_SAVE_BACKOFF", "0.5"))
+# Analyzed submissions that could not be stored, one JSON line each
+FEEDBACK_SPILL_PATH = os.getenv("FEEDBACK_SPILL_PATH", os.path.join(FEEDBACK_DIR, "pending.jsonl"))
+
+QUEUED = "queued"
+PROCESSING = "processing"
+STORED = "stored"
+DEFERRED = "deferred"
+FAILED = "failed"
+
+_STOP = object()
+
+class QueueFull(Exception):
+    """Raised when a submission arrives while the queue is full or closed."""
+
+class FeedbackQueue:
+    """
+    Bounded feedback queue with a pool of worker threads.
+
+    Args:
+        max_size (int): Submissions that may wait before callers are turned away.
+        workers (int): Worker threads.
+        batch_size (int): Most submissions a worker processes at once.
+        spill_path (str): File for batches the store refused; replayed on start.
+    """
+
+    def __init__(
+        self,
+        max_size: int = FEEDBACK_QUEUE_SIZE,
+        workers: int = FEEDBACK_QUEUE_WORKERS,
+        batch_size: int = FEEDBACK_BATCH_SIZE,
+        spill_path: str = FEEDBACK_SPILL_PATH,
+    ):
+        self.batch_size = batch_size
+        self.spill_path = spill_path
+        self._spill_lock = threading.Lock()
+        self._queue = queue.Queue(maxsize=max_size)
+        self._statuses: "OrderedDict[str, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._closed = False
+        self._rejected = 0
+        self._spilled = 0
+        self.replay_spilled()
+        self._workers = [
+            threading.Thread(target=self._run, name=f"feedback-worker-{i}", daemon=True)
+            for i in range(workers)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def submit(self, feedback_data: Dict) -> str:
+        """
+        Stamp a submission with an ID and receive time and enqueue it.
+
+        Args:
+            feedback_data (dict): Validated feedback with a 'responses' dict.
+
+        Returns:
+            str: The submission ID.
+
+        Raises:
+            QueueFull: If the queue is full or shutting down.
+        """
+        feedback_id = uuid.uuid4().hex
+        feedback_data['id'] = feedback_id
+        feedback_data['timestamp'] = datetime.now().isoformat()
+        with self._lock:
+            if self._closed:
+                self._rejected += 1
+                raise QueueFull("Feedback queue is shutting down")
+            try:
+                self._queue.put_nowait(feedback_data)
+            except queue.Full:
+                self._rejected += 1
+                raise QueueFull("Feedback queue is full")
+            self._set_status(feedback_id, {'status': QUEUED})
+        return feedback_id
+
+    def status(self, feedback_id: str) -> Optional[Dict]:
+        """Return the status of a recent submission, or None if unknown."""
+        with self._lock:
+            status = self._statuses.get(feedback_id)
+            return dict(status) if status is not None else None
+
+    def _set_status(self, feedback_id: str, status: Dict):
+        # Caller holds self._lock
+        self._statuses[feedback_id] = status
+        self._statuses.move_to_end(feedback_id)
+        while len(self._statuses) > FEEDBACK_STATUS_SIZE:
+            self._statuses.popitem(last=False)
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                self._queue.task_done()
+                return
+            batch, stop = [item], False
+            while len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                    break
+                batch.append(item)
+
+            self._process(batch)
+            for _ in range(len(batch) + stop):
+                self._queue.task_done()
+            if stop:
+                return
+
+    def _process(self, batch: List[Dict]):
+        with self._lock:
+            for feedback_data in batch:
+                self._set_status(feedback_data['id'], {'status': PROCESSING})
+        try:
+            analyze_feedback_batch(batch)
+        except Exception as e:
+            logger.exception("Feedback batch analysis failed", extra={"fields": {"batch": len(batch)}})
+            error = str(e)
+            result = lambda feedback_data: {'status': FAILED, 'error': error}
+        else:
+            status = self._save(batch)
+            result = lambda feedback_data: {'status': status, 'overall_sentiment': feedback_data['overall_sentiment']}
+        with self._lock:
+            for feedback_data in batch:
+                self._set_status(feedback_data['id'], result(feedback_data))
+
+    def _save(self, batch: List[Dict]) -> str:
+        for attempt in range(FEEDBACK_SAVE_RETRIES + 1):
+            try:
+                save_feedback_batch(batch)
+                return STORED
+            except Exception as e:
+                if attempt == FEEDBACK_SAVE_RETRIES:
+                    logger.exception("Feedback batch could not be stored", extra={"fields": {"batch": len(batch)}})
+                    break
+                delay = FEEDBACK_SAVE_BACKOFF * 2 ** attempt * random.uniform(0.5, 1.5)
+                logger.warning("Feedback batch save failed, retrying", extra={"fields": {
+                    "batch": len(batch), "attempt": attempt + 1, "delay": round(delay, 3), "error": str(e),
+                }})
+                time.sleep(delay)
+        try:
+            self._spill(batch)
+        except OSError:
+            logger.exception("Feedback batch could not be spilled", extra={"fields": {"batch": len(batch)}})
+            return FAILED
+        return DEFERRED
+
+    def _spill(self, batch: List[Dict]):
+        lines = "".join(json.dumps(feedback_data, ensure_ascii=False) + "\n" for feedback_data in batch)
+        with self._spill_lock:
+            os.makedirs(os.path.dirname(self.spill_path) or ".", exist_ok=True)
+            with open(self.spill_path, "a", encoding="utf-8") as f:
+                f.write(lines)
+                f.flush()
+                os.fsync(f.fileno())
+            self._spilled += len(batch)
+        logger.warning("Spilled feedback batch", extra={"fields": {"batch": len(batch), "path": self.spill_path}})
+
+    def replay_spilled(self) -> int:
+        """
+        Store the submissions spilled by an earlier run.
+
+        The spill file is renamed before it is read, so only one process
+        replays it; if the store still refuses them they are spilled again.
+
+        Returns:
+            int: Submissions stored.
+        """
+        replay_path = f"{self.spill_path}.{os.getpid()}.replay"
+        try:
+            os.rename(self.spill_path, replay_path)
+        except FileNotFoundError:
+            return 0
+        batch = []
+        with open(replay_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    batch.append(json.loads(line))
+                except json.JSONDecodeError:
+                    # A torn last line from a crash mid-spill
+                    logger.warning("Dropping partial spilled feedback record")
+        stored = 0
+        try:
+            if batch:
+                save_feedback_batch(batch)
+                stored = len(batch)
+        except Exception:
+            logger.exception("Spilled feedback could not be stored", extra={"fields": {"batch": len(batch)}})
+            try:
+                self._spill(batch)
+            except OSError:
+                logger.exception("Spilled feedback kept for recovery", extra={"fields": {"path": replay_path}})
+                return 0
+        os.remove(replay_path)
+        if stored:
+            logger.info("Stored spilled feedback", extra={"fields": {"stored": stored}})
+        return stored
+
+    def drain(self):
+        """Block until every submission queued so far has been processed."""
+        self._queue.join()
+
+    def shutdown(self, timeout: float = FEEDBACK_DRAIN_TIMEOUT) -> bool:
+        """
+        Stop accepting submissions, process what is queued and stop the workers.
+
+        Args:
+            timeout (float): Seconds to wait for the queue to drain.
+
+        Returns:
+            bool: True if every queued submission was processed in time.
+        """
+        with self._lock:
+            if self._closed:
+                return True
+            self._closed = True
+            pending = self._queue.qsize()
+        logger.info("Draining feedback queue", extra={"fields": {"pending": pending}})
+        # Stop markers queue up behind the pending submissions
+        for _ in self._workers:
+            self._queue.put(_STOP)
+        for worker in self._workers:
+            worker.join(timeout)
+        drained = not any(worker.is_alive() for worker in self._workers)
+        if not drained:
+            logger.warning("Feedback queue did not drain in time", extra={"fields": {"pending": self._queue.qsize()}})
+        return drained
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'queued': self._queue.qsize(),
+                'max_size': self._queue.maxsize,
+                'workers': len(self._workers),
+                'rejected': self._rejected,
+                'spilled': self._spilled,
+                'closed': self._closed,
+            }
+
+_feedback_queue = None
+_feedback_queue_lock = threading.Lock()
+
+def get_feedback_queue() -> FeedbackQueue:
+    """
+    Get the process-wide feedback queue, starting its workers on first use.
+
+    The queue is drained when the interpreter exits.
+
+    Returns:
+        FeedbackQueue: The shared queue.
+    """
+    global _feedback_queue
+    if _feedback_queue is None:
+        with _feedback_queue_lock:
+            if _feedback_queue is None:
+                _feedback_queue = FeedbackQueue()
+                atexit.register(shutdown_feedback_queue)
+    return _feedback_queue
+
+def shutdown_feedback_queue():
+    """Drain and stop the shared queue, if it was started."""
+    if _feedback_queue is not None:
+        _feedback_queue.shutdown()
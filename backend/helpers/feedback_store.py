@@ -0,0 +1,289 @@
+"""
+Append-only storage for visitor feedback.
+
+Every submission is one JSON line in FEEDBACK_DIR/feedback.jsonl with a
+unique ID. Writers append under a lock and then wait for an fsync;
+concurrent writers share one fsync (group commit), so durability costs one
+disk flush per burst rather than one per submission.
+
+Appends are idempotent: a record whose ID is already in the log is not
+written again and subscribers don't see it twice, so a caller can retry a
+write whose fsync failed.
+
+Several worker processes can append to the same log. Appends hold an
+exclusive flock on it, and each process first reads what the others
+appended since it last looked and passes those records to its
+subscribers, so every process sees the whole log in log order. refresh()
+does the same catch-up for readers that don't write.
+
+The per-submission feedback_*.json files written by earlier versions are
+imported once, on first use. They stay where they are (some are tracked in
+git); the imported file names are recorded in FEEDBACK_DIR/legacy_migrated.json.
+"""
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Tuple
+import fcntl
+import glob
+import json
+import os
+import threading
+import uuid
+from helpers.log_helper import get_logger
+
+logger = get_logger(__name__)
+
+FEEDBACK_DIR = os.getenv("FEEDBACK_DIR", "db/feedback")
+FEEDBACK_LOG_PATH = os.path.join(FEEDBACK_DIR, "feedback.jsonl")
+FEEDBACK_FSYNC = os.getenv("FEEDBACK_FSYNC", "true").lower() == "true"
+LEGACY_MARKER_FILE = "legacy_migrated.json"
+
+class FeedbackStore:
+    """
+    JSONL log of feedback records.
+
+    Args:
+        path (str): Log file path.
+        fsync (bool): Wait for the record to reach the disk before returning.
+    """
+
+    def __init__(self, path: str = FEEDBACK_LOG_PATH, fsync: bool = FEEDBACK_FSYNC):
+        self.path = path
+        self.fsync = fsync
+        # Reentrant so code holding writes_paused() can still read the log
+        self._lock = threading.RLock()
+        self._sync_lock = threading.Lock()
+        self._subscribers = []
+        self._written = 0
+        self._synced = 0
+        self._ids = set()
+        self._count = 0
+        # Bytes of the log this process has read or written
+        self._offset = 0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(path, "a+b")
+        with self._log_locked():
+            # No writer holds the lock, so a partial last record is left by a
+            # crash; drop it so appends stay aligned
+            size = os.fstat(self._file.fileno()).st_size
+            self._catch_up()
+            if self._offset < size:
+                logger.warning("Dropping partial feedback record", extra={"fields": {"bytes": size - self._offset}})
+                self._file.truncate(self._offset)
+
+    @contextmanager
+    def _log_locked(self):
+        # The thread lock orders this process's writers; flock orders processes
+        with self._lock:
+            fcntl.flock(self._file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(self._file, fcntl.LOCK_UN)
+
+    def _catch_up(self):
+        # Take in complete records appended since the last call, by any
+        # process, and pass them to the subscribers. Callers hold self._lock.
+        self._file.seek(self._offset)
+        data = self._file.read()
+        end = data.rfind(b"\n") + 1
+        for line in data[:end].splitlines(keepends=True):
+            self._offset += len(line)
+            record = json.loads(line)
+            if record.get("id") in self._ids:
+                continue
+            self._ids.add(record.get("id"))
+            self._count += 1
+            for callback in self._subscribers:
+                callback(record)
+
+    def append(self, record: Dict) -> str:
+        """
+        Store a feedback record, assigning it an ID if it has none.
+
+        Args:
+            record (dict): The feedback; an 'id' key is added in place.
+
+        Returns:
+            str: The record ID.
+        """
+        return self.append_many([record])[0]
+
+    def append_many(self, records: List[Dict]) -> List[str]:
+        """
+        Store several feedback records with a single write and sync.
+
+        Records whose ID is already stored are skipped, but the call still
+        waits until they are synced.
+
+        Args:
+            records (list): Feedback dicts; each gets an 'id' if it has none.
+
+        Returns:
+            list: The record IDs, in order.
+        """
+        for record in records:
+            record.setdefault("id", uuid.uuid4().hex)
+        with self._log_locked():
+            self._catch_up()
+            new, seen = [], set()
+            for record in records:
+                if record["id"] not in self._ids and record["id"] not in seen:
+                    seen.add(record["id"])
+                    new.append(record)
+            if new:
+                lines = [(json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8") for record in new]
+                # Flushed before the flock is released, so other processes can read it
+                self._file.write(b"".join(lines))
+                self._file.flush()
+                self._ids.update(seen)
+                self._written += len(new)
+                self._count += len(new)
+                for record, line in zip(new, lines):
+                    self._offset += len(line)
+                    for callback in self._subscribers:
+                        callback(record)
+            # Includes earlier writes whose sync failed
+            ticket = self._written
+        self._sync(ticket)
+        return [record["id"] for record in records]
+
+    def _sync(self, ticket: int):
+        # Whoever holds the sync lock flushes everything written so far, so
+        # writers that queued behind it usually find their record already synced
+        with self._sync_lock:
+            if self._synced >= ticket:
+                return
+            with self._lock:
+                target = self._written
+            if self.fsync:
+                os.fsync(self._file.fileno())
+            self._synced = target
+
+    def __iter__(self) -> Iterator[Dict]:
+        """Iterate over stored records, oldest first."""
+        for _, record in self.read_from(0):
+            yield record
+
+    def read_from(self, offset: int) -> Iterator[Tuple[int, Dict]]:
+        """
+        Iterate over the records stored after a byte offset.
+
+        Args:
+            offset (int): A record boundary, e.g. an earlier value of offset().
+
+        Yields:
+            tuple: (offset just past the record, record).
+        """
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                offset += len(line)
+                yield offset, json.loads(line)
+
+    @contextmanager
+    def writes_paused(self):
+        """
+        Block appends from every process for the duration, e.g. to read a
+        consistent log. Records other processes appended are taken in first.
+        """
+        with self._log_locked():
+            self._catch_up()
+            yield
+
+    def refresh(self):
+        """Take in records other processes appended, calling the subscribers."""
+        with self._lock:
+            self._catch_up()
+
+    def subscribe(self, callback: Callable[[Dict], None]):
+        """
+        Call callback with every record appended from now on, in log order.
+
+        Callbacks run while appends are blocked, so they must be quick.
+        While one runs, offset() is the end of its record in the log.
+        """
+        with self._lock:
+            self._subscribers.append(callback)
+
+    def count(self) -> int:
+        """Number of stored records this process has seen."""
+        return self._count
+
+    def offset(self) -> int:
+        """Bytes of the log this process has seen."""
+        return self._offset
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+def migrate_legacy_files(store: FeedbackStore, feedback_dir: str = FEEDBACK_DIR) -> int:
+    """
+    Import per-submission JSON files into the store, leaving them in place.
+
+    Imported file names are recorded in a marker file so later starts skip
+    them. Imported records get the ID `legacy-<file name>`, so a migration
+    that was interrupted before the marker was written can be re-run
+    without duplicating anything.
+
+    Args:
+        store (FeedbackStore): Store to import into.
+        feedback_dir (str): Directory holding feedback_*.json files.
+
+    Returns:
+        int: Number of records imported.
+    """
+    marker_path = os.path.join(feedback_dir, LEGACY_MARKER_FILE)
+    migrated = set()
+    if os.path.exists(marker_path):
+        with open(marker_path, "r") as f:
+            migrated = set(json.load(f))
+    files = [
+        filename for filename in sorted(glob.glob(os.path.join(feedback_dir, "feedback_*.json")))
+        if os.path.basename(filename) not in migrated
+    ]
+    if not files:
+        return 0
+
+    existing = {record.get("id") for record in store}
+    imported = 0
+    for filename in files:
+        record_id = "legacy-" + os.path.splitext(os.path.basename(filename))[0]
+        if record_id not in existing:
+            with open(filename, "r") as f:
+                record = json.load(f)
+            record["id"] = record_id
+            store.append(record)
+            imported += 1
+        migrated.add(os.path.basename(filename))
+
+    tmp_path = f"{marker_path}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(sorted(migrated), f, indent=2)
+    os.replace(tmp_path, marker_path)
+
+    logger.info("Migrated legacy feedback files", extra={"fields": {"files": len(files), "imported": imported}})
+    return imported
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_feedback_store() -> FeedbackStore:
+    """
+    Get the process-wide feedback store, migrating legacy files on first use.
+
+    Returns:
+        FeedbackStore: The shared store.
+    """
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                store = FeedbackStore()
+                migrate_legacy_files(store)
+                _store = store
+    return _store
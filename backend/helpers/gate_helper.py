@@ -0,0 +1,183 @@
+"""
+Gate-side ticket admission with replay detection.
+
+A ticket admits one entry. Admitted ticket IDs are kept in an in-memory
+index, so a second scan is rejected in O(1), and appended to a log file.
+The log is replayed on start-up, so a restart doesn't let used tickets in
+again. Each batch of scans costs one write (and one fsync, if
+GATE_LOG_FSYNC is on).
+
+Several worker processes can share the log. A batch is admitted under an
+exclusive flock on the log, after reading whatever other processes
+appended since this one last looked, so a ticket admitted by one worker is
+rejected by all the others.
+"""
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+import fcntl
+import os
+import threading
+from helpers.qr_helper import validate_ticket_qr
+from helpers.log_helper import get_logger
+
+logger = get_logger(__name__)
+
+GATE_LOG_PATH = os.getenv("GATE_LOG_PATH", "db/gate/used_tickets.log")
+GATE_LOG_FSYNC = os.getenv("GATE_LOG_FSYNC", "true").lower() == "true"
+MAX_SCANS_PER_BATCH = int(os.getenv("GATE_MAX_SCANS_PER_BATCH", "1000"))
+
+def _clean(value: str) -> str:
+    # Keep legacy IDs and gate names from breaking the line format
+    return str(value).replace("\t", " ").replace("\n", " ")
+
+class UsedTicketIndex:
+    """
+    Set of admitted ticket IDs backed by an append-only log.
+
+    Log lines are `ticket_id<TAB>admitted_at<TAB>gate`.
+    """
+
+    def __init__(self, path: str = GATE_LOG_PATH, fsync: bool = GATE_LOG_FSYNC):
+        self.path = path
+        self.fsync = fsync
+        # ticket_id -> (admitted_at, gate)
+        self._used: Dict[str, tuple] = {}
+        # Bytes of the log already read into _used
+        self._offset = 0
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(path, "a+b")
+        with self._lock:
+            fcntl.flock(self._file, fcntl.LOCK_EX)
+            try:
+                # No writer holds the lock, so a partial last line is left by a
+                # crash; drop it so appends stay aligned
+                size = os.fstat(self._file.fileno()).st_size
+                self._catch_up()
+                if self._offset < size:
+                    logger.warning("Dropping partial gate log line", extra={"fields": {"bytes": size - self._offset}})
+                    self._file.truncate(self._offset)
+            finally:
+                fcntl.flock(self._file, fcntl.LOCK_UN)
+        logger.info("Replayed gate log", extra={"fields": {"used_tickets": len(self._used)}})
+
+    def _catch_up(self):
+        # Read complete lines appended since the last call, by any process.
+        # Callers hold self._lock.
+        self._file.seek(self._offset)
+        data = self._file.read()
+        end = data.rfind(b"\n") + 1
+        for line in data[:end].decode("utf-8").splitlines():
+            ticket_id, admitted_at, gate = (line.split("\t") + ["", ""])[:3]
+            if ticket_id:
+                self._used.setdefault(ticket_id, (admitted_at, gate))
+        self._offset += end
+
+    def get(self, ticket_id: str) -> Optional[tuple]:
+        """Return (admitted_at, gate) for a used ticket, or None."""
+        with self._lock:
+            self._catch_up()
+            return self._used.get(ticket_id)
+
+    def admit_many(self, ticket_ids: Iterable[str], gate: str = "") -> List[Optional[tuple]]:
+        """
+        Mark tickets as used, in order.
+
+        Args:
+            ticket_ids (Iterable[str]): IDs of tickets that passed validation.
+            gate (str): Name of the gate that scanned them.
+
+        Returns:
+            list: None for each ticket admitted now, or the (admitted_at, gate)
+            of its earlier entry if it was already used.
+        """
+        admitted_at = datetime.now().isoformat(timespec="seconds")
+        gate = _clean(gate)
+        results, lines = [], []
+        with self._lock:
+            fcntl.flock(self._file, fcntl.LOCK_EX)
+            try:
+                self._catch_up()
+                for ticket_id in map(_clean, ticket_ids):
+                    previous = self._used.get(ticket_id)
+                    if previous is None:
+                        self._used[ticket_id] = (admitted_at, gate)
+                        lines.append(f"{ticket_id}\t{admitted_at}\t{gate}\n")
+                    results.append(previous)
+                if lines:
+                    data = "".join(lines).encode("utf-8")
+                    self._file.write(data)
+                    self._file.flush()
+                    if self.fsync:
+                        os.fsync(self._file.fileno())
+                    self._offset += len(data)
+            finally:
+                fcntl.flock(self._file, fcntl.LOCK_UN)
+        return results
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._catch_up()
+            return {"used_tickets": len(self._used), "log_path": self.path}
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+_index = None
+_index_lock = threading.Lock()
+
+def get_used_ticket_index() -> UsedTicketIndex:
+    """
+    Get the process-wide used-ticket index, replaying the log on first use.
+
+    Returns:
+        UsedTicketIndex: The shared index.
+    """
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = UsedTicketIndex()
+    return _index
+
+def validate_scans(scans: List[str], gate: str = "", admit: bool = True, index: UsedTicketIndex = None) -> List[dict]:
+    """
+    Validate a batch of gate scans and admit the valid, unused tickets.
+
+    A ticket scanned twice in the same batch is admitted once.
+
+    Args:
+        scans (list): Ticket tokens read from QR codes.
+        gate (str): Name of the gate, recorded in the log.
+        admit (bool): If False, only report whether each ticket would be admitted.
+        index (UsedTicketIndex): Index to use; the shared one by default.
+
+    Returns:
+        list: One validation result per scan, in order.
+    """
+    index = index or get_used_ticket_index()
+    results = [validate_ticket_qr(qr_data) for qr_data in scans]
+    valid = [result for result in results if result['valid']]
+    ticket_ids = [result['ticket_data']['ticket_id'] for result in valid]
+
+    if admit:
+        previous = index.admit_many(ticket_ids, gate)
+    else:
+        seen = set()
+        previous = []
+        for ticket_id in ticket_ids:
+            previous.append(index.get(_clean(ticket_id)) or (("", "") if ticket_id in seen else None))
+            seen.add(ticket_id)
+
+    for result, used in zip(valid, previous):
+        if used is not None:
+            result.update({
+                'valid': False,
+                'message': 'Ticket has already been used',
+                'used_at': used[0],
+                'used_gate': used[1],
+            })
+    return results
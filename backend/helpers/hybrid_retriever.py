@@ -0,0 +1,302 @@
+"""
+Hybrid lexical + vector retrieval over the museum documents.
+
+Exhibit names, guide names and ticket types are exact tokens, which a BM25
+inverted index matches reliably where embeddings of short questions may
+not. Each query is searched both ways and the two rankings are merged with
+reciprocal-rank fusion (RRF).
+
+Before searching, a keyword classifier maps the query to the document types
+it is about (exhibit, ticket, offer, guide, tour, hours, museum_info). Both
+searches are restricted to those types, and the number of documents
+returned follows from them: one for the hours, two per entity type, and
+every document of the type for listing questions ("which exhibits...").
+
+The inverted index is built in process from the same documents the indexer
+writes to the vectorstore and is rebuilt when the catalog version changes.
+"""
+from collections import Counter
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+import math
+import os
+import re
+import threading
+from langchain.docstore.document import Document
+from helpers.indexer import museum_documents, get_document_id
+from helpers.intent_router import normalize, CUES, DAYS, RELATIVE_DAYS, TICKET_TYPE_NAMES, LANGUAGE_NAMES, HOURS, TICKET_PRICE
+from helpers.museum_catalog import MuseumCatalog, get_catalog
+
+# Candidates taken from each ranking before fusion
+RETRIEVAL_CANDIDATES = int(os.getenv("RETRIEVAL_CANDIDATES", "8"))
+# Documents returned when the query matches no type
+DEFAULT_K = int(os.getenv("RETRIEVAL_DEFAULT_K", "3"))
+MAX_K = int(os.getenv("RETRIEVAL_MAX_K", "6"))
+RRF_K = 60
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Documents returned per matched type
+K_BY_TYPE = {"hours": 1, "museum_info": 1, "offer": 1, "ticket": 2, "exhibit": 2, "guide": 2, "tour": 2}
+
+def _words(table: Dict) -> List[str]:
+    return [alias for names in table.values() for aliases in names.values() for alias in aliases]
+
+TYPE_CUES = {
+    "exhibit": [
+        "exhibit", "exhibits", "exhibition", "exhibitions", "gallery", "galleries", "collection", "collections",
+        "artifact", "artifacts", "painting", "paintings", "see", "floor",
+        "exposición", "exposiciones", "galería", "colección", "exposition", "galerie", "œuvre",
+        "ausstellung", "ausstellungen", "sammlung", "展览", "展品", "展厅", "展示", "展覧",
+    ],
+    "ticket": [word for words in CUES[TICKET_PRICE].values() for word in words] + _words(TICKET_TYPE_NAMES),
+    "offer": [
+        "discount", "discounts", "special offer", "deal", "deals", "free", "promotion", "cheaper", "pass",
+        "descuento", "descuentos", "oferta", "ofertas", "gratis", "réduction", "offre", "offres", "gratuit",
+        "rabatt", "ermäßigung", "angebot", "kostenlos", "优惠", "折扣", "免费", "割引", "無料",
+    ],
+    "guide": [
+        "guide", "guides", "speak", "speaks", "language", "languages", "guía", "guías", "hablan", "idioma", "idiomas",
+        "parle", "parlent", "langue", "langues", "führer", "spricht", "sprechen", "sprache", "sprachen",
+        "导游", "讲解员", "语言", "ガイド", "言語",
+    ] + _words(LANGUAGE_NAMES),
+    "tour": [
+        "tour", "tours", "guided", "visita guiada", "visitas guiadas", "visite guidée", "visites guidées",
+        "führung", "führungen", "导览", "ツアー",
+    ],
+    "hours": [word for words in CUES[HOURS].values() for word in words] + _words(DAYS) + _words(RELATIVE_DAYS),
+    "museum_info": [
+        "address", "where", "located", "location", "directions", "phone", "call", "email", "contact", "website",
+        "facilities", "facility", "parking", "wifi", "wi-fi", "cafe", "cafeteria", "restaurant", "restroom", "restrooms",
+        "toilet", "wheelchair", "accessible", "cloakroom", "shop", "dirección", "dónde", "teléfono", "adresse", "où",
+        "téléphone", "wo", "telefon", "地址", "电话", "在哪", "住所", "電話", "どこ",
+    ],
+}
+
+# Words asking for every document of a type
+LISTING_CUES = ["all", "list", "what", "which", "every", "any", "todos", "todas", "cuáles", "qué", "tous", "toutes", "quels", "quelles", "alle", "welche", "哪些", "所有", "どんな", "全部"]
+
+_token = re.compile(r"[\u3040-\u30ff\u3400-\u9fff]+|[^\W_]+")
+_cjk = re.compile(r"[\u3040-\u30ff\u3400-\u9fff]")
+
+def _stem(token: str) -> str:
+    # Fold simple plurals so "exhibits" and "exhibit" count together
+    if len(token) > 3 and token.endswith("s") and not token.endswith(("ss", "us", "is")):
+        return token[:-1]
+    return token
+
+def tokenize(text: str) -> List[str]:
+    """
+    Index terms of a text: folded words, plus character unigrams and bigrams
+    of Chinese and Japanese runs, which have no spaces.
+    """
+    terms = []
+    for token in _token.findall(normalize(text)):
+        if _cjk.match(token):
+            terms.extend(token)
+            terms.extend(token[i:i + 2] for i in range(len(token) - 1))
+        else:
+            terms.append(_stem(token))
+    return terms
+
+class QueryPlan(NamedTuple):
+    types: Tuple[str, ...]
+    k: int
+    listing: bool
+    terms: Tuple[str, ...] = ()
+
+    @property
+    def filter(self) -> Optional[Dict]:
+        """Chroma where clause restricting the search to the plan's types."""
+        if not self.types:
+            return None
+        if len(self.types) == 1:
+            return {"type": self.types[0]}
+        return {"type": {"$in": list(self.types)}}
+
+class _LexicalIndex:
+    """BM25 inverted index and query classifier for one catalog version."""
+
+    def __init__(self, catalog: MuseumCatalog):
+        self.version = catalog.version
+        self.documents = museum_documents(catalog)
+        self.ids = [get_document_id(document) for document in self.documents]
+        self.types = [document.metadata.get('type') for document in self.documents]
+        self.by_id = dict(zip(self.ids, self.documents))
+        self.type_counts = Counter(self.types)
+
+        # term -> [(document index, term frequency)]
+        self.postings: Dict[str, List[Tuple[int, int]]] = {}
+        self.lengths = []
+        for i, document in enumerate(self.documents):
+            terms = Counter(tokenize(document.page_content))
+            self.lengths.append(sum(terms.values()))
+            for term, count in terms.items():
+                self.postings.setdefault(term, []).append((i, count))
+        self.average_length = sum(self.lengths) / len(self.lengths)
+        total = len(self.documents)
+        self.idf = {
+            term: math.log(1 + (total - len(postings) + 0.5) / (len(postings) + 0.5))
+            for term, postings in self.postings.items()
+        }
+
+        # Phrase (as terms) -> document types. Chinese and Japanese cues are
+        # matched as substrings instead. Names of specific things are marked so
+        # "which guides speak Japanese" isn't taken as a request for every guide.
+        # Translated names also expand to the English name the documents use.
+        self.cues: Dict[Tuple[str, ...], set] = {}
+        self.cjk_cues: Dict[str, set] = {}
+        self.specific = set()
+        self.expansions: Dict[object, Tuple[str, ...]] = {}
+        for doc_type, words in TYPE_CUES.items():
+            for word in words:
+                self._add_cue(word, doc_type)
+        for table, doc_type in ((TICKET_TYPE_NAMES, "ticket"), (LANGUAGE_NAMES, "guide"), (DAYS, "hours")):
+            for canonical, names in table.items():
+                for word in (alias for aliases in names.values() for alias in aliases):
+                    self._add_cue(word, doc_type, specific=True, expansion=tuple(tokenize(canonical)))
+        for exhibit in catalog.exhibits:
+            for name in (exhibit['name'], *exhibit['highlights']):
+                self._add_cue(name, "exhibit", specific=True, words=True)
+        for guide in catalog.tour_guides:
+            self._add_cue(guide['name'], "guide", specific=True, words=True)
+        for tour in catalog.tour_types:
+            self._add_cue(tour['name'], "tour", specific=True)
+        for ticket in catalog.ticket_prices:
+            self._add_cue(ticket['type'], "ticket", specific=True)
+        self.max_phrase = max(len(phrase) for phrase in self.cues)
+        self.listing = {term for word in LISTING_CUES for term in tokenize(word)}
+
+    def _add_cue(self, text: str, doc_type: str, specific: bool = False, words: bool = False, expansion: Tuple[str, ...] = ()):
+        if _cjk.search(text):
+            key = normalize(text)
+            self.cjk_cues.setdefault(key, set()).add(doc_type)
+            if specific:
+                self.specific.add(key)
+            if expansion:
+                self.expansions[key] = expansion
+            return
+        terms = tuple(tokenize(text))
+        phrases = [terms] if terms else []
+        if words:
+            # Distinctive single words of a name ("dinosaur", "Johnson") are cues too
+            phrases.extend((term,) for term in terms if len(term) > 3)
+        for phrase in phrases:
+            self.cues.setdefault(phrase, set()).add(doc_type)
+            if specific:
+                self.specific.add(phrase)
+            if expansion:
+                self.expansions[phrase] = expansion
+
+    def plan(self, text: str, terms: List[str]) -> QueryPlan:
+        types, specific, expanded = set(), False, list(terms)
+        for length in range(1, self.max_phrase + 1):
+            for i in range(len(terms) - length + 1):
+                phrase = tuple(terms[i:i + length])
+                matched = self.cues.get(phrase)
+                if matched:
+                    types.update(matched)
+                    specific = specific or phrase in self.specific
+                    expanded.extend(self.expansions.get(phrase, ()))
+        if _cjk.search(text):
+            for cue, matched in self.cjk_cues.items():
+                if cue in text:
+                    types.update(matched)
+                    specific = specific or cue in self.specific
+                    expanded.extend(self.expansions.get(cue, ()))
+        listing = not specific and any(term in self.listing for term in terms)
+        ordered = tuple(doc_type for doc_type in K_BY_TYPE if doc_type in types)
+        if not ordered:
+            return QueryPlan((), DEFAULT_K, listing, tuple(expanded))
+        if listing and len(ordered) == 1:
+            k = self.type_counts[ordered[0]]
+        else:
+            k = sum(K_BY_TYPE[doc_type] for doc_type in ordered)
+        return QueryPlan(ordered, max(1, min(k, MAX_K)), listing, tuple(expanded))
+
+    def search(self, terms: List[str], types: Sequence[str], limit: int) -> List[int]:
+        scores: Dict[int, float] = {}
+        for term in set(terms):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for i, count in self.postings[term]:
+                if types and self.types[i] not in types:
+                    continue
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self.lengths[i] / self.average_length)
+                scores[i] = scores.get(i, 0.0) + idf * count * (BM25_K1 + 1) / (count + norm)
+        return sorted(scores, key=lambda i: (-scores[i], i))[:limit]
+
+def reciprocal_rank_fusion(rankings: List[List[str]], k: int = RRF_K) -> List[str]:
+    """
+    Merge rankings of document IDs by summing 1 / (k + rank) per ranking.
+
+    Args:
+        rankings (list): Lists of IDs, best first.
+        k (int): Damping constant; 60 is the usual choice.
+
+    Returns:
+        list: Every ID, best fused score first.
+    """
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, document_id in enumerate(ranking, start=1):
+            scores[document_id] = scores.get(document_id, 0.0) + 1.0 / (k + rank)
+    return sorted(scores, key=lambda document_id: -scores[document_id])
+
+class HybridRetriever:
+    """Fuses an in-process BM25 index with the vectorstore's similarity search."""
+
+    def __init__(self):
+        self._index: Optional[_LexicalIndex] = None
+        self._lock = threading.Lock()
+
+    def _current(self) -> _LexicalIndex:
+        catalog = get_catalog()
+        index = self._index
+        if index is None or index.version != catalog.version:
+            with self._lock:
+                index = self._index
+                if index is None or index.version != catalog.version:
+                    index = self._index = _LexicalIndex(catalog)
+        return index
+
+    def plan(self, query: str) -> QueryPlan:
+        """Document types and result count for a query."""
+        return self._current().plan(normalize(query), tokenize(query))
+
+    def retrieve(self, query: str, query_vector: List[float], vectorstore, k: Optional[int] = None) -> Tuple[List[Document], QueryPlan]:
+        """
+        Retrieve context documents for a question.
+
+        Args:
+            query (str): The visitor's question.
+            query_vector (list): The question's embedding.
+            vectorstore (Chroma): The vectorstore to search.
+            k (int): Documents to return; adapts to the query when omitted.
+
+        Returns:
+            tuple: The documents, best first, and the query plan used.
+        """
+        index = self._current()
+        plan = index.plan(normalize(query), tokenize(query))
+        if k is not None:
+            plan = plan._replace(k=k)
+
+        # Chroma can't return more neighbours than there are matching documents
+        available = sum(index.type_counts[doc_type] for doc_type in plan.types) if plan.types else len(index.documents)
+        candidates = min(max(RETRIEVAL_CANDIDATES, plan.k), available)
+
+        lexical = [index.ids[i] for i in index.search(plan.terms, plan.types, candidates)]
+        by_id = dict(index.by_id)
+        vector = []
+        for document in vectorstore.similarity_search_by_vector(query_vector, k=candidates, filter=plan.filter):
+            if plan.types and document.metadata.get('type') not in plan.types:
+                continue
+            document_id = get_document_id(document)
+            vector.append(document_id)
+            by_id[document_id] = document
+
+        fused = reciprocal_rank_fusion([lexical, vector])
+        return [by_id[document_id] for document_id in fused[:plan.k]], plan
+
+hybrid_retriever = HybridRetriever()
@@ -0,0 +1,228 @@
+"""
+Incremental indexing of the museum data into the vectorstore.
+
+Every document generated from the catalog gets a stable ID ("exhibit:exh-001",
+"ticket:Adult", "hours", ...) and a hash of its content and metadata, kept in
+its metadata. Re-indexing reads the stored hashes, embeds and upserts only
+the documents that are new or whose hash changed, and deletes documents
+whose record is gone. An unchanged catalog costs no embedding calls at all.
+
+Changed documents go through helpers/embedding_pipeline.py: batched,
+parallel, retried, and checkpointed to disk as they are embedded, so an
+interrupted build resumes where it stopped.
+
+Run from the backend directory to bring db/ up to date with museum_data:
+    python -m helpers.indexer [--dry-run] [--batch-size N] [--concurrency N]
+
+Re-indexes are serialized across processes with a lock file, so the CLI,
+the admin route and a worker building a missing index never embed and
+upsert the same documents at once.
+"""
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional
+import argparse
+import fcntl
+import hashlib
+import json
+import os
+import threading
+from langchain.docstore.document import Document
+from helpers.museum_catalog import MuseumCatalog, get_catalog
+from helpers.embedding_pipeline import EmbeddingPipeline, embedding_pipeline
+from helpers.log_helper import get_logger
+
+logger = get_logger(__name__)
+
+REINDEX_LOCK_PATH = os.getenv("REINDEX_LOCK_PATH", "db/reindex.lock")
+
+# One re-index at a time per process, so two hot reloads can't interleave upserts
+_reindex_lock = threading.Lock()
+
+@contextmanager
+def _reindexing():
+    # The thread lock orders this process's re-indexes; flock orders processes
+    with _reindex_lock:
+        directory = os.path.dirname(REINDEX_LOCK_PATH)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(REINDEX_LOCK_PATH, "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+def get_document_id(document: Document) -> str:
+    """
+    Build a stable identifier for a museum document from its metadata.
+
+    Args:
+        document (Document): A museum document, generated or returned by the vectorstore.
+
+    Returns:
+        str: An identifier such as "exhibit:exh-001" or "hours".
+    """
+    metadata = document.metadata or {}
+    key = metadata.get('id') or metadata.get('type_name') or metadata.get('name')
+    return f"{metadata.get('type')}:{key}" if key else str(metadata.get('type'))
+
+def content_hash(document: Document) -> str:
+    """Short hash of a document's text and metadata, ignoring any stored hash."""
+    metadata = {key: value for key, value in document.metadata.items() if key != 'content_hash'}
+    serialized = json.dumps({'content': document.page_content, 'metadata': metadata}, sort_keys=True)
+    return hashlib.sha256(serialized.encode()).hexdigest()[:16]
+
+def museum_documents(catalog: Optional[MuseumCatalog] = None) -> List[Document]:
+    """
+    Convert the museum data into vectorstore documents.
+
+    Args:
+        catalog (MuseumCatalog): Data to convert; the shared catalog by default.
+
+    Returns:
+        list: One document per record, each with a content_hash in its metadata.
+    """
+    catalog = catalog or get_catalog()
+    documents = []
+
+    # Add exhibits
+    for exhibit in catalog.exhibits:
+        content = f"Exhibit: {exhibit['name']}\nDescription: {exhibit['description']}\nLocation: {exhibit['location']}\nDuration: {exhibit['duration']}\nHighlights: {', '.join(exhibit['highlights'])}"
+        documents.append(Document(page_content=content, metadata={"type": "exhibit", "id": exhibit['id']}))
+
+    # Add ticket prices
+    for ticket in catalog.ticket_prices:
+        content = f"Ticket Type: {ticket['type']}\nPrice: ${ticket['price']}\nDescription: {ticket['description']}"
+        documents.append(Document(page_content=content, metadata={"type": "ticket", "type_name": ticket['type']}))
+
+    # Add special offers
+    for offer in catalog.special_offers:
+        content = f"Special Offer: {offer['name']}\nDescription: {offer['description']}\nValidity: {offer['validity']}"
+        documents.append(Document(page_content=content, metadata={"type": "offer", "name": offer['name']}))
+
+    # Add tour guides
+    for guide in catalog.tour_guides:
+        content = f"Tour Guide: {guide['name']}\nSpecialties: {', '.join(guide['specialties'])}\nLanguages: {', '.join(guide['languages'])}\nBio: {guide['bio']}"
+        documents.append(Document(page_content=content, metadata={"type": "guide", "id": guide['id']}))
+
+    # Add tour types
+    for tour in catalog.tour_types:
+        content = f"Tour Type: {tour['name']}\nDuration: {tour['duration']}\nDescription: {tour['description']}\nPrice: ${tour['price']}\nMax Group Size: {tour['max_group_size']}"
+        documents.append(Document(page_content=content, metadata={"type": "tour", "id": tour['id']}))
+
+    # Add museum info
+    info = catalog.museum_info
+    content = f"Museum: {info['name']}\nAddress: {info['address']}\nPhone: {info['phone']}\nEmail: {info['email']}\nWebsite: {info['website']}\nFacilities: {', '.join(info['facilities'])}"
+    documents.append(Document(page_content=content, metadata={"type": "museum_info"}))
+
+    # Add hours
+    hours_content = "Museum Hours:\n"
+    for day, hours in info['hours'].items():
+        hours_content += f"{day}: {hours}\n"
+    documents.append(Document(page_content=hours_content, metadata={"type": "hours"}))
+
+    for document in documents:
+        document.metadata['content_hash'] = content_hash(document)
+    return documents
+
+def stored_hashes(vectorstore) -> Dict[str, Optional[str]]:
+    """
+    Read the IDs and content hashes of the documents in a vectorstore.
+
+    Args:
+        vectorstore (Chroma): The vectorstore.
+
+    Returns:
+        dict: Document ID -> content hash, None for documents indexed
+        before hashes were recorded.
+    """
+    stored = vectorstore.get(include=["metadatas"])
+    return {
+        document_id: (metadata or {}).get('content_hash')
+        for document_id, metadata in zip(stored['ids'], stored['metadatas'])
+    }
+
+def reindex(
+    vectorstore,
+    catalog: Optional[MuseumCatalog] = None,
+    dry_run: bool = False,
+    pipeline: Optional[EmbeddingPipeline] = None,
+    on_progress: Optional[Callable[[int, int, float], None]] = None,
+) -> Dict:
+    """
+    Bring a vectorstore up to date with the museum data.
+
+    Args:
+        vectorstore (Chroma): The vectorstore to update in place.
+        catalog (MuseumCatalog): Data to index; the shared catalog by default.
+        dry_run (bool): Only report what would change.
+        pipeline (EmbeddingPipeline): Embedding settings; the configured defaults when omitted.
+        on_progress (callable): Called with (embedded, total, docs/sec) after each checkpoint.
+
+    Returns:
+        dict: IDs added, updated and removed, the unchanged count, the
+        number of documents embedded and the embedding pipeline's stats.
+    """
+    with _reindexing():
+        documents = {get_document_id(document): document for document in museum_documents(catalog)}
+        stored = stored_hashes(vectorstore)
+
+        added = [document_id for document_id in documents if document_id not in stored]
+        updated = [
+            document_id for document_id, document in documents.items()
+            if document_id in stored and stored[document_id] != document.metadata['content_hash']
+        ]
+        removed = [document_id for document_id in stored if document_id not in documents]
+        changed = added + updated
+
+        embedding = None
+        if not dry_run:
+            if changed:
+                embedding = (pipeline or embedding_pipeline).run(
+                    vectorstore,
+                    changed,
+                    [documents[document_id].page_content for document_id in changed],
+                    [documents[document_id].metadata for document_id in changed],
+                    on_progress=on_progress,
+                )
+            if removed:
+                vectorstore.delete(ids=removed)
+
+        result = {
+            "added": added,
+            "updated": updated,
+            "removed": removed,
+            "unchanged": len(documents) - len(changed),
+            "embedded": 0 if dry_run else len(changed),
+            "embedding": embedding,
+            "dry_run": dry_run,
+        }
+        logger.info("Re-indexed museum data", extra={"fields": {
+            "added": len(added), "updated": len(updated), "removed": len(removed),
+            "unchanged": result["unchanged"], "dry_run": dry_run,
+        }})
+        return result
+
+def main():
+    """Re-index the persisted vectorstore from the command line."""
+    parser = argparse.ArgumentParser(description="Incrementally re-index the museum vectorstore.")
+    parser.add_argument("--dry-run", action="store_true", help="only report what would change")
+    parser.add_argument("--batch-size", type=int, default=embedding_pipeline.batch_size, help="texts per embedding request")
+    parser.add_argument("--concurrency", type=int, default=embedding_pipeline.concurrency, help="embedding requests in flight")
+    args = parser.parse_args()
+
+    def progress(embedded, total, rate):
+        print(f"embedded {embedded}/{total} ({rate:.1f} docs/sec)")
+
+    from helpers.storage_helper import open_vectorstore
+    pipeline = EmbeddingPipeline(batch_size=args.batch_size, concurrency=args.concurrency)
+    result = reindex(open_vectorstore(), dry_run=args.dry_run, pipeline=pipeline, on_progress=progress)
+
+    for change in ("added", "updated", "removed"):
+        for document_id in result[change]:
+            print(f"{change:<8} {document_id}")
+    print(f"{len(result['added'])} added, {len(result['updated'])} updated, {len(result['removed'])} removed, "
+          f"{result['unchanged']} unchanged{' (dry run)' if args.dry_run else ''}")
+
+if __name__ == "__main__":
+    main()
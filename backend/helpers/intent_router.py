@@ -0,0 +1,689 @@
+"""
+Fast path for chat questions the museum catalog answers exactly.
+
+Opening hours, ticket prices and the languages tour guides speak don't need
+retrieval or the LLM. A question is routed when two independent checks
+agree:
+
+- Lexicon matching finds a cue word for exactly one intent ("close",
+  "precio", "ガイド", ...), nothing that rules the intent out (the cafe's
+  hours, a tour's price, a holiday, an event, a refund, an exhibit from
+  the catalog or a gallery), and the slots the intent
+  needs: days, ticket types, languages. Question words alone ("how much",
+  "what time") only count when the question also names a slot, the
+  museum or the subject itself ("ticket", "open").
+- A small naive Bayes classifier, trained on example questions when the
+  module is imported and kept as a table of per-feature log-probabilities,
+  puts the same intent above ROUTER_THRESHOLD. Lexicon words are replaced
+  by placeholders before classifying, so "senior" and "学生" look the same.
+
+Routed questions get a markdown answer rendered from the catalog, in the
+question's language (English, Spanish, French, German, Chinese or
+Japanese). Anything else falls through to the RAG chain.
+"""
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Dict, List, NamedTuple, Optional, Tuple
+import math
+import os
+import re
+import threading
+import unicodedata
+from helpers.museum_catalog import get_catalog
+
+ROUTER_THRESHOLD = float(os.getenv("INTENT_ROUTER_THRESHOLD", "0.8"))
+
+HOURS = "hours"
+TICKET_PRICE = "ticket_price"
+GUIDE_LANGUAGE = "guide_language"
+OTHER = "other"
+INTENTS = (HOURS, TICKET_PRICE, GUIDE_LANGUAGE, OTHER)
+LANGUAGES = ("en", "es", "fr", "de", "zh", "ja")
+
+# canonical value -> {language: [display name, other spellings...]}
+DAYS = {
+    "Monday": {"en": ["Monday", "mon"], "es": ["lunes"], "fr": ["lundi"], "de": ["Montag"], "zh": ["星期一", "周一", "礼拜一"], "ja": ["月曜日", "月曜"]},
+    "Tuesday": {"en": ["Tuesday", "tue", "tues"], "es": ["martes"], "fr": ["mardi"], "de": ["Dienstag"], "zh": ["星期二", "周二", "礼拜二"], "ja": ["火曜日", "火曜"]},
+    "Wednesday": {"en": ["Wednesday", "wed"], "es": ["miércoles"], "fr": ["mercredi"], "de": ["Mittwoch"], "zh": ["星期三", "周三", "礼拜三"], "ja": ["水曜日", "水曜"]},
+    "Thursday": {"en": ["Thursday", "thu", "thurs"], "es": ["jueves"], "fr": ["jeudi"], "de": ["Donnerstag"], "zh": ["星期四", "周四", "礼拜四"], "ja": ["木曜日", "木曜"]},
+    "Friday": {"en": ["Friday", "fri"], "es": ["viernes"], "fr": ["vendredi"], "de": ["Freitag"], "zh": ["星期五", "周五", "礼拜五"], "ja": ["金曜日", "金曜"]},
+    "Saturday": {"en": ["Saturday", "sat"], "es": ["sábado"], "fr": ["samedi"], "de": ["Samstag", "Sonnabend"], "zh": ["星期六", "周六", "礼拜六"], "ja": ["土曜日", "土曜"]},
+    "Sunday": {"en": ["Sunday", "sun"], "es": ["domingo"], "fr": ["dimanche"], "de": ["Sonntag"], "zh": ["星期日", "星期天", "周日", "礼拜天"], "ja": ["日曜日", "日曜"]},
+}
+
+RELATIVE_DAYS = {
+    0: {"en": ["today", "tonight"], "es": ["hoy"], "fr": ["aujourd'hui", "ce soir"], "de": ["heute"], "zh": ["今天", "今日"], "ja": ["今日", "本日"]},
+    1: {"en": ["tomorrow"], "es": ["mañana"], "fr": ["demain"], "de": ["morgen"], "zh": ["明天"], "ja": ["明日"]},
+}
+
+TICKET_TYPE_NAMES = {
+    "Adult": {"en": ["Adult", "adults", "grown up", "grown ups"], "es": ["Adulto", "adultos", "adulta", "adultas"], "fr": ["Adulte", "adultes"], "de": ["Erwachsene", "erwachsenen", "erwachsener", "erwachsenenticket"], "zh": ["成人", "大人"], "ja": ["大人", "一般", "成人"]},
+    "Child": {"en": ["Child", "children", "kid", "kids"], "es": ["Niño", "niños", "niña", "niñas", "infantil"], "fr": ["Enfant", "enfants"], "de": ["Kinder", "kindern", "kinderticket", "kinderkarte"], "zh": ["儿童", "孩子", "小孩"], "ja": ["子供", "子ども", "こども", "小人"]},
+    "Senior": {"en": ["Senior", "seniors", "elderly", "pensioner", "pensioners", "retiree", "retirees"], "es": ["Jubilado", "jubilados", "jubilada", "mayores", "tercera edad"], "fr": ["Senior", "seniors", "retraité", "retraités"], "de": ["Senioren", "senior", "rentner", "rentnerin"], "zh": ["老年", "老人", "长者"], "ja": ["シニア", "高齢者"]},
+    "Student": {"en": ["Student", "students"], "es": ["Estudiante", "estudiantes"], "fr": ["Étudiant", "étudiants", "étudiante", "étudiantes"], "de": ["Studierende", "student", "studenten", "studentin", "schüler"], "zh": ["学生"], "ja": ["学生"]},
+    "Family": {"en": ["Family", "families"], "es": ["Familiar", "familia", "familias"], "fr": ["Famille", "familles"], "de": ["Familie", "familien", "familienkarte", "familienticket"], "zh": ["家庭", "家人"], "ja": ["ファミリー", "家族"]},
+    "Group": {"en": ["Group", "groups"], "es": ["Grupo", "grupos"], "fr": ["Groupe", "groupes"], "de": ["Gruppe", "gruppen", "gruppenticket"], "zh": ["团体"], "ja": ["団体", "グループ"]},
+}
+
+LANGUAGE_NAMES = {
+    "English": {"en": ["English"], "es": ["inglés"], "fr": ["anglais"], "de": ["Englisch"], "zh": ["英语", "英文"], "ja": ["英語"]},
+    "Spanish": {"en": ["Spanish"], "es": ["español", "castellano"], "fr": ["espagnol"], "de": ["Spanisch"], "zh": ["西班牙语"], "ja": ["スペイン語"]},
+    "French": {"en": ["French"], "es": ["francés"], "fr": ["français"], "de": ["Französisch"], "zh": ["法语", "法文"], "ja": ["フランス語"]},
+    "German": {"en": ["German"], "es": ["alemán"], "fr": ["allemand"], "de": ["Deutsch"], "zh": ["德语", "德文"], "ja": ["ドイツ語"]},
+    "Chinese": {"en": ["Chinese", "mandarin", "cantonese"], "es": ["chino", "mandarín"], "fr": ["chinois", "mandarin"], "de": ["Chinesisch", "mandarin"], "zh": ["中文", "汉语", "普通话", "华语"], "ja": ["中国語"]},
+    "Japanese": {"en": ["Japanese"], "es": ["japonés"], "fr": ["japonais"], "de": ["Japanisch"], "zh": ["日语", "日文"], "ja": ["日本語"]},
+    "Portuguese": {"en": ["Portuguese"], "es": ["portugués"], "fr": ["portugais"], "de": ["Portugiesisch"], "zh": ["葡萄牙语"], "ja": ["ポルトガル語"]},
+    "Italian": {"en": ["Italian"], "es": ["italiano"], "fr": ["italien"], "de": ["Italienisch"], "zh": ["意大利语"], "ja": ["イタリア語"]},
+    "Korean": {"en": ["Korean"], "es": ["coreano"], "fr": ["coréen"], "de": ["Koreanisch"], "zh": ["韩语", "韩文"], "ja": ["韓国語"]},
+    "Russian": {"en": ["Russian"], "es": ["ruso"], "fr": ["russe"], "de": ["Russisch"], "zh": ["俄语"], "ja": ["ロシア語"]},
+    "Arabic": {"en": ["Arabic"], "es": ["árabe"], "fr": ["arabe"], "de": ["Arabisch"], "zh": ["阿拉伯语"], "ja": ["アラビア語"]},
+}
+
+# Words that signal an intent; a question must contain cues for exactly one
+CUES = {
+    HOURS: {
+        "en": ["open", "opens", "opening", "close", "closes", "closing", "closed", "hours"],
+        "es": ["abre", "abren", "abierto", "abierta", "apertura", "cierra", "cierran", "cerrado", "horario", "horarios"],
+        "fr": ["ouvert", "ouverte", "ouvre", "ouvrez", "ouverture", "ferme", "fermez", "fermé", "fermeture", "horaires"],
+        "de": ["geöffnet", "offen", "öffnet", "öffnen", "öffnungszeiten", "schließt", "schließen", "geschlossen"],
+        "zh": ["开门", "关门", "开放", "闭馆", "营业"],
+        "ja": ["開館", "閉館", "営業", "開いて", "閉ま"],
+    },
+    TICKET_PRICE: {
+        "en": ["admission", "ticket", "tickets", "entry"],
+        "es": ["tarifa", "tarifas", "entrada", "entradas", "boleto", "boletos"],
+        "fr": ["tarif", "tarifs", "billet", "billets", "entrée"],
+        "de": ["eintritt", "eintrittspreise", "ticket", "tickets", "karte", "eintrittskarte"],
+        "zh": ["票价", "门票", "票"],
+        "ja": ["入館料", "チケット"],
+    },
+    # Guide questions need a guide cue and either a language or a language cue
+    GUIDE_LANGUAGE: {
+        "en": ["guide", "guides", "guided", "tour", "tours"],
+        "es": ["guía", "guías", "guiada", "guiadas", "visita", "visitas", "tour", "tours"],
+        "fr": ["guide", "guides", "guidée", "guidées", "visite", "visites"],
+        "de": ["guide", "guides", "führer", "führerin", "führung", "führungen", "tour", "touren"],
+        "zh": ["导游", "讲解员", "导览"],
+        "ja": ["ガイド", "ツアー", "案内"],
+    },
+}
+
+# Question words that count as cues, but don't say what is asked about:
+# "what time is it", "how much is a membership"
+QUESTION_CUES = {
+    HOURS: {
+        "en": ["what time", "how late", "until when"],
+        "es": ["a qué hora", "hasta qué hora"],
+        "fr": ["quelle heure"],
+        "de": ["wann", "wie lange"],
+        "zh": ["几点"],
+        "ja": ["何時"],
+    },
+    TICKET_PRICE: {
+        "en": ["price", "prices", "cost", "costs", "how much", "fee", "fees"],
+        "es": ["precio", "precios", "cuesta", "cuestan", "cuánto", "cuanto vale"],
+        "fr": ["prix", "combien", "coûte", "coûtent"],
+        "de": ["preis", "preise", "kostet", "kosten", "wie viel", "wieviel"],
+        "zh": ["多少钱", "价格", "费用"],
+        "ja": ["いくら", "料金", "値段"],
+    },
+}
+
+# Naming the museum makes a bare question word about it: "when does the museum close"
+MUSEUM_WORDS = {
+    "en": ["museum"], "es": ["museo"], "fr": ["musée"], "de": ["museum"],
+    "zh": ["博物馆"], "ja": ["博物館", "美術館"],
+}
+
+LANGUAGE_CUES = {
+    "en": ["language", "languages"], "es": ["idioma", "idiomas", "lengua", "lenguas"],
+    "fr": ["langue", "langues"], "de": ["sprache", "sprachen"],
+    "zh": ["语言", "语种"], "ja": ["言語", "何語"],
+}
+
+# Topics that rule an intent out: the cafe's hours, a tour's price, holidays
+TOPICS = {
+    "facility": {
+        "en": ["cafe", "cafeteria", "coffee", "restaurant", "shop", "gift shop", "store", "cloakroom", "audio guide", "audio guides", "audioguide", "parking", "library"],
+        "es": ["cafetería", "restaurante", "tienda", "guardarropa", "audioguía", "audioguías", "aparcamiento", "estacionamiento"],
+        "fr": ["café", "cafétéria", "boutique", "vestiaire", "audioguide", "audioguides", "parking"],
+        "de": ["café", "cafeteria", "restaurant", "laden", "shop", "garderobe", "audioguide", "parkplatz"],
+        "zh": ["咖啡", "餐厅", "商店", "礼品店", "停车", "语音导览"],
+        "ja": ["カフェ", "レストラン", "ショップ", "売店", "駐車", "音声ガイド"],
+    },
+    "tour": {
+        "en": ["tour", "tours", "guided"], "es": ["visita guiada", "visitas guiadas", "tour", "tours"],
+        "fr": ["visite guidée", "visites guidées"], "de": ["führung", "führungen", "tour", "touren"],
+        "zh": ["导览", "导游"], "ja": ["ツアー", "ガイド"],
+    },
+    "holiday": {
+        "en": ["christmas", "xmas", "new year", "new years", "easter", "holiday", "holidays", "thanksgiving"],
+        "es": ["navidad", "año nuevo", "semana santa", "festivo", "festivos", "feriado", "feriados"],
+        "fr": ["noël", "nouvel an", "pâques", "jour férié", "jours fériés"],
+        "de": ["weihnachten", "silvester", "neujahr", "ostern", "feiertag", "feiertagen"],
+        "zh": ["圣诞", "春节", "节假日", "假日", "新年"],
+        "ja": ["クリスマス", "正月", "祝日", "年末年始"],
+    },
+    # Events and programmes priced and timed apart from admission
+    "event": {
+        "en": ["fun day", "event", "events", "workshop", "workshops", "festival", "lecture", "lectures", "gala", "camp", "membership", "memberships", "member", "members"],
+        "es": ["evento", "eventos", "taller", "talleres", "festival", "conferencia", "membresía", "socio", "socios"],
+        "fr": ["événement", "événements", "atelier", "ateliers", "festival", "conférence", "adhésion", "abonnement", "membre", "membres"],
+        "de": ["veranstaltung", "veranstaltungen", "workshop", "workshops", "festival", "vortrag", "mitgliedschaft", "mitglied", "mitglieder"],
+        "zh": ["活动", "讲座", "工作坊", "会员"],
+        "ja": ["イベント", "ワークショップ", "講演", "会員"],
+    },
+    # Ticket policies the price table doesn't answer: "is the ticket refundable"
+    "policy": {
+        "en": ["refund", "refunds", "refundable", "cancel", "cancellation", "cancelled", "canceled", "free"],
+        "es": ["reembolso", "reembolsable", "devolución", "cancelar", "cancelación", "gratis", "gratuito", "gratuita"],
+        "fr": ["remboursement", "remboursable", "rembourser", "annuler", "annulation", "gratuit", "gratuite"],
+        "de": ["erstattung", "rückerstattung", "erstattet", "stornieren", "stornierung", "kostenlos", "gratis", "umsonst"],
+        "zh": ["退款", "退票", "取消", "免费"],
+        "ja": ["返金", "払い戻し", "キャンセル", "無料"],
+    },
+    # Exhibits and galleries keep their own hours and prices; the catalog's
+    # exhibit names and highlights are matched on top of these words
+    "exhibit": {
+        "en": ["exhibit", "exhibits", "exhibition", "exhibitions", "gallery", "galleries"],
+        "es": ["exposición", "exposiciones", "exhibición", "galería", "galerías"],
+        "fr": ["exposition", "expositions", "galerie", "galeries"],
+        "de": ["ausstellung", "ausstellungen", "galerie", "galerien"],
+        "zh": ["展览", "展厅", "展品"],
+        "ja": ["展示", "展覧会", "ギャラリー"],
+    },
+}
+
+VETOES = {
+    HOURS: {"facility", "tour", "holiday", "event", "policy", "exhibit"},
+    TICKET_PRICE: {"facility", "tour", "event", "policy", "exhibit"},
+    GUIDE_LANGUAGE: {"facility"},
+}
+
+# Slots that say what an hours or price question is about
+SUBJECT_SLOTS = {
+    HOURS: ("day", "when"),
+    TICKET_PRICE: ("ticket",),
+}
+
+# Common short words, only used to tell the question's language
+FUNCTION_WORDS = {
+    "en": ["the", "is", "are", "do", "does", "you", "what", "when", "which", "how", "who", "your", "on", "a", "an", "for", "there"],
+    "es": ["el", "los", "las", "es", "está", "qué", "cuál", "cuándo", "hay", "para", "una", "un", "del", "que", "en"],
+    "fr": ["le", "les", "est", "quel", "quelle", "quels", "quand", "vous", "pour", "une", "du", "des", "au", "y"],
+    "de": ["der", "die", "das", "ist", "sind", "welche", "wie", "gibt", "es", "ein", "eine", "für", "am", "ihr", "sie", "auf"],
+}
+
+# Labelled questions the classifier is trained on at import
+EXAMPLES = {
+    HOURS: [
+        "What time do you close on Wednesday?", "When does the museum open?", "What are your opening hours?",
+        "Are you open on Sunday?", "Is the museum open today?", "What time does the museum close tomorrow?",
+        "How late are you open on Saturday?", "opening hours", "Until when are you open on Friday?",
+        "museum hours", "When are you open?",
+        "¿A qué hora cierra el museo el miércoles?", "¿Cuál es el horario del museo?", "¿Está abierto el domingo?",
+        "¿A qué hora abren hoy?", "horario de apertura",
+        "À quelle heure fermez-vous le mercredi ?", "Quels sont les horaires d'ouverture ?",
+        "Le musée est-il ouvert dimanche ?", "Vous ouvrez à quelle heure demain ?",
+        "Wann schließt das Museum am Mittwoch?", "Was sind die Öffnungszeiten?",
+        "Ist das Museum am Sonntag geöffnet?", "Wann öffnet ihr heute?",
+        "博物馆星期三几点关门？", "开放时间是什么？", "周日开门吗？", "今天几点开门？",
+        "水曜日は何時に閉館しますか？", "開館時間を教えてください", "日曜日は開いていますか？", "今日は何時まで開いていますか？",
+    ],
+    TICKET_PRICE: [
+        "How much is a senior ticket?", "What are your ticket prices?", "How much does an adult ticket cost?",
+        "What is the price for students?", "How much is admission for children?", "ticket prices",
+        "How much are family tickets?", "What does a group ticket cost?", "What is the entry fee?",
+        "admission prices",
+        "¿Cuánto cuesta la entrada para jubilados?", "¿Cuál es el precio de la entrada?",
+        "¿Cuánto cuesta una entrada de adulto?", "precios de las entradas para estudiantes",
+        "Combien coûte un billet senior ?", "Quel est le prix d'entrée ?",
+        "Combien coûte le billet pour les enfants ?", "tarifs des billets", "prix des billets",
+        "Wie viel kostet ein Ticket für Senioren?", "Was kostet der Eintritt?",
+        "Was sind die Eintrittspreise für Studenten?", "Wie viel kostet eine Familienkarte?",
+        "老年票多少钱？", "门票价格是多少？", "成人票多少钱？", "学生票价",
+        "シニアのチケットはいくらですか？", "入館料はいくらですか？", "大人のチケット料金は？", "学生の料金を教えてください",
+    ],
+    GUIDE_LANGUAGE: [
+        "Which guides speak Japanese?", "Do you have a guide who speaks Spanish?", "Are there tours in German?",
+        "What languages do your guides speak?", "Is there a French speaking guide?", "Can I get a tour guide in Chinese?",
+        "In which languages are the guided tours?", "What languages are your tours offered in?",
+        "¿Qué guías hablan japonés?", "¿Hay visitas guiadas en alemán?", "¿En qué idiomas hablan los guías?",
+        "¿Tienen un guía que hable francés?",
+        "Quels guides parlent japonais ?", "Y a-t-il des visites en allemand ?",
+        "Dans quelles langues parlent vos guides ?", "Avez-vous un guide qui parle espagnol ?",
+        "Welche Guides sprechen Japanisch?", "Gibt es Führungen auf Spanisch?",
+        "Welche Sprachen sprechen Ihre Führer?", "Gibt es einen Guide, der Französisch spricht?",
+        "哪些导游会说日语？", "有说西班牙语的导游吗？", "导游会说哪些语言？",
+        "日本語を話せるガイドはいますか？", "スペイン語のガイドツアーはありますか？", "ガイドは何語を話せますか？",
+    ],
+    OTHER: [
+        "Is the cafe open on Monday?", "How much is the highlights tour?", "Where can I buy tickets online?",
+        "Can I get a refund for my ticket?", "Tell me about the Renaissance Art exhibit", "Where is the Modern Art gallery?",
+        "Is there parking near the museum?", "Can I book a tour with Dr. Johnson?", "Do you have wheelchair access?",
+        "Can I take photos inside?", "What exhibits do you recommend for kids?", "Do you speak Japanese?",
+        "Who is your best guide?", "Tell me about the dinosaur skeletons", "How long does the Ancient Civilizations exhibit take?",
+        "Is the museum open on Christmas?", "Hello!", "Thank you", "I lost my ticket, what should I do?",
+        "Can I bring my dog?", "What is the museum about?", "How do I get to the museum by bus?",
+        "How much is a membership?", "What is the price of the Family Fun Day?", "What time is it?",
+        "What time does the workshop start?", "How much does it cost to park?",
+        "¿Dónde está la cafetería?", "¿Puedo reservar una visita guiada?", "¿Qué exposiciones me recomiendan?",
+        "Hola, gracias", "¿Se pueden tomar fotos?", "¿Dónde puedo comprar las entradas?",
+        "¿Qué hora es?", "¿Cuánto cuesta la membresía?",
+        "Où se trouve la boutique ?", "Puis-je réserver une visite ?", "Parlez-moi de l'exposition d'art moderne",
+        "Bonjour, merci", "Où acheter les billets ?", "Quelle heure est-il ?", "Combien coûte l'adhésion ?",
+        "Wo ist die Cafeteria?", "Kann ich eine Führung buchen?", "Erzählen Sie mir von der Ausstellung",
+        "Hallo, danke", "Wo kann ich Tickets kaufen?", "Wie spät ist es?", "Was kostet die Mitgliedschaft?",
+        "咖啡厅在哪里？", "我可以预订导游吗？", "你好", "推荐哪个展览？", "在哪里买票？", "现在几点？", "会员多少钱？",
+        "カフェはどこですか？", "ツアーを予約できますか？", "こんにちは", "おすすめの展示は？", "チケットはどこで買えますか？",
+        "今何時ですか？", "会員の料金はいくらですか？",
+    ],
+}
+
+# Answer templates per language
+TEXT = {
+    "en": {
+        "hours_day": "**{museum}** is open on **{day}** from **{hours}**.",
+        "hours_title": "**Opening hours**", "day": "Day", "hours": "Hours",
+        "price_one": "{article} **{ticket}** ticket costs **{price}**.",
+        "price_title": "**Ticket prices**", "ticket": "Ticket", "price": "Price",
+        "offer": "Special offer",
+        "guides_for": "Guides who speak **{language}**:",
+        "guides_none": "None of our guides currently speak **{language}**. Tours are available in {languages}.",
+        "guides_title": "**Tour guide languages**",
+    },
+    "es": {
+        "hours_day": "El **{museum}** abre el **{day}** de **{hours}**.",
+        "hours_title": "**Horario**", "day": "Día", "hours": "Horario",
+        "price_one": "La entrada **{ticket}** cuesta **{price}**.",
+        "price_title": "**Precios de las entradas**", "ticket": "Entrada", "price": "Precio",
+        "offer": "Oferta especial",
+        "guides_for": "Guías que hablan **{language}**:",
+        "guides_none": "Por ahora ninguno de nuestros guías habla **{language}**. Hay visitas en {languages}.",
+        "guides_title": "**Idiomas de nuestros guías**",
+    },
+    "fr": {
+        "hours_day": "Le **{museum}** est ouvert le **{day}** de **{hours}**.",
+        "hours_title": "**Horaires d'ouverture**", "day": "Jour", "hours": "Horaires",
+        "price_one": "Le billet **{ticket}** coûte **{price}**.",
+        "price_title": "**Tarifs**", "ticket": "Billet", "price": "Prix",
+        "offer": "Offre spéciale",
+        "guides_for": "Guides qui parlent **{language}** :",
+        "guides_none": "Aucun de nos guides ne parle **{language}** pour le moment. Les visites sont proposées en {languages}.",
+        "guides_title": "**Langues de nos guides**",
+    },
+    "de": {
+        "hours_day": "Das **{museum}** ist am **{day}** von **{hours}** geöffnet.",
+        "hours_title": "**Öffnungszeiten**", "day": "Tag", "hours": "Öffnungszeiten",
+        "price_one": "Ein Ticket **{ticket}** kostet **{price}**.",
+        "price_title": "**Eintrittspreise**", "ticket": "Ticket", "price": "Preis",
+        "offer": "Sonderangebot",
+        "guides_for": "Guides, die **{language}** sprechen:",
+        "guides_none": "Derzeit spricht keiner unserer Guides **{language}**. Führungen gibt es auf {languages}.",
+        "guides_title": "**Sprachen unserer Guides**",
+    },
+    "zh": {
+        "hours_day": "**{museum}** {day}的开放时间为 **{hours}**。",
+        "hours_title": "**开放时间**", "day": "日期", "hours": "时间",
+        "price_one": "**{ticket}**票价格为 **{price}**。",
+        "price_title": "**票价**", "ticket": "票种", "price": "价格",
+        "offer": "优惠",
+        "guides_for": "会说**{language}**的导游：",
+        "guides_none": "目前没有导游会说**{language}**。可选语言：{languages}。",
+        "guides_title": "**导游语言**",
+    },
+    "ja": {
+        "hours_day": "**{museum}** の{day}の開館時間は **{hours}** です。",
+        "hours_title": "**開館時間**", "day": "曜日", "hours": "時間",
+        "price_one": "**{ticket}**のチケットは **{price}** です。",
+        "price_title": "**チケット料金**", "ticket": "種類", "price": "料金",
+        "offer": "特典",
+        "guides_for": "**{language}**を話せるガイド：",
+        "guides_none": "現在、**{language}**を話せるガイドはいません。対応言語：{languages}。",
+        "guides_title": "**ガイドの対応言語**",
+    },
+}
+
+_apostrophes = str.maketrans({"’": "'", "‘": "'", "`": "'"})
+_cjk = re.compile(r"[\u3040-\u30ff\u3400-\u9fff]")
+_kana = re.compile(r"[\u3040-\u30ff]")
+_whitespace = re.compile(r"\s+")
+_features = re.compile(r"__[a-z_]+?__|[\u3040-\u30ff\u3400-\u9fff]+|[^\W_\u3040-\u30ff\u3400-\u9fff]+")
+
+def normalize(text: str) -> str:
+    """
+    Casefold, strip Latin accents and collapse whitespace.
+
+    Only combining marks in the Latin range are dropped, so Japanese voiced
+    kana survive the round trip through NFKD.
+    """
+    text = unicodedata.normalize("NFKD", text.translate(_apostrophes).casefold())
+    text = "".join(char for char in text if not "\u0300" <= char <= "\u036f")
+    return _whitespace.sub(" ", unicodedata.normalize("NFC", text)).strip()
+
+class Route(NamedTuple):
+    intent: str
+    language: str
+    confidence: float
+    answer: str
+
+class _Lexicon:
+    """Every known word and phrase, matched in one regex pass."""
+
+    def __init__(self):
+        # normalized alias -> [(kind, value, language)]
+        self.entries: Dict[str, List[Tuple[str, object, str]]] = {}
+        for kind, table in (("day", DAYS), ("when", RELATIVE_DAYS), ("ticket", TICKET_TYPE_NAMES), ("language", LANGUAGE_NAMES)):
+            for value, names in table.items():
+                for language, aliases in names.items():
+                    self._add(aliases, kind, value, language)
+        for intent, cues in CUES.items():
+            for language, aliases in cues.items():
+                self._add(aliases, "cue", intent, language)
+        for intent, cues in QUESTION_CUES.items():
+            for language, aliases in cues.items():
+                self._add(aliases, "question_cue", intent, language)
+        for language, aliases in MUSEUM_WORDS.items():
+            self._add(aliases, "museum", None, language)
+        for language, aliases in LANGUAGE_CUES.items():
+            self._add(aliases, "language_cue", GUIDE_LANGUAGE, language)
+        for topic, words in TOPICS.items():
+            for language, aliases in words.items():
+                self._add(aliases, "topic", topic, language)
+        for language, words in FUNCTION_WORDS.items():
+            self._add(words, "word", None, language)
+
+        aliases = sorted(self.entries, key=len, reverse=True)
+        latin = "|".join(re.escape(alias) for alias in aliases if not _cjk.search(alias))
+        cjk = "|".join(re.escape(alias) for alias in aliases if _cjk.search(alias))
+        self.pattern = re.compile(rf"(?<!\w)(?:{latin})(?!\w)|{cjk}")
+
+    def _add(self, aliases, kind, value, language):
+        for alias in aliases:
+            entries = self.entries.setdefault(normalize(alias), [])
+            if (kind, value, language) not in entries:
+                entries.append((kind, value, language))
+
+    def scan(self, text: str) -> List[Tuple[int, int, List[Tuple[str, object, str]]]]:
+        return [(match.start(), match.end(), self.entries[match.group()]) for match in self.pattern.finditer(text)]
+
+_SLOT_KINDS = ("day", "when", "ticket", "language")
+
+def _placeholders(entries) -> List[str]:
+    names = []
+    for kind, value, _ in entries:
+        if kind in _SLOT_KINDS:
+            names.append(f"__{kind}__")
+        elif kind in ("cue", "topic"):
+            names.append(f"__{value}__")
+        elif kind == "question_cue":
+            names.append(f"__{value}_question__")
+        elif kind == "language_cue":
+            names.append("__languages__")
+    return names
+
+def _features_of(text: str, hits) -> List[str]:
+    # Known words become placeholders ("__day__", "__hours__", "__facility__"),
+    # so the classifier learns the shape of a question rather than its vocabulary
+    parts, position = [], 0
+    for start, end, entries in hits:
+        names = _placeholders(entries)
+        if names:
+            parts.append(text[position:start])
+            parts.append(" " + " ".join(names) + " ")
+            position = end
+    parts.append(text[position:])
+
+    features = set()
+    for token in _features.findall("".join(parts)):
+        if _cjk.match(token):
+            features.update(token)
+            features.update(token[i:i + 2] for i in range(len(token) - 1))
+        else:
+            features.add(token)
+    return list(features)
+
+class _Classifier:
+    """Naive Bayes over binary features, compiled to a table of log-probabilities."""
+
+    def __init__(self, examples: Dict[str, List[str]], lexicon: _Lexicon, alpha: float = 0.5):
+        self.intents = list(examples)
+        counts = {intent: Counter() for intent in self.intents}
+        totals = {}
+        for intent, texts in examples.items():
+            for text in texts:
+                normalized = normalize(text)
+                counts[intent].update(_features_of(normalized, lexicon.scan(normalized)))
+            totals[intent] = len(texts)
+        vocabulary = set().union(*counts.values())
+        # feature -> per-intent log P(feature | intent) - log P(no feature | intent)
+        self.weights: Dict[str, Tuple[float, ...]] = {}
+        base = [0.0] * len(self.intents)
+        for feature in vocabulary:
+            weights = []
+            for i, intent in enumerate(self.intents):
+                present = (counts[intent][feature] + alpha) / (totals[intent] + 2 * alpha)
+                weights.append(math.log(present) - math.log(1 - present))
+                base[i] += math.log(1 - present)
+            self.weights[feature] = tuple(weights)
+        # Uniform priors: the example counts say nothing about real traffic
+        self.base = tuple(base)
+
+    def predict(self, features: List[str]) -> Dict[str, float]:
+        scores = list(self.base)
+        for feature in features:
+            weights = self.weights.get(feature)
+            if weights is not None:
+                for i, weight in enumerate(weights):
+                    scores[i] += weight
+        top = max(scores)
+        exps = [math.exp(score - top) for score in scores]
+        total = sum(exps)
+        return {intent: value / total for intent, value in zip(self.intents, exps)}
+
+def _money(price: float) -> str:
+    return f"${price:,.2f}"
+
+def _display(table: Dict, value, language: str) -> str:
+    names = table.get(value, {}).get(language)
+    return names[0] if names else str(value)
+
+class IntentRouter:
+    """
+    Answers hours, ticket price and guide language questions from the catalog.
+
+    Args:
+        threshold (float): Lowest classifier probability that is routed.
+    """
+
+    def __init__(self, threshold: float = ROUTER_THRESHOLD):
+        self.threshold = threshold
+        self._lexicon = _Lexicon()
+        self._classifier = _Classifier(EXAMPLES, self._lexicon)
+        self._exhibits = None
+        self._queries = 0
+        self._routed = Counter()
+        self._lock = threading.Lock()
+
+    def analyze(self, text: str) -> Dict:
+        """
+        Classify a question without rendering an answer.
+
+        Args:
+            text (str): The visitor's question.
+
+        Returns:
+            dict: The intent to route to (None to fall through), the
+            classifier's probabilities, the question's language and the
+            slots found.
+        """
+        normalized = normalize(text)
+        hits = self._lexicon.scan(normalized)
+        cues, subjects, topics, slots = set(), set(), set(), {kind: [] for kind in _SLOT_KINDS}
+        language_cue = museum = False
+        votes = Counter()
+        for _, _, entries in hits:
+            for kind, value, language in entries:
+                votes[language] += 1 / len(entries)
+                if kind == "cue":
+                    cues.add(value)
+                    subjects.add(value)
+                elif kind == "question_cue":
+                    cues.add(value)
+                elif kind == "museum":
+                    museum = True
+                elif kind == "language_cue":
+                    language_cue = True
+                elif kind == "topic":
+                    topics.add(value)
+                elif kind in slots and value not in slots[kind]:
+                    slots[kind].append(value)
+
+        if self._names_exhibit(normalized):
+            topics.add("exhibit")
+
+        probabilities = self._classifier.predict(_features_of(normalized, hits))
+        intent = max(probabilities, key=probabilities.get)
+        routable = (
+            intent != OTHER
+            and cues == {intent}
+            and probabilities[intent] >= self.threshold
+            and not topics & VETOES[intent]
+            and (intent != GUIDE_LANGUAGE or language_cue or slots["language"])
+            and (
+                intent not in SUBJECT_SLOTS or intent in subjects or museum
+                or any(slots[kind] for kind in SUBJECT_SLOTS[intent])
+            )
+        )
+        return {
+            "intent": intent if routable else None,
+            "probabilities": probabilities,
+            "language": self._language(normalized, votes),
+            "slots": slots,
+        }
+
+    def _names_exhibit(self, text: str) -> bool:
+        # Rebuilt when the catalog is reloaded; one attribute, so a concurrent
+        # question never pairs a version with another catalog's pattern
+        catalog = get_catalog()
+        if self._exhibits is None or self._exhibits[0] != catalog.version:
+            names = {
+                normalize(name) for exhibit in catalog.exhibits
+                for name in (exhibit['name'], *exhibit.get('highlights', ()))
+            }
+            alternatives = "|".join(re.escape(name) for name in sorted(names, key=len, reverse=True) if name)
+            self._exhibits = (catalog.version, re.compile(rf"(?<!\w)(?:{alternatives})(?!\w)") if alternatives else None)
+        pattern = self._exhibits[1]
+        return pattern is not None and pattern.search(text) is not None
+
+    @staticmethod
+    def _language(text: str, votes: Counter) -> str:
+        if _kana.search(text):
+            return "ja"
+        if _cjk.search(text):
+            return "ja" if votes["ja"] > votes["zh"] else "zh"
+        # Ties go to English
+        return max(("en", "es", "fr", "de"), key=lambda language: (votes[language], language == "en"))
+
+    def route(self, text: str) -> Optional[Route]:
+        """
+        Answer a question from the catalog if it is one the router handles.
+
+        Args:
+            text (str): The visitor's question.
+
+        Returns:
+            Route: The intent, language, confidence and markdown answer, or
+            None to fall through to the RAG chain.
+        """
+        analysis = self.analyze(text)
+        intent = analysis["intent"]
+        with self._lock:
+            self._queries += 1
+            if intent is not None:
+                self._routed[intent] += 1
+        if intent is None:
+            return None
+
+        language, slots = analysis["language"], analysis["slots"]
+        if intent == HOURS:
+            answer = self._hours(language, slots)
+        elif intent == TICKET_PRICE:
+            answer = self._prices(language, slots)
+        else:
+            answer = self._guides(language, slots)
+        return Route(intent, language, analysis["probabilities"][intent], answer)
+
+    def _hours(self, language: str, slots: Dict) -> str:
+        catalog, text = get_catalog(), TEXT[language]
+        hours = catalog.museum_info['hours']
+        days = list(slots["day"])
+        for offset in slots["when"]:
+            day = (datetime.now() + timedelta(days=offset)).strftime('%A')
+            if day not in days:
+                days.append(day)
+        days = [day for day in days if day in hours]
+        if days:
+            return "\n".join(
+                text["hours_day"].format(museum=catalog.museum_info['name'], day=_display(DAYS, day, language), hours=hours[day])
+                for day in days
+            )
+        rows = [f"| {_display(DAYS, day, language)} | {value} |" for day, value in hours.items()]
+        return "\n".join([text["hours_title"], "", f"| {text['day']} | {text['hours']} |", "|---|---|", *rows])
+
+    def _prices(self, language: str, slots: Dict) -> str:
+        catalog, text = get_catalog(), TEXT[language]
+        tickets = [catalog.tickets_by_type[name] for name in slots["ticket"] if name in catalog.tickets_by_type]
+        if tickets:
+            lines = []
+            for ticket in tickets:
+                name = _display(TICKET_TYPE_NAMES, ticket['type'], language)
+                # Only the English template has an article
+                article = "An" if name[:1].lower() in "aeiou" else "A"
+                line = text["price_one"].format(article=article, ticket=name, price=_money(ticket['price']))
+                # Descriptions are only written in English
+                lines.append(f"{line} {ticket['description']}." if language == "en" else line)
+            names = [ticket['type'].lower() for ticket in tickets]
+            offers = [offer for offer in catalog.special_offers if any(name in offer['name'].lower() for name in names)]
+            if offers:
+                lines.append("")
+                lines.extend(f"- {text['offer']}: **{offer['name']}**: {offer['description']} ({offer['validity']})" for offer in offers)
+            return "\n".join(lines)
+        rows = [f"| {_display(TICKET_TYPE_NAMES, ticket['type'], language)} | {_money(ticket['price'])} |" for ticket in catalog.ticket_prices]
+        return "\n".join([text["price_title"], "", f"| {text['ticket']} | {text['price']} |", "|---|---|", *rows])
+
+    def _guides(self, language: str, slots: Dict) -> str:
+        catalog, text = get_catalog(), TEXT[language]
+        days_of = lambda guide: ", ".join(_display(DAYS, day, language) for day in guide['availability'])
+        if not slots["language"]:
+            lines = [text["guides_title"], ""]
+            lines.extend(
+                f"- **{guide['name']}**: {', '.join(_display(LANGUAGE_NAMES, name, language) for name in guide['languages'])}"
+                for guide in catalog.tour_guides
+            )
+            return "\n".join(lines)
+
+        lines = []
+        for name in slots["language"]:
+            guides = catalog.guides_speaking(name)
+            shown = _display(LANGUAGE_NAMES, name, language)
+            if not guides:
+                offered = sorted({spoken for guide in catalog.tour_guides for spoken in guide['languages']})
+                lines.append(text["guides_none"].format(
+                    language=shown, languages=", ".join(_display(LANGUAGE_NAMES, spoken, language) for spoken in offered)))
+                continue
+            lines.append(text["guides_for"].format(language=shown))
+            lines.extend(f"- **{guide['name']}** ({', '.join(guide['specialties'])}): {days_of(guide)}" for guide in guides)
+        return "\n".join(lines)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            routed = sum(self._routed.values())
+            return {
+                'queries': self._queries,
+                'routed': routed,
+                'hit_rate': routed / self._queries if self._queries else 0.0,
+                'by_intent': dict(self._routed),
+            }
+
+intent_router = IntentRouter()
@@ -0,0 +1,66 @@
+"""
+Structured, level-controlled logging for the backend.
+
+Log records are written as one JSON object per line. Extra fields passed as
+`extra={"fields": {...}}` are merged into the object. The level comes from
+the LOG_LEVEL environment variable (default INFO).
+"""
+import hashlib
+import json
+import logging
+import os
+import sys
+import threading
+from datetime import datetime, timezone
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+ROOT_LOGGER = "museum"
+
+_configured = False
+_configure_lock = threading.Lock()
+
+class JsonFormatter(logging.Formatter):
+    """Formats a log record as a single JSON line."""
+
+    def format(self, record):
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        entry.update(getattr(record, "fields", {}))
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+def _configure():
+    global _configured
+    with _configure_lock:
+        if _configured:
+            return
+        handler = logging.StreamHandler(sys.stderr)
+        handler.setFormatter(JsonFormatter())
+        root = logging.getLogger(ROOT_LOGGER)
+        root.addHandler(handler)
+        root.setLevel(LOG_LEVEL)
+        root.propagate = False
+        _configured = True
+
+def get_logger(name: str) -> logging.Logger:
+    """
+    Get a structured logger for a module.
+
+    Args:
+        name (str): Usually the module's __name__.
+
+    Returns:
+        logging.Logger: A logger under the backend's JSON-formatted root.
+    """
+    if not _configured:
+        _configure()
+    return logging.getLogger(f"{ROOT_LOGGER}.{name}")
+
+def anonymize(value: str) -> str:
+    """Short stable hash for identifiers that shouldn't appear in logs verbatim."""
+    return hashlib.sha256(value.encode()).hexdigest()[:12]
@@ -0,0 +1,179 @@
+"""
+Indexed, read-only view of the museum data.
+
+The catalog is built once from helpers.museum_data. Every record is frozen
+(dicts become read-only mappings, lists become tuples) so it can be shared
+between request threads and handed out without copying. Lookups that
+callers used to do with linear scans are answered from indexes built at
+the same time: records by id, guides by day of the week, specialty and
+language, and ticket prices by type.
+
+The catalog's version is a short hash of its content; caches derived from
+the museum data key on it so they are invalidated when the data changes.
+"""
+from types import MappingProxyType
+from typing import Any, Dict, Mapping, Optional, Tuple
+import hashlib
+import importlib
+import importlib.util
+import json
+import threading
+from helpers import museum_data
+
+Record = Mapping[str, Any]
+
+def freeze(value: Any) -> Any:
+    """Recursively turn dicts into read-only mappings and lists into tuples."""
+    if isinstance(value, dict):
+        return MappingProxyType({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    return value
+
+def thaw(value: Any) -> Any:
+    """Recursively copy a frozen value back into plain dicts and lists."""
+    kind = type(value)
+    if kind is MappingProxyType or kind is dict:
+        return {key: thaw(item) for key, item in value.items()}
+    if kind is tuple:
+        return [thaw(item) for item in value]
+    return value
+
+def json_default(value: Any) -> Any:
+    """json.dumps default hook that serializes frozen records like dicts."""
+    if type(value) is MappingProxyType:
+        return dict(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def _group(records, keys) -> Dict[str, Tuple[Record, ...]]:
+    groups: Dict[str, list] = {}
+    for record in records:
+        for key in keys(record):
+            groups.setdefault(key.lower(), []).append(record)
+    return {key: tuple(group) for key, group in groups.items()}
+
+class MuseumCatalog:
+    """
+    Immutable museum data with precomputed lookups.
+
+    Args:
+        data (dict): Museum data in the shape of get_all_museum_data().
+    """
+
+    def __init__(self, data: Dict):
+        frozen = self._data = freeze(data)
+        self.exhibits: Tuple[Record, ...] = frozen['exhibits']
+        self.ticket_prices: Tuple[Record, ...] = frozen['ticket_prices']
+        self.special_offers: Tuple[Record, ...] = frozen['special_offers']
+        self.tour_guides: Tuple[Record, ...] = frozen['tour_guides']
+        self.tour_types: Tuple[Record, ...] = frozen['tour_types']
+        self.museum_info: Record = frozen['museum_info']
+        self.feedback_questions: Tuple[str, ...] = frozen['feedback_questions']
+
+        self.exhibits_by_id = MappingProxyType({exhibit['id']: exhibit for exhibit in self.exhibits})
+        self.guides_by_id = MappingProxyType({guide['id']: guide for guide in self.tour_guides})
+        self.tour_types_by_id = MappingProxyType({tour['id']: tour for tour in self.tour_types})
+        self.tickets_by_type = MappingProxyType({ticket['type']: ticket for ticket in self.ticket_prices})
+        # Ticket type names in catalog order; ticket tokens encode positions in it
+        self.ticket_types: Tuple[str, ...] = tuple(ticket['type'] for ticket in self.ticket_prices)
+
+        self._guides_by_day = _group(self.tour_guides, lambda guide: guide['availability'])
+        self._guides_by_specialty = _group(self.tour_guides, lambda guide: guide['specialties'])
+        self._guides_by_language = _group(self.tour_guides, lambda guide: guide['languages'])
+        # The public summary of each guide available on a day, with that day's slots
+        self._schedules = MappingProxyType({
+            day.lower(): tuple(
+                MappingProxyType({
+                    'id': guide['id'],
+                    'name': guide['name'],
+                    'specialties': guide['specialties'],
+                    'languages': guide['languages'],
+                    'availability': guide['availability'][day],
+                    'rating': guide['rating'],
+                })
+                for guide in self.tour_guides if day in guide['availability']
+            )
+            for day in {day for guide in self.tour_guides for day in guide['availability']}
+        })
+
+        self.json = json.dumps(data, sort_keys=True)
+        self.version = hashlib.sha256(self.json.encode()).hexdigest()[:16]
+
+    def guides_available_on(self, day: str) -> Tuple[Record, ...]:
+        """Guides with at least one slot on a day of the week ("Monday")."""
+        return self._guides_by_day.get(day.lower(), ())
+
+    def guides_with_specialty(self, specialty: str) -> Tuple[Record, ...]:
+        """Guides listing a specialty, matched case-insensitively."""
+        return self._guides_by_specialty.get(specialty.lower(), ())
+
+    def guides_speaking(self, language: str) -> Tuple[Record, ...]:
+        """Guides who lead tours in a language, matched case-insensitively."""
+        return self._guides_by_language.get(language.lower(), ())
+
+    def guide_schedule(self, day: str) -> Tuple[Record, ...]:
+        """
+        Summaries of the guides available on a day of the week.
+
+        Args:
+            day (str): Day name as in the guides' availability ("Monday").
+
+        Returns:
+            tuple: id, name, specialties, languages, rating and the day's
+            time slots of each guide available that day.
+        """
+        return self._schedules.get(day.lower(), ())
+
+    def ticket_price(self, ticket_type: str, default: Optional[float] = None) -> Optional[float]:
+        """Price of a ticket type, or default if the type is unknown."""
+        ticket = self.tickets_by_type.get(ticket_type)
+        return ticket['price'] if ticket is not None else default
+
+    def to_dict(self) -> Dict:
+        """A mutable copy of the data in the shape of get_all_museum_data()."""
+        return thaw(self._data)
+
+_catalog = None
+_catalog_lock = threading.Lock()
+
+def get_catalog() -> MuseumCatalog:
+    """
+    Get the process-wide museum catalog, building it on first use.
+
+    Returns:
+        MuseumCatalog: The shared catalog.
+    """
+    global _catalog
+    if _catalog is None:
+        with _catalog_lock:
+            if _catalog is None:
+                _catalog = MuseumCatalog(museum_data.get_all_museum_data())
+    return _catalog
+
+def read_catalog() -> MuseumCatalog:
+    """
+    Build a catalog from the current helpers/museum_data.py without
+    publishing it or reloading the imported module.
+
+    Returns:
+        MuseumCatalog: A catalog of the data as it is on disk now.
+    """
+    spec = importlib.util.spec_from_file_location(museum_data.__name__, museum_data.__file__)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return MuseumCatalog(module.get_all_museum_data())
+
+def reload_catalog() -> MuseumCatalog:
+    """
+    Re-read helpers/museum_data.py and swap in a catalog built from it.
+
+    Callers holding the previous catalog keep a consistent view of the old data.
+
+    Returns:
+        MuseumCatalog: The new shared catalog.
+    """
+    global _catalog
+    with _catalog_lock:
+        importlib.reload(museum_data)
+        _catalog = MuseumCatalog(museum_data.get_all_museum_data())
+        return _catalog
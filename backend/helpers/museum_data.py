@@ -248,4 +248,4 @@ def get_all_museum_data():
         "tour_types": TOUR_TYPES,
         "museum_info": MUSEUM_INFO,
         "feedback_questions": FEEDBACK_QUESTIONS
-    } 
\ No newline at end of file
+    }
@@ -0,0 +1,394 @@
+"""
+Exact vector search over a memory-mapped NumPy matrix.
+
+The museum corpus is a few dozen short documents, small enough that a brute
+force search beats an approximate index. Embeddings are stored L2-normalized
+as float32 rows of a .npy file, so a query is one matrix-vector product
+followed by a partial sort. Texts, IDs and metadata live in a JSON sidecar.
+
+Layout of the index directory:
+    index.json           IDs, texts, metadata and the current vectors file
+    vectors-<gen>.npy    the (documents x dimension) float32 matrix
+
+The matrix is opened with mmap_mode="r": loading copies nothing, and every
+reader, in this process or another worker, shares the same page cache pages.
+Writers never modify a published file. They write a new vectors-<gen>.npy
+and then atomically replace index.json, so readers see either the old or
+the new index, and mappings of the old file stay valid until dropped.
+Readers notice a new generation by a stat of index.json on each query.
+
+Writers in different processes (several app workers, a re-index CLI) take
+an exclusive flock on write.lock in the directory around reading, changing
+and publishing the index, so no update is lost. A publish removes only
+vectors files older than the generation it replaced.
+
+Implements the vectorstore calls the app makes: get, add_texts and
+add_embeddings (upserts), delete and similarity search with Chroma-style
+metadata filters.
+"""
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+import fcntl
+import glob
+import json
+import os
+import re
+import threading
+import uuid
+import numpy as np
+
+INDEX_FILE = "index.json"
+LOCK_FILE = "write.lock"
+FORMAT_VERSION = 1
+
+class _Snapshot(NamedTuple):
+    stamp: Optional[Tuple[int, int, int]]
+    generation: int
+    vectors: np.ndarray
+    ids: List[str]
+    texts: List[str]
+    metadatas: List[Dict]
+    positions: Dict[str, int]
+    masks: Dict[str, np.ndarray]
+
+def _empty_snapshot(stamp: Optional[Tuple[int, int, int]] = None) -> _Snapshot:
+    return _Snapshot(stamp, 0, np.empty((0, 0), dtype=np.float32), [], [], [], {}, {})
+
+def _normalized(vectors) -> np.ndarray:
+    matrix = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    return matrix / np.where(norms == 0, 1, norms)
+
+def matches(metadata: Dict, where: Dict) -> bool:
+    """
+    Check a document's metadata against a Chroma-style where clause.
+
+    Supports field equality, the $eq, $ne, $in and $nin operators, and
+    $and / $or over sub-clauses.
+
+    Args:
+        metadata (dict): The document metadata.
+        where (dict): The filter, e.g. {"type": {"$in": ["ticket", "offer"]}}.
+
+    Returns:
+        bool: True when the document passes the filter.
+    """
+    for key, condition in where.items():
+        if key == "$and":
+            if not all(matches(metadata, clause) for clause in condition):
+                return False
+        elif key == "$or":
+            if not any(matches(metadata, clause) for clause in condition):
+                return False
+        elif isinstance(condition, dict):
+            value = metadata.get(key)
+            for operator, operand in condition.items():
+                if operator == "$eq" and value != operand:
+                    return False
+                if operator == "$ne" and value == operand:
+                    return False
+                if operator == "$in" and value not in operand:
+                    return False
+                if operator == "$nin" and value in operand:
+                    return False
+                if operator not in ("$eq", "$ne", "$in", "$nin"):
+                    raise ValueError(f"Unsupported filter operator: {operator}")
+        elif metadata.get(key) != condition:
+            return False
+    return True
+
+class NumpyVectorStore(VectorStore):
+    """
+    Vectorstore keeping normalized embeddings in a memory-mapped .npy file.
+
+    Args:
+        directory (str): Directory holding index.json and the vectors files.
+        embedding_function (Embeddings): Embeds texts on add and queries on search.
+    """
+
+    def __init__(self, directory: str, embedding_function: Optional[Embeddings] = None):
+        self.directory = directory
+        self.embedding_function = embedding_function
+        self._snapshot = _empty_snapshot()
+        self._load_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    @contextmanager
+    def _writing(self):
+        # The thread lock orders this process's writers; flock orders processes
+        with self._write_lock:
+            with open(os.path.join(self.directory, LOCK_FILE), "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    @classmethod
+    def exists(cls, directory: str) -> bool:
+        """Whether an index has been written to the directory."""
+        return os.path.exists(os.path.join(directory, INDEX_FILE))
+
+    @property
+    def embeddings(self) -> Optional[Embeddings]:
+        return self.embedding_function
+
+    def __len__(self) -> int:
+        return len(self._current().ids)
+
+    # Reading
+
+    def _stamp(self) -> Optional[Tuple[int, int, int]]:
+        try:
+            stat = os.stat(os.path.join(self.directory, INDEX_FILE))
+        except FileNotFoundError:
+            return None
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+    def _current(self) -> _Snapshot:
+        # One stat per call keeps readers in other processes up to date
+        stamp = self._stamp()
+        snapshot = self._snapshot
+        if snapshot.stamp != stamp:
+            with self._load_lock:
+                snapshot = self._snapshot
+                while snapshot.stamp != stamp:
+                    try:
+                        snapshot = self._snapshot = self._load(stamp)
+                    except FileNotFoundError:
+                        # Two publishes since index.json was read removed its
+                        # vectors file; the index now names a newer one
+                        stamp = self._stamp()
+        return snapshot
+
+    def _load(self, stamp: Optional[Tuple[int, int, int]]) -> _Snapshot:
+        if stamp is None:
+            return _empty_snapshot()
+        with open(os.path.join(self.directory, INDEX_FILE)) as f:
+            index = json.load(f)
+        if index.get("format") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported vector index format: {index.get('format')}")
+        ids = index["ids"]
+        if ids:
+            vectors = np.load(os.path.join(self.directory, index["vectors"]), mmap_mode="r")
+        else:
+            vectors = np.empty((0, index.get("dimension", 0)), dtype=np.float32)
+        return _Snapshot(
+            stamp, index["generation"], vectors, ids, index["texts"], index["metadatas"],
+            {document_id: i for i, document_id in enumerate(ids)}, {},
+        )
+
+    def _mask(self, snapshot: _Snapshot, where: Dict) -> np.ndarray:
+        # Masks are cached per snapshot; the app only uses a handful of filters
+        key = json.dumps(where, sort_keys=True)
+        mask = snapshot.masks.get(key)
+        if mask is None:
+            mask = np.fromiter((matches(metadata, where) for metadata in snapshot.metadatas), dtype=bool, count=len(snapshot.ids))
+            snapshot.masks[key] = mask
+        return mask
+
+    def get(self, ids: Optional[List[str]] = None, where: Optional[Dict] = None, include: Optional[List[str]] = None, **kwargs: Any) -> Dict:
+        """
+        Read stored documents, like Chroma's get.
+
+        Args:
+            ids (list): Only these IDs; all documents when omitted.
+            where (dict): Optional metadata filter.
+            include (list): Accepted for compatibility; IDs, texts and metadata are always returned.
+
+        Returns:
+            dict: Parallel "ids", "documents" and "metadatas" lists.
+        """
+        snapshot = self._current()
+        if ids is None:
+            positions = range(len(snapshot.ids))
+        else:
+            positions = [snapshot.positions[i] for i in ids if i in snapshot.positions]
+        if where:
+            positions = [i for i in positions if matches(snapshot.metadatas[i], where)]
+        return {
+            "ids": [snapshot.ids[i] for i in positions],
+            "documents": [snapshot.texts[i] for i in positions],
+            "metadatas": [snapshot.metadatas[i] for i in positions],
+        }
+
+    def similarity_search_with_score_by_vector(self, embedding: List[float], k: int = 4, filter: Optional[Dict] = None, **kwargs: Any) -> List[Tuple[Document, float]]:
+        """
+        Exact top-k search by cosine similarity.
+
+        Args:
+            embedding (list): The query embedding.
+            k (int): Number of documents to return.
+            filter (dict): Optional Chroma-style metadata filter.
+
+        Returns:
+            list: (Document, cosine similarity) pairs, most similar first.
+        """
+        snapshot = self._current()
+        if not snapshot.ids or k <= 0:
+            return []
+        scores = snapshot.vectors @ _normalized(embedding)
+        candidates = None
+        if filter:
+            candidates = np.flatnonzero(self._mask(snapshot, filter))
+            scores = scores[candidates]
+        if k < len(scores):
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top], kind="stable")]
+        else:
+            top = np.argsort(-scores, kind="stable")
+        results = []
+        for i in top:
+            position = int(candidates[i]) if candidates is not None else int(i)
+            document = Document(page_content=snapshot.texts[position], metadata=dict(snapshot.metadatas[position]))
+            results.append((document, float(scores[i])))
+        return results
+
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4, filter: Optional[Dict] = None, **kwargs: Any) -> List[Document]:
+        return [document for document, _ in self.similarity_search_with_score_by_vector(embedding, k, filter)]
+
+    def similarity_search_with_score(self, query: str, k: int = 4, filter: Optional[Dict] = None, **kwargs: Any) -> List[Tuple[Document, float]]:
+        return self.similarity_search_with_score_by_vector(self.embedding_function.embed_query(query), k, filter)
+
+    def similarity_search(self, query: str, k: int = 4, filter: Optional[Dict] = None, **kwargs: Any) -> List[Document]:
+        return self.similarity_search_by_vector(self.embedding_function.embed_query(query), k, filter)
+
+    def _select_relevance_score_fn(self):
+        # Scores are cosine similarities already
+        return lambda score: score
+
+    # Writing
+
+    def add_texts(self, texts: Iterable[str], metadatas: Optional[List[Dict]] = None, ids: Optional[List[str]] = None, **kwargs: Any) -> List[str]:
+        """
+        Embed texts and upsert them: existing IDs are replaced in place.
+
+        Args:
+            texts (iterable): Texts to embed and store.
+            metadatas (list): Optional metadata per text.
+            ids (list): Optional IDs per text; random ones are generated when omitted.
+
+        Returns:
+            list: The IDs of the stored texts.
+        """
+        texts = list(texts)
+        if not texts:
+            return []
+        return self.add_embeddings(texts, self.embedding_function.embed_documents(texts), metadatas=metadatas, ids=ids)
+
+    def add_embeddings(self, texts: List[str], embeddings: List[List[float]], metadatas: Optional[List[Dict]] = None, ids: Optional[List[str]] = None) -> List[str]:
+        """
+        Upsert texts with embeddings computed elsewhere, e.g. by the embedding pipeline.
+
+        Args:
+            texts (list): Texts to store.
+            embeddings (list): One embedding per text.
+            metadatas (list): Optional metadata per text.
+            ids (list): Optional IDs per text; random ones are generated when omitted.
+
+        Returns:
+            list: The IDs of the stored texts.
+        """
+        texts = list(texts)
+        if not texts:
+            return []
+        ids = list(ids) if ids else [str(uuid.uuid4()) for _ in texts]
+        metadatas = [dict(metadata or {}) for metadata in metadatas] if metadatas else [{} for _ in texts]
+        vectors = _normalized(embeddings)
+
+        with self._writing():
+            snapshot = self._current()
+            if snapshot.ids and vectors.shape[1] != snapshot.vectors.shape[1]:
+                raise ValueError(
+                    f"Embedding dimension {vectors.shape[1]} does not match the index ({snapshot.vectors.shape[1]})"
+                )
+            all_ids, all_texts, all_metadatas = list(snapshot.ids), list(snapshot.texts), list(snapshot.metadatas)
+            positions = dict(snapshot.positions)
+            rows = []
+            for i, document_id in enumerate(ids):
+                if document_id in positions:
+                    rows.append(positions[document_id])
+                    all_texts[positions[document_id]] = texts[i]
+                    all_metadatas[positions[document_id]] = metadatas[i]
+                else:
+                    positions[document_id] = len(all_ids)
+                    rows.append(len(all_ids))
+                    all_ids.append(document_id)
+                    all_texts.append(texts[i])
+                    all_metadatas.append(metadatas[i])
+            matrix = np.zeros((len(all_ids), vectors.shape[1]), dtype=np.float32)
+            if snapshot.ids:
+                matrix[:len(snapshot.ids)] = snapshot.vectors
+            matrix[rows] = vectors
+            self._publish(snapshot.generation + 1, matrix, all_ids, all_texts, all_metadatas)
+        return ids
+
+    def delete(self, ids: Optional[List[str]] = None, **kwargs: Any) -> Optional[bool]:
+        """
+        Remove documents by ID; unknown IDs are ignored.
+
+        Args:
+            ids (list): IDs to remove.
+
+        Returns:
+            bool: True.
+        """
+        with self._writing():
+            snapshot = self._current()
+            removed = set(ids or [])
+            keep = [i for i, document_id in enumerate(snapshot.ids) if document_id not in removed]
+            if len(keep) == len(snapshot.ids):
+                return True
+            self._publish(
+                snapshot.generation + 1,
+                np.array(snapshot.vectors[keep], dtype=np.float32),
+                [snapshot.ids[i] for i in keep],
+                [snapshot.texts[i] for i in keep],
+                [snapshot.metadatas[i] for i in keep],
+            )
+        return True
+
+    def _publish(self, generation: int, matrix: np.ndarray, ids: List[str], texts: List[str], metadatas: List[Dict]):
+        # Caller holds the write lock
+        vectors_file = f"vectors-{generation}.npy"
+        tmp_path = os.path.join(self.directory, f"{vectors_file}.{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp_path, "wb") as f:
+            np.save(f, matrix)
+        os.replace(tmp_path, os.path.join(self.directory, vectors_file))
+
+        index = {
+            "format": FORMAT_VERSION,
+            "generation": generation,
+            "vectors": vectors_file,
+            "dimension": int(matrix.shape[1]),
+            "ids": ids,
+            "texts": texts,
+            "metadatas": metadatas,
+        }
+        index_path = os.path.join(self.directory, INDEX_FILE)
+        tmp_path = f"{index_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(index, f)
+        os.replace(tmp_path, index_path)
+
+        # The generation just replaced stays for readers that haven't
+        # noticed the new one; mappings of removed files stay valid anyway
+        for path in glob.glob(os.path.join(self.directory, "vectors-*.npy")):
+            match = re.fullmatch(r"vectors-(\d+)\.npy", os.path.basename(path))
+            if match and int(match.group(1)) < generation - 1:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+        self._snapshot = self._load(self._stamp())
+
+    @classmethod
+    def from_texts(cls, texts: List[str], embedding: Embeddings, metadatas: Optional[List[Dict]] = None, ids: Optional[List[str]] = None, directory: str = "db/vectors", **kwargs: Any) -> "NumpyVectorStore":
+        """Build or extend the index in a directory from texts."""
+        store = cls(directory, embedding_function=embedding)
+        store.add_texts(texts, metadatas=metadatas, ids=ids)
+        return store
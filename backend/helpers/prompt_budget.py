@@ -0,0 +1,107 @@
+"""
+Token budgeting for the chat prompt.
+
+The system prompt, retrieved context and question are always sent in full;
+chat history gets whatever is left of the model's context window. The most
+recent turns that fit are kept verbatim and older ones are dropped. The
+session store already folds the questions it drops into a rolling summary
+(helpers/session_store.py), sent as a leading system message; that message
+is kept whenever it fits its own budget rather than summarized again.
+"""
+from typing import Dict, List, Tuple
+import os
+import re
+
+CONTEXT_WINDOW = int(os.getenv("PROMPT_CONTEXT_WINDOW", "8192"))
+RESERVED_OUTPUT_TOKENS = int(os.getenv("PROMPT_RESERVED_OUTPUT_TOKENS", "1024"))
+SUMMARY_MAX_TOKENS = int(os.getenv("PROMPT_SUMMARY_MAX_TOKENS", "256"))
+# Per-message overhead of the role/content wrapper in the rendered history
+MESSAGE_OVERHEAD_TOKENS = 4
+
+_token_pattern = re.compile(r"\w+|[^\w\s]")
+
+def count_tokens(text: str) -> int:
+    """
+    Estimate the number of tokens a Llama-style tokenizer produces for a text.
+
+    Words count as one token plus one per extra six characters; punctuation
+    counts as one token each.
+
+    Args:
+        text (str): The text to measure.
+
+    Returns:
+        int: Estimated token count.
+    """
+    return sum(1 + (len(piece) - 1) // 6 for piece in _token_pattern.findall(text))
+
+def _message_tokens(message: Dict[str, str]) -> int:
+    return count_tokens(message.get("content", "")) + MESSAGE_OVERHEAD_TOKENS
+
+class PromptBudget:
+    """
+    Fits chat history into the token budget left by the fixed prompt parts.
+    """
+
+    def __init__(
+        self,
+        context_window: int = CONTEXT_WINDOW,
+        reserved_output_tokens: int = RESERVED_OUTPUT_TOKENS,
+        summary_max_tokens: int = SUMMARY_MAX_TOKENS,
+    ):
+        self.context_window = context_window
+        self.reserved_output_tokens = reserved_output_tokens
+        self.summary_max_tokens = summary_max_tokens
+
+    def fit(self, fixed_tokens: int, chat_history: List[Dict[str, str]]) -> Tuple[List[Dict[str, str]], Dict[str, int]]:
+        """
+        Trim chat history to the budget, dropping the oldest turns that don't fit.
+
+        Args:
+            fixed_tokens (int): Tokens used by the system prompt, context and question.
+            chat_history (list): Role/content messages, oldest first, optionally
+                led by the session store's summary as a system message.
+
+        Returns:
+            tuple: The history to send and a report of the trimming decisions.
+        """
+        available = max(self.context_window - self.reserved_output_tokens - fixed_tokens, 0)
+        message_tokens = [_message_tokens(message) for message in chat_history]
+        history_tokens = sum(message_tokens)
+
+        report = {
+            "fixed_tokens": fixed_tokens,
+            "history_budget": available,
+            "history_messages": len(chat_history),
+            "kept_messages": len(chat_history),
+            "dropped_messages": 0,
+            "summary_tokens": 0,
+            "history_tokens": history_tokens,
+            "prompt_tokens": fixed_tokens + history_tokens,
+        }
+        if history_tokens <= available:
+            return chat_history, report
+
+        # The stored summary is kept if it fits its share of the budget
+        summary, first = None, 0
+        if chat_history and chat_history[0].get("role") == "system":
+            first = 1
+            if message_tokens[0] <= min(self.summary_max_tokens, available // 4):
+                summary = chat_history[0]
+        summary_tokens = message_tokens[0] if summary else 0
+
+        # Keep the most recent turns that fit next to it
+        split, kept_tokens = len(chat_history), 0
+        while split > first and kept_tokens + message_tokens[split - 1] <= available - summary_tokens:
+            split -= 1
+            kept_tokens += message_tokens[split]
+
+        kept = ([summary] if summary else []) + chat_history[split:]
+        report.update({
+            "kept_messages": len(chat_history) - split,
+            "dropped_messages": split - first,
+            "summary_tokens": summary_tokens,
+            "history_tokens": kept_tokens + summary_tokens,
+            "prompt_tokens": fixed_tokens + kept_tokens + summary_tokens,
+        })
+        return kept, report
@@ -2,49 +2,231 @@
 QR code generation and validation helper for museum tickets.
 """
 import qrcode
+import qrcode.image.svg
+import hashlib
 import json
-import uuid
 import base64
+import multiprocessing
+import os
+import secrets
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 from io import BytesIO
 from datetime import datetime, timedelta
+from helpers.museum_catalog import get_catalog
+from helpers.ticket_token import issue_token, decode_token, token_to_ref, InvalidTicketToken
 
-def generate_ticket_qr(ticket_data):
+# Encoder settings shared by every rendered ticket
+QR_SETTINGS = {
+    'version': 1,
+    'error_correction': qrcode.constants.ERROR_CORRECT_L,
+    'box_size': 10,
+    'border': 4,
+}
+
+# Batches at least this large are rendered in the worker pool
+PARALLEL_THRESHOLD = int(os.getenv('QR_PARALLEL_THRESHOLD', '4'))
+QR_WORKERS = int(os.getenv('QR_WORKERS', str(os.cpu_count() or 1)))
+MAX_TICKETS_PER_REQUEST = int(os.getenv('MAX_TICKETS_PER_REQUEST', '1000'))
+# Accept the old unsigned JSON payloads while they are still in circulation
+ALLOW_LEGACY_TICKETS = os.getenv('ALLOW_LEGACY_TICKETS', 'false').lower() == 'true'
+
+QR_CACHE_MAX_BYTES = int(os.getenv('QR_CACHE_MAX_BYTES', str(16 * 1024 * 1024)))
+
+_executor = None
+_executor_lock = threading.Lock()
+
+def render_qr_png(data):
     """
-    Generate a QR code for a museum ticket.
+    Render data as a QR code PNG.
     
     Args:
-        ticket_data (dict): Ticket information including visitor details, ticket type, and date.
+        data (str): The text to encode.
         
     Returns:
-        str: Base64 encoded QR code image.
+        bytes: PNG image bytes.
     """
-    # Add a unique ticket ID if not provided
-    if 'ticket_id' not in ticket_data:
-        ticket_data['ticket_id'] = str(uuid.uuid4())
-    
-    # Add timestamp for validation
-    ticket_data['generated_at'] = datetime.now().isoformat()
-    
-    # Convert ticket data to JSON
-    ticket_json = json.dumps(ticket_data)
-    
-    # Generate QR code
-    qr = qrcode.QRCode(
-        version=1,
-        error_correction=qrcode.constants.ERROR_CORRECT_L,
-        box_size=10,
-        border=4,
-    )
-    qr.add_data(ticket_json)
+    qr = qrcode.QRCode(**QR_SETTINGS)
+    qr.add_data(data)
     qr.make(fit=True)
     
-    # Create image
     img = qr.make_image(fill_color="black", back_color="white")
     
-    # Convert to base64
     buffered = BytesIO()
     img.save(buffered, format="PNG")
-    img_str = base64.b64encode(buffered.getvalue()).decode()
+    return buffered.getvalue()
+
+def render_qr_base64(data):
+    """Render data as a base64 encoded QR code PNG."""
+    return base64.b64encode(render_qr_png(data)).decode()
+
+def render_qr_svg(data):
+    """
+    Render data as a QR code SVG.
+    
+    Args:
+        data (str): The text to encode.
+        
+    Returns:
+        bytes: SVG document bytes.
+    """
+    qr = qrcode.QRCode(image_factory=qrcode.image.svg.SvgPathImage, **QR_SETTINGS)
+    qr.add_data(data)
+    qr.make(fit=True)
+    
+    buffered = BytesIO()
+    qr.make_image().save(buffered)
+    return buffered.getvalue()
+
+# Renderers and content types of the formats the QR endpoint serves
+QR_IMAGE_FORMATS = {
+    'png': (render_qr_png, 'image/png'),
+    'svg': (render_qr_svg, 'image/svg+xml'),
+}
+
+class QRImageCache:
+    """
+    LRU cache of rendered QR images keyed by a hash of payload and format.
+    
+    The key doubles as the image's ETag: the same payload always renders
+    to the same image, so cached copies never go stale.
+    
+    Args:
+        max_bytes (int): Total image bytes kept before the least recently
+            used images are evicted.
+    """
+    
+    def __init__(self, max_bytes=QR_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._images = OrderedDict()
+        self._size = 0
+        self._hits = 0
+        self._misses = 0
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def etag(data, image_format):
+        """Content hash of the image for a payload and format."""
+        return hashlib.sha256(f"{image_format}:{data}".encode('utf-8')).hexdigest()[:32]
+    
+    def get(self, data, image_format):
+        """
+        Return a rendered image, rendering it on a miss.
+        
+        Args:
+            data (str): The text to encode.
+            image_format (str): A key of QR_IMAGE_FORMATS.
+            
+        Returns:
+            tuple: Image bytes and the ETag.
+        """
+        key = self.etag(data, image_format)
+        with self._lock:
+            image = self._images.get(key)
+            if image is not None:
+                self._images.move_to_end(key)
+                self._hits += 1
+                return image, key
+            self._misses += 1
+        
+        # Render outside the lock; a concurrent miss just renders twice
+        image = QR_IMAGE_FORMATS[image_format][0](data)
+        with self._lock:
+            if key not in self._images:
+                self._images[key] = image
+                self._size += len(image)
+            while self._size > self.max_bytes and self._images:
+                _, evicted = self._images.popitem(last=False)
+                self._size -= len(evicted)
+        return image, key
+    
+    def stats(self):
+        """Hit/miss counters, entry count and cached bytes."""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'hits': self._hits,
+                'misses': self._misses,
+                'entries': len(self._images),
+                'bytes': self._size,
+                'hit_rate': self._hits / lookups if lookups else 0.0,
+            }
+    
+    def clear(self):
+        """Drop every cached image."""
+        with self._lock:
+            self._images.clear()
+            self._size = 0
+
+qr_image_cache = QRImageCache()
+
+def ticket_qr_urls(token):
+    """
+    URLs of the QR images for a ticket token.
+    
+    Args:
+        token (str): The signed ticket token.
+        
+    Returns:
+        dict: qr_url (PNG) and qr_svg_url.
+    """
+    ref = token_to_ref(token)
+    return {
+        'qr_url': f'/api/museum/tickets/{ref}/qr.png',
+        'qr_svg_url': f'/api/museum/tickets/{ref}/qr.svg',
+    }
+
+def _prepare_ticket(ticket_data):
+    # Keep a caller-supplied ID when it fits the token's 8-byte field
+    ticket_id = ticket_data.get('ticket_id', '')
+    if len(ticket_id) == 16 and all(c in '0123456789abcdef' for c in ticket_id):
+        ticket_id = bytes.fromhex(ticket_id)
+    else:
+        ticket_id = secrets.token_bytes(8)
+    
+    # Tokens carry whole seconds, so report the same timestamp
+    generated_at = datetime.now().replace(microsecond=0)
+    price = ticket_data.get('price', get_ticket_price(ticket_data['ticket_type']))
+    
+    # The QR holds only the signed token; the visitor name stays out of it
+    token = issue_token(ticket_data['ticket_type'], ticket_data['visit_date'], price, issued_at=generated_at, ticket_id=ticket_id)
+    ticket_data['ticket_id'] = ticket_id.hex()
+    ticket_data['generated_at'] = generated_at.isoformat()
+    ticket_data['qr_data'] = token
+    return token
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                # Spawned workers avoid forking a multi-threaded web server
+                _executor = ProcessPoolExecutor(
+                    max_workers=QR_WORKERS,
+                    mp_context=multiprocessing.get_context('spawn'),
+                )
+    return _executor
+
+def shutdown_executor():
+    """Stop the QR rendering worker pool."""
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(cancel_futures=True)
+            _executor = None
+
+def generate_ticket_qr(ticket_data):
+    """
+    Generate a QR code for a museum ticket.
+    
+    Args:
+        ticket_data (dict): Ticket information including visitor details, ticket type, and date.
+        
+    Returns:
+        str: Base64 encoded QR code image.
+    """
+    img_str = render_qr_base64(_prepare_ticket(ticket_data))
     
     return img_str, ticket_data['ticket_id']
 
@@ -52,12 +234,57 @@ def validate_ticket_qr(qr_data):
     """
     Validate a QR code from a museum ticket.
     
+    The token's signature is checked in constant time, so no lookup is
+    needed to tell a genuine ticket from a forged one.
+    
     Args:
-        qr_data (str): QR code data in JSON format.
+        qr_data (str): Signed ticket token read from the QR code.
         
     Returns:
         dict: Validation result with status and message.
     """
+    try:
+        ticket_data = decode_token(qr_data)
+    except InvalidTicketToken as e:
+        if ALLOW_LEGACY_TICKETS and qr_data.lstrip().startswith('{'):
+            return _validate_legacy_ticket(qr_data)
+        return {
+            'valid': False,
+            'message': f'Invalid ticket: {e}'
+        }
+    except Exception as e:
+        return {
+            'valid': False,
+            'message': f'Validation error: {str(e)}'
+        }
+    
+    return _check_ticket_dates(ticket_data)
+
+def _check_ticket_dates(ticket_data):
+    # Check if ticket is not expired (valid for 1 year from generation)
+    generated_at = datetime.fromisoformat(ticket_data['generated_at'])
+    if datetime.now() - generated_at > timedelta(days=365):
+        return {
+            'valid': False,
+            'message': 'Ticket has expired'
+        }
+    
+    # Check if visit date is valid (not in the past)
+    visit_date = datetime.fromisoformat(ticket_data['visit_date'])
+    if visit_date < datetime.now().replace(hour=0, minute=0, second=0, microsecond=0):
+        return {
+            'valid': False,
+            'message': 'Visit date has passed'
+        }
+    
+    # All checks passed
+    return {
+        'valid': True,
+        'message': 'Ticket is valid',
+        'ticket_data': ticket_data
+    }
+
+def _validate_legacy_ticket(qr_data):
     try:
         # Parse QR data
         ticket_data = json.loads(qr_data)
@@ -71,28 +298,7 @@ def validate_ticket_qr(qr_data):
                     'message': f'Invalid ticket: Missing {field}'
                 }
         
-        # Check if ticket is not expired (valid for 1 year from generation)
-        generated_at = datetime.fromisoformat(ticket_data['generated_at'])
-        if datetime.now() - generated_at > timedelta(days=365):
-            return {
-                'valid': False,
-                'message': 'Ticket has expired'
-            }
-        
-        # Check if visit date is valid (not in the past)
-        visit_date = datetime.fromisoformat(ticket_data['visit_date'])
-        if visit_date < datetime.now().replace(hour=0, minute=0, second=0, microsecond=0):
-            return {
-                'valid': False,
-                'message': 'Visit date has passed'
-            }
-        
-        # All checks passed
-        return {
-            'valid': True,
-            'message': 'Ticket is valid',
-            'ticket_data': ticket_data
-        }
+        return _check_ticket_dates(ticket_data)
     
     except json.JSONDecodeError:
         return {
@@ -105,37 +311,70 @@ def validate_ticket_qr(qr_data):
             'message': f'Validation error: {str(e)}'
         }
 
-def create_mock_ticket(visitor_name, ticket_type, visit_date, num_tickets=1):
+def issue_tickets(visitor_name, ticket_type, visit_date, num_tickets=1, inline_qr=False):
     """
-    Create a mock ticket for testing purposes.
+    Issue a batch of tickets with links to their QR images.
+    
+    With inline_qr, QR codes are rendered into the tickets as well, in a
+    worker pool. Ticket data is built on the calling thread; only QR
+    rendering runs in the pool. Tickets are yielded in order as soon as each
+    one is ready, so callers can stream the first tickets while the rest
+    render.
     
     Args:
         visitor_name (str): Name of the visitor.
         ticket_type (str): Type of ticket (Adult, Child, Senior, etc.).
         visit_date (str): Date of visit in ISO format (YYYY-MM-DD).
         num_tickets (int): Number of tickets to generate.
+        inline_qr (bool): Also include base64 PNG QR codes.
         
-    Returns:
-        list: List of ticket data dictionaries.
+    Yields:
+        dict: Ticket data including its QR image URLs.
     """
+    price = get_ticket_price(ticket_type)
     tickets = []
-    
+    payloads = []
     for _ in range(num_tickets):
         ticket_data = {
             'visitor_name': visitor_name,
             'ticket_type': ticket_type,
             'visit_date': visit_date,
             'purchase_date': datetime.now().isoformat(),
-            'price': get_ticket_price(ticket_type)
+            'price': price
         }
-        
-        qr_code, ticket_id = generate_ticket_qr(ticket_data)
-        ticket_data['qr_code'] = qr_code
-        ticket_data['ticket_id'] = ticket_id
-        
+        payloads.append(_prepare_ticket(ticket_data))
+        ticket_data.update(ticket_qr_urls(ticket_data['qr_data']))
         tickets.append(ticket_data)
     
-    return tickets
+    if not inline_qr:
+        yield from tickets
+        return
+    
+    if num_tickets >= PARALLEL_THRESHOLD and QR_WORKERS > 1:
+        chunksize = max(1, min(8, num_tickets // (QR_WORKERS * 4)))
+        qr_codes = _get_executor().map(render_qr_base64, payloads, chunksize=chunksize)
+    else:
+        qr_codes = map(render_qr_base64, payloads)
+    
+    for ticket_data, qr_code in zip(tickets, qr_codes):
+        ticket_data['qr_code'] = qr_code
+        yield ticket_data
+
+def create_mock_ticket(visitor_name, ticket_type, visit_date, num_tickets=1, inline_qr=False):
+    """
+    Create a mock ticket for testing purposes.
+    
+    Args:
+        visitor_name (str): Name of the visitor.
+        ticket_type (str): Type of ticket (Adult, Child, Senior, etc.).
+        visit_date (str): Date of visit in ISO format (YYYY-MM-DD).
+        num_tickets (int): Number of tickets to generate.
+        inline_qr (bool): Also include base64 PNG QR codes.
+        
+    Returns:
+        list: List of ticket data dictionaries.
+    """
+    return list(issue_tickets(visitor_name, ticket_type, visit_date, num_tickets, inline_qr))
 
 def get_ticket_price(ticket_type):
     """
@@ -147,14 +386,6 @@ def get_ticket_price(ticket_type):
     Returns:
         float: Price of the ticket.
     """
-    # This would typically come from a database or configuration
-    prices = {
-        'Adult': 25.00,
-        'Child': 12.00,
-        'Senior': 18.00,
-        'Student': 15.00,
-        'Family': 65.00,
-        'Group': 20.00
-    }
-    
-    return prices.get(ticket_type, 25.00)  # Default to adult price if type not found 
\ No newline at end of file
+    catalog = get_catalog()
+    # Default to adult price if type not found
+    return catalog.ticket_price(ticket_type, catalog.ticket_price('Adult'))
@@ -0,0 +1,128 @@
+"""
+Semantic answer cache for FAQ-style chat questions.
+"""
+from collections import OrderedDict
+from typing import Dict, Iterator, List, Optional, Tuple
+import math
+import re
+import threading
+
+_chunk_pattern = re.compile(r"\S+\s*|\s+")
+
+def _unit(vector: List[float]) -> Tuple[float, ...]:
+    norm = math.sqrt(sum(x * x for x in vector)) or 1.0
+    return tuple(x / norm for x in vector)
+
+def _dot(a: Tuple[float, ...], b: Tuple[float, ...]) -> float:
+    return sum(x * y for x, y in zip(a, b))
+
+def replay_chunks(answer: str) -> Iterator[str]:
+    """
+    Split a stored answer into word-sized chunks for streaming replay.
+
+    Args:
+        answer (str): The cached answer text.
+
+    Yields:
+        str: Consecutive pieces of the answer, whitespace included.
+    """
+    for match in _chunk_pattern.finditer(answer):
+        yield match.group(0)
+
+class ResponseCache:
+    """
+    Stores answers keyed by query embedding, retrieved context and data version.
+
+    A stored answer is served when a new question retrieves the same context
+    documents and its embedding's cosine similarity to a cached question is at
+    least `threshold`. Changing the museum data version drops every entry.
+    """
+
+    def __init__(self, threshold: float = 0.95, max_entries: int = 512):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self._buckets: "OrderedDict[Tuple[str, ...], List[tuple]]" = OrderedDict()
+        self._size = 0
+        self._data_version = None
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def _check_version(self, data_version: str):
+        # Caller holds self._lock
+        if data_version != self._data_version:
+            self._buckets.clear()
+            self._size = 0
+            self._data_version = data_version
+
+    def lookup(self, query_vector: List[float], context_ids: List[str], data_version: str) -> Optional[str]:
+        """
+        Find a cached answer for a semantically equivalent question.
+
+        Args:
+            query_vector (list): Embedding of the user question.
+            context_ids (list): IDs of the retrieved context documents.
+            data_version (str): Current museum data version.
+
+        Returns:
+            str: The cached answer, or None on a miss.
+        """
+        unit = _unit(query_vector)
+        key = tuple(context_ids)
+        with self._lock:
+            self._check_version(data_version)
+            best_answer, best_score = None, self.threshold
+            for vector, answer in self._buckets.get(key, ()):
+                score = _dot(unit, vector)
+                if score >= best_score:
+                    best_answer, best_score = answer, score
+            if best_answer is None:
+                self._misses += 1
+                return None
+            self._buckets.move_to_end(key)
+            self._hits += 1
+            return best_answer
+
+    def store(self, query_vector: List[float], context_ids: List[str], data_version: str, answer: str):
+        """
+        Cache an answer for a question.
+
+        Args:
+            query_vector (list): Embedding of the user question.
+            context_ids (list): IDs of the retrieved context documents.
+            data_version (str): Museum data version the answer was built from.
+            answer (str): The generated answer.
+        """
+        if not answer:
+            return
+        key = tuple(context_ids)
+        with self._lock:
+            self._check_version(data_version)
+            self._buckets.setdefault(key, []).append((_unit(query_vector), answer))
+            self._buckets.move_to_end(key)
+            self._size += 1
+            # Evict least recently used context groups, oldest question first
+            while self._size > self.max_entries:
+                oldest_key = next(iter(self._buckets))
+                entries = self._buckets[oldest_key]
+                entries.pop(0)
+                self._size -= 1
+                if not entries:
+                    del self._buckets[oldest_key]
+
+    def stats(self) -> Dict[str, float]:
+        """Returns hit/miss counters and the current number of entries."""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "entries": self._size,
+                "hit_rate": self._hits / lookups if lookups else 0.0,
+            }
+
+    def clear(self):
+        """Drops every cached answer."""
+        with self._lock:
+            self._buckets.clear()
+            self._size = 0
@@ -1,12 +1,12 @@
 """
 Sentiment analysis helper for museum feedback collection.
 """
-from textblob import TextBlob
-import json
-import os
 from datetime import datetime
+from helpers.feedback_store import get_feedback_store
+from helpers.feedback_aggregates import get_feedback_aggregates
+from helpers.sentiment_service import sentiment_service, combine, to_dict
+from helpers.theme_index import get_theme_index
 
-# Mock sentiment analysis function using TextBlob
 def analyze_sentiment(text):
     """
     Analyze the sentiment of a text using TextBlob.
@@ -17,32 +17,86 @@ def analyze_sentiment(text):
     Returns:
         dict: Sentiment analysis results including polarity and subjectivity.
     """
-    if not text:
-        return {
-            'polarity': 0,
-            'subjectivity': 0,
-            'sentiment': 'neutral'
-        }
+    return to_dict(sentiment_service.score(text))
+
+def _answer_text(answer):
+    # Answers are either plain strings or dicts with a 'text' field
+    text = answer.get('text') if isinstance(answer, dict) else answer
+    return text if isinstance(text, str) and text.strip() else None
+
+def analyze_feedback_batch(feedback_batch):
+    """
+    Add per-answer and overall sentiment to several feedback submissions.
+    
+    Every answer text in the batch is scored in one call, and each overall
+    score is combined from its answers' scores rather than re-analyzed.
     
-    analysis = TextBlob(text)
+    Args:
+        feedback_batch (list): Feedback dicts; updated in place.
+        
+    Returns:
+        list: The same feedback dicts.
+    """
+    texts = []
+    for feedback_data in feedback_batch:
+        for answer in feedback_data['responses'].values():
+            text = _answer_text(answer)
+            if text is not None:
+                texts.append(text)
+    scores = iter(sentiment_service.score_batch(texts))
+    
+    for feedback_data in feedback_batch:
+        # Add timestamp, unless the feedback was stamped when it was received
+        feedback_data.setdefault('timestamp', datetime.now().isoformat())
+        
+        # Attach the sentiment of each text response
+        answer_scores = []
+        for question, answer in feedback_data['responses'].items():
+            if _answer_text(answer) is None:
+                continue
+            score = next(scores)
+            answer_scores.append(score)
+            if not isinstance(answer, dict):
+                answer = feedback_data['responses'][question] = {'text': answer}
+            answer['sentiment'] = to_dict(score)
+        
+        # Overall sentiment of all text responses together
+        feedback_data['overall_sentiment'] = to_dict(combine(answer_scores))
     
-    # Get polarity (-1 to 1) and subjectivity (0 to 1)
-    polarity = analysis.sentiment.polarity
-    subjectivity = analysis.sentiment.subjectivity
+    return feedback_batch
+
+def rescore_feedback(workers=None):
+    """
+    Re-score every stored feedback record, e.g. after an analyzer change.
     
-    # Determine sentiment category
-    if polarity > 0.1:
-        sentiment = 'positive'
-    elif polarity < -0.1:
-        sentiment = 'negative'
-    else:
-        sentiment = 'neutral'
+    Texts are scored in a process pool; records in the store are left as
+    they are.
     
-    return {
-        'polarity': polarity,
-        'subjectivity': subjectivity,
-        'sentiment': sentiment
-    }
+    Args:
+        workers (int): Worker processes; SENTIMENT_WORKERS by default.
+        
+    Returns:
+        list: Copies of the stored records with fresh sentiment.
+    """
+    records = list(get_feedback_store())
+    texts = [
+        text for record in records
+        for text in map(_answer_text, (record.get('responses') or {}).values())
+        if text is not None
+    ]
+    scores = iter(sentiment_service.rescore(texts, workers))
+    
+    for record in records:
+        answer_scores = []
+        for question, answer in (record.get('responses') or {}).items():
+            if _answer_text(answer) is None:
+                continue
+            score = next(scores)
+            answer_scores.append(score)
+            if isinstance(answer, dict):
+                answer['sentiment'] = to_dict(score)
+        record['overall_sentiment'] = to_dict(combine(answer_scores))
+    return records
 
 def collect_feedback(feedback_data):
     """
@@ -56,27 +110,7 @@ def collect_feedback(feedback_data):
     """
     # Add timestamp
     feedback_data['timestamp'] = datetime.now().isoformat()
-    
-    # Analyze sentiment for each text response
-    for question, answer in feedback_data['responses'].items():
-        if isinstance(answer, str) and len(answer.strip()) > 0:
-            feedback_data['responses'][question]['sentiment'] = analyze_sentiment(answer)
-    
-    # Calculate overall sentiment
-    text_responses = [
-        answer for question, answer in feedback_data['responses'].items()
-        if isinstance(answer, str) and len(answer.strip()) > 0
-    ]
-    
-    if text_responses:
-        overall_sentiment = analyze_sentiment(' '.join(text_responses))
-        feedback_data['overall_sentiment'] = overall_sentiment
-    else:
-        feedback_data['overall_sentiment'] = {
-            'polarity': 0,
-            'subjectivity': 0,
-            'sentiment': 'neutral'
-        }
+    analyze_feedback_batch([feedback_data])
     
     # Save feedback to file (in a real system, this would go to a database)
     save_feedback(feedback_data)
@@ -85,84 +119,55 @@ def collect_feedback(feedback_data):
 
 def save_feedback(feedback_data):
     """
-    Save feedback data to a file.
+    Append feedback data to the feedback store.
     
     Args:
-        feedback_data (dict): The feedback data to save.
+        feedback_data (dict): The feedback data to save; gets an 'id' key.
+        
+    Returns:
+        str: The ID of the stored feedback.
     """
-    # Create feedback directory if it doesn't exist
-    feedback_dir = 'db/feedback'
-    os.makedirs(feedback_dir, exist_ok=True)
-    
-    # Generate filename with timestamp
-    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    filename = f"{feedback_dir}/feedback_{timestamp}.json"
-    
-    # Save to file
-    with open(filename, 'w') as f:
-        json.dump(feedback_data, f, indent=2)
+    # The aggregates follow the store from their first use on
+    get_feedback_aggregates()
+    return get_feedback_store().append(feedback_data)
 
-def get_feedback_summary():
+def save_feedback_batch(feedback_batch):
     """
-    Get a summary of all feedback.
+    Append several feedback submissions to the feedback store at once.
     
+    Args:
+        feedback_batch (list): The feedback data to save; each gets an 'id' key.
+        
     Returns:
-        dict: Summary of feedback including average sentiment and common themes.
+        list: The IDs of the stored feedback.
     """
-    feedback_dir = 'db/feedback'
-    
-    if not os.path.exists(feedback_dir):
-        return {
-            'total_feedback': 0,
-            'average_sentiment': 'neutral',
-            'average_polarity': 0,
-            'average_subjectivity': 0,
-            'common_themes': []
-        }
+    get_feedback_aggregates()
+    return get_feedback_store().append_many(feedback_batch)
+
+def get_feedback_summary(date_from=None, date_to=None):
+    """
+    Get a summary of all feedback, or of feedback submitted in a date range.
     
-    # Get all feedback files
-    feedback_files = [f for f in os.listdir(feedback_dir) if f.endswith('.json')]
+    Answered from running aggregates, so the cost doesn't grow with the
+    amount of feedback stored.
     
-    if not feedback_files:
-        return {
-            'total_feedback': 0,
-            'average_sentiment': 'neutral',
-            'average_polarity': 0,
-            'average_subjectivity': 0,
-            'common_themes': []
-        }
-    
-    # Process all feedback
-    total_polarity = 0
-    total_subjectivity = 0
-    sentiment_counts = {'positive': 0, 'neutral': 0, 'negative': 0}
-    
-    for filename in feedback_files:
-        with open(os.path.join(feedback_dir, filename), 'r') as f:
-            feedback = json.load(f)
-            
-            if 'overall_sentiment' in feedback:
-                sentiment = feedback['overall_sentiment']
-                total_polarity += sentiment['polarity']
-                total_subjectivity += sentiment['subjectivity']
-                sentiment_counts[sentiment['sentiment']] += 1
-    
-    # Calculate averages
-    total_feedback = len(feedback_files)
-    average_polarity = total_polarity / total_feedback
-    average_subjectivity = total_subjectivity / total_feedback
-    
-    # Determine most common sentiment
-    most_common_sentiment = max(sentiment_counts, key=sentiment_counts.get)
-    
-    return {
-        'total_feedback': total_feedback,
-        'average_sentiment': most_common_sentiment,
-        'average_polarity': average_polarity,
-        'average_subjectivity': average_subjectivity,
-        'sentiment_distribution': sentiment_counts,
-        'common_themes': []  # In a real system, this would use NLP to extract themes
-    }
+    Args:
+        date_from (str): First day (YYYY-MM-DD), inclusive.
+        date_to (str): Last day (YYYY-MM-DD), inclusive.
+        
+    Returns:
+        dict: Summary of feedback including average sentiment and common themes.
+    """
+    summary = get_feedback_aggregates().summary(date_from, date_to)
+    
+    # Themes are indexed per day, week and month, not for arbitrary ranges
+    summary['common_themes'] = []
+    if date_from is None and date_to is None:
+        themes = get_theme_index().top(10)
+        summary['common_themes'] = sorted(
+            themes['entities'] + themes['terms'], key=lambda theme: -theme['mentions']
+        )[:10]
+    return summary
 
 def create_mock_feedback(visitor_name, visit_date, rating, comments):
     """
@@ -0,0 +1,178 @@
+"""
+Sentiment scoring for feedback texts.
+
+Scores come from TextBlob's pattern analyzer, called directly so no
+TextBlob object is built per text. A polarity is the mean of the word-level
+assessments in the text, so keeping the assessment count with each score
+lets an overall score for several answers be computed from the per-answer
+scores instead of re-parsing their concatenation. Repeated texts are
+answered from an LRU memo cache, and bulk re-scoring can run in a process
+pool.
+"""
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, NamedTuple, Optional
+import multiprocessing
+import os
+import threading
+from textblob.en import sentiment as pattern_sentiment
+
+SENTIMENT_CACHE_SIZE = int(os.getenv("SENTIMENT_CACHE_SIZE", "4096"))
+SENTIMENT_WORKERS = int(os.getenv("SENTIMENT_WORKERS", str(os.cpu_count() or 1)))
+# Texts per task sent to a rescoring worker
+RESCORE_CHUNK_SIZE = 256
+
+class Score(NamedTuple):
+    polarity: float
+    subjectivity: float
+    # Number of sentiment-bearing words or phrases the score averages over
+    assessments: int
+
+NEUTRAL = Score(0.0, 0.0, 0)
+
+def label(polarity: float) -> str:
+    """Map a polarity to positive, negative or neutral."""
+    if polarity > 0.1:
+        return 'positive'
+    elif polarity < -0.1:
+        return 'negative'
+    return 'neutral'
+
+def to_dict(score: Score) -> Dict:
+    """The polarity/subjectivity/sentiment dict stored with feedback."""
+    return {
+        'polarity': score.polarity,
+        'subjectivity': score.subjectivity,
+        'sentiment': label(score.polarity)
+    }
+
+def _score_text(text: str) -> Score:
+    if not text:
+        return NEUTRAL
+    result = pattern_sentiment(text)
+    return Score(result[0], result[1], len(result.assessments))
+
+def _score_chunk(texts: List[str]) -> List[Score]:
+    return [_score_text(text) for text in texts]
+
+def combine(scores: List[Score]) -> Score:
+    """
+    Combine per-text scores into the score of the texts taken together.
+
+    Each polarity is weighted by its assessment count, which matches scoring
+    the joined texts except for negations that would span two answers.
+
+    Args:
+        scores (list): Per-text scores.
+
+    Returns:
+        Score: The combined score.
+    """
+    count = sum(score.assessments for score in scores)
+    if not count:
+        return NEUTRAL
+    return Score(
+        sum(score.polarity * score.assessments for score in scores) / count,
+        sum(score.subjectivity * score.assessments for score in scores) / count,
+        count,
+    )
+
+class SentimentService:
+    """
+    Memoized sentiment scoring with a batch API.
+
+    Args:
+        cache_size (int): Number of distinct texts whose scores are kept.
+    """
+
+    def __init__(self, cache_size: int = SENTIMENT_CACHE_SIZE):
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[str, Score]" = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def score(self, text: str) -> Score:
+        """Score one text, using the memo cache."""
+        return self.score_batch([text])[0]
+
+    def score_batch(self, texts: List[str]) -> List[Score]:
+        """
+        Score many texts, analyzing each distinct uncached text once.
+
+        Args:
+            texts (list): Texts to score.
+
+        Returns:
+            list: One Score per text, in order.
+        """
+        found = {}
+        with self._lock:
+            for text in texts:
+                if text in found:
+                    continue
+                score = self._cache.get(text)
+                if score is not None:
+                    self._cache.move_to_end(text)
+                    self._hits += 1
+                    found[text] = score
+        missing = [text for text in dict.fromkeys(texts) if text not in found]
+
+        scored = {text: _score_text(text) for text in missing}
+        if scored:
+            with self._lock:
+                self._misses += len(scored)
+                self._cache.update(scored)
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+            found.update(scored)
+        return [found[text] for text in texts]
+
+    def rescore(self, texts: List[str], workers: Optional[int] = None) -> List[Score]:
+        """
+        Score a large batch, such as historical feedback, in a process pool.
+
+        Bypasses the memo cache so a bulk job doesn't evict the live
+        working set.
+
+        Args:
+            texts (list): Texts to score.
+            workers (int): Worker processes; SENTIMENT_WORKERS by default.
+
+        Returns:
+            list: One Score per text, in order.
+        """
+        workers = workers or SENTIMENT_WORKERS
+        chunks = [texts[i:i + RESCORE_CHUNK_SIZE] for i in range(0, len(texts), RESCORE_CHUNK_SIZE)]
+        if workers <= 1 or len(chunks) <= 1:
+            return [score for chunk in chunks for score in _score_chunk(chunk)]
+
+        with self._lock:
+            if self._executor is None:
+                # Spawned workers avoid forking a multi-threaded web server
+                self._executor = ProcessPoolExecutor(
+                    max_workers=workers,
+                    mp_context=multiprocessing.get_context('spawn'),
+                )
+            executor = self._executor
+        return [score for chunk in executor.map(_score_chunk, chunks) for score in chunk]
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'hits': self._hits,
+                'misses': self._misses,
+                'entries': len(self._cache),
+                'hit_rate': self._hits / lookups if lookups else 0.0,
+            }
+
+    def shutdown(self):
+        """Stop the rescoring pool."""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(cancel_futures=True)
+                self._executor = None
+
+sentiment_service = SentimentService()
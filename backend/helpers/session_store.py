@@ -0,0 +1,458 @@
+"""
+Pluggable chat session stores: in-process memory, SQLite (WAL) and Redis.
+
+Every backend keeps the same limits: idle sessions expire after SESSION_TTL,
+and once a session goes over MAX_TURNS or MAX_SESSION_TOKENS its oldest
+messages are dropped and the dropped user questions are kept in a short
+rolling summary.
+"""
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+# Session store limits
+MAX_SESSIONS = int(os.getenv("CHAT_MAX_SESSIONS", "1000"))
+SESSION_TTL = float(os.getenv("CHAT_SESSION_TTL", "3600"))
+MAX_TURNS = int(os.getenv("CHAT_MAX_TURNS", "20"))
+MAX_SESSION_TOKENS = int(os.getenv("CHAT_MAX_SESSION_TOKENS", "4000"))
+SUMMARY_MAX_CHARS = 500
+
+USER = sys.intern("user")
+ASSISTANT = sys.intern("assistant")
+
+Message = Tuple[str, str]
+
+def approx_tokens(text: str) -> int:
+    """Cheap token estimate (about four characters per token)."""
+    return len(text) // 4 + 1
+
+def fold_summary(summary: str, dropped: List[Message]) -> str:
+    """
+    Add the user questions from dropped messages to a rolling summary.
+
+    Args:
+        summary (str): The current summary.
+        dropped (list): (role, content) messages removed from the session.
+
+    Returns:
+        str: The updated summary, capped at SUMMARY_MAX_CHARS.
+    """
+    for role, content in dropped:
+        if role == USER:
+            note = content if len(content) <= 80 else content[:77] + "..."
+            summary = f"{summary}; {note}" if summary else note
+    return summary[-SUMMARY_MAX_CHARS:]
+
+def over_limits(message_count: int, tokens: int) -> bool:
+    """Checks whether a session must drop its oldest message."""
+    return message_count > 2 and (message_count > MAX_TURNS * 2 or tokens > MAX_SESSION_TOKENS)
+
+class SessionStore:
+    """Interface implemented by every chat session backend."""
+
+    def append(self, session_id: str, role: str, content: str):
+        """Appends a message to a session, creating the session if needed."""
+        raise NotImplementedError
+
+    def get(self, session_id: str) -> Tuple[List[Message], str]:
+        """Returns the session's (role, content) messages and rolling summary."""
+        raise NotImplementedError
+
+    def clear(self, session_id: str):
+        """Forgets one session."""
+        raise NotImplementedError
+
+    def clear_all(self):
+        """Forgets every session."""
+        raise NotImplementedError
+
+    def stats(self) -> Dict[str, int]:
+        """Reports session counts and storage usage."""
+        raise NotImplementedError
+
+class _Session:
+    """Compact per-session state: (role, content) tuples plus a rolling summary."""
+
+    __slots__ = ("messages", "tokens", "summary", "last_access")
+
+    def __init__(self, now: float):
+        self.messages: List[Message] = []
+        self.tokens = 0
+        self.summary = ""
+        self.last_access = now
+
+class MemorySessionStore(SessionStore):
+    """Process-local store bounded by LRU and idle TTL eviction."""
+
+    def __init__(self):
+        self._sessions: "OrderedDict[str, _Session]" = OrderedDict()
+        self._lock = threading.RLock()
+        self._evicted_sessions = 0
+        self._truncated_messages = 0
+
+    def append(self, session_id: str, role: str, content: str):
+        with self._lock:
+            now = time.time()
+            self._evict(now)
+            session = self._sessions.get(session_id)
+            if session is None:
+                session = self._sessions[session_id] = _Session(now)
+            else:
+                self._sessions.move_to_end(session_id)
+            session.last_access = now
+            session.messages.append((role, content))
+            session.tokens += approx_tokens(content)
+
+            dropped = []
+            while over_limits(len(session.messages), session.tokens):
+                message = session.messages.pop(0)
+                session.tokens -= approx_tokens(message[1])
+                dropped.append(message)
+            if dropped:
+                self._truncated_messages += len(dropped)
+                session.summary = fold_summary(session.summary, dropped)
+
+    def get(self, session_id: str) -> Tuple[List[Message], str]:
+        with self._lock:
+            now = time.time()
+            self._evict(now)
+            session = self._sessions.get(session_id)
+            if session is None:
+                return [], ""
+            session.last_access = now
+            self._sessions.move_to_end(session_id)
+            return list(session.messages), session.summary
+
+    def _evict(self, now: float):
+        # Least recently used sessions sit at the front of the OrderedDict
+        while self._sessions:
+            session_id, session = next(iter(self._sessions.items()))
+            if len(self._sessions) <= MAX_SESSIONS and now - session.last_access < SESSION_TTL:
+                break
+            del self._sessions[session_id]
+            self._evicted_sessions += 1
+
+    def clear(self, session_id: str):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def clear_all(self):
+        with self._lock:
+            self._sessions.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            self._evict(time.time())
+            messages = 0
+            approx_bytes = sys.getsizeof(self._sessions)
+            for session_id, session in self._sessions.items():
+                messages += len(session.messages)
+                approx_bytes += sys.getsizeof(session_id) + sys.getsizeof(session)
+                approx_bytes += sys.getsizeof(session.messages) + sys.getsizeof(session.summary)
+                for message in session.messages:
+                    approx_bytes += sys.getsizeof(message) + sys.getsizeof(message[1])
+            return {
+                "sessions": len(self._sessions),
+                "messages": messages,
+                "approx_bytes": approx_bytes,
+                "evicted_sessions": self._evicted_sessions,
+                "truncated_messages": self._truncated_messages,
+            }
+
+class SQLiteSessionStore(SessionStore):
+    """
+    SQLite store in WAL mode, shared by every worker process on one host.
+    """
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self._local = threading.local()
+        self._writes = 0
+        connection = self._connection()
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.executescript(
+            "CREATE TABLE IF NOT EXISTS chat_sessions ("
+            "  session_id TEXT PRIMARY KEY, summary TEXT NOT NULL DEFAULT '',"
+            "  tokens INTEGER NOT NULL DEFAULT 0, last_access REAL NOT NULL);"
+            "CREATE INDEX IF NOT EXISTS chat_sessions_last_access ON chat_sessions (last_access);"
+            "CREATE TABLE IF NOT EXISTS chat_messages ("
+            "  id INTEGER PRIMARY KEY AUTOINCREMENT, session_id TEXT NOT NULL,"
+            "  role TEXT NOT NULL, content TEXT NOT NULL, tokens INTEGER NOT NULL);"
+            "CREATE INDEX IF NOT EXISTS chat_messages_session ON chat_messages (session_id, id);"
+        )
+        connection.commit()
+
+    def _connection(self) -> sqlite3.Connection:
+        # One connection per thread; WAL lets readers run alongside the writer
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def append(self, session_id: str, role: str, content: str):
+        connection = self._connection()
+        now = time.time()
+        tokens = approx_tokens(content)
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            connection.execute(
+                "INSERT INTO chat_sessions (session_id, tokens, last_access) VALUES (?, ?, ?) "
+                "ON CONFLICT(session_id) DO UPDATE SET tokens = tokens + excluded.tokens, last_access = excluded.last_access",
+                (session_id, tokens, now),
+            )
+            connection.execute(
+                "INSERT INTO chat_messages (session_id, role, content, tokens) VALUES (?, ?, ?, ?)",
+                (session_id, role, content, tokens),
+            )
+            self._truncate(connection, session_id)
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+
+        self._writes += 1
+        if self._writes % 100 == 0:
+            self._evict(connection, now)
+
+    def _truncate(self, connection: sqlite3.Connection, session_id: str):
+        count, total, summary = connection.execute(
+            "SELECT COUNT(*), s.tokens, s.summary FROM chat_messages m "
+            "JOIN chat_sessions s ON s.session_id = m.session_id WHERE m.session_id = ?",
+            (session_id,),
+        ).fetchone()
+        if not over_limits(count, total):
+            return
+        dropped, dropped_ids = [], []
+        for message_id, role, content, tokens in connection.execute(
+            "SELECT id, role, content, tokens FROM chat_messages WHERE session_id = ? ORDER BY id",
+            (session_id,),
+        ).fetchall():
+            if not over_limits(count, total):
+                break
+            dropped.append((role, content))
+            dropped_ids.append((message_id,))
+            count -= 1
+            total -= tokens
+        connection.executemany("DELETE FROM chat_messages WHERE id = ?", dropped_ids)
+        connection.execute(
+            "UPDATE chat_sessions SET tokens = ?, summary = ? WHERE session_id = ?",
+            (total, fold_summary(summary, dropped), session_id),
+        )
+
+    def _evict(self, connection: sqlite3.Connection, now: float):
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            connection.execute(
+                "DELETE FROM chat_sessions WHERE last_access <= ? OR session_id IN ("
+                "SELECT session_id FROM chat_sessions ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+                (now - SESSION_TTL, MAX_SESSIONS),
+            )
+            connection.execute(
+                "DELETE FROM chat_messages WHERE session_id NOT IN (SELECT session_id FROM chat_sessions)"
+            )
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+
+    def get(self, session_id: str) -> Tuple[List[Message], str]:
+        connection = self._connection()
+        now = time.time()
+        row = connection.execute(
+            "SELECT summary, last_access FROM chat_sessions WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        if row is None or now - row[1] >= SESSION_TTL:
+            return [], ""
+        connection.execute("UPDATE chat_sessions SET last_access = ? WHERE session_id = ?", (now, session_id))
+        messages = connection.execute(
+            "SELECT role, content FROM chat_messages WHERE session_id = ? ORDER BY id", (session_id,)
+        ).fetchall()
+        return [(role, content) for role, content in messages], row[0]
+
+    def clear(self, session_id: str):
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            connection.execute("DELETE FROM chat_messages WHERE session_id = ?", (session_id,))
+            connection.execute("DELETE FROM chat_sessions WHERE session_id = ?", (session_id,))
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+
+    def clear_all(self):
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            connection.execute("DELETE FROM chat_messages")
+            connection.execute("DELETE FROM chat_sessions")
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+
+    def stats(self) -> Dict[str, int]:
+        connection = self._connection()
+        sessions, = connection.execute("SELECT COUNT(*) FROM chat_sessions").fetchone()
+        messages, = connection.execute("SELECT COUNT(*) FROM chat_messages").fetchone()
+        page_count, = connection.execute("PRAGMA page_count").fetchone()
+        page_size, = connection.execute("PRAGMA page_size").fetchone()
+        return {
+            "sessions": sessions,
+            "messages": messages,
+            "approx_bytes": page_count * page_size,
+        }
+
+class RedisSessionStore(SessionStore):
+    """
+    Redis store shared by every worker on every host.
+
+    Each session is a list of JSON-encoded [role, content] pairs plus a hash
+    holding its summary and token count; both expire after SESSION_TTL and
+    Redis' own maxmemory policy handles LRU eviction.
+
+    Stats come from counters rather than a scan of the keyspace: a sorted
+    set of session IDs by last access, per-session message and byte counts,
+    and running totals. Sessions past the TTL are pruned from the counters
+    when stats are read.
+
+    Args:
+        url (str): Redis connection URL.
+        client: Optional pre-built client speaking the Redis protocol, such
+            as a local stand-in used in tests.
+    """
+
+    def __init__(self, url: str = "redis://localhost:6379/0", client=None, prefix: str = "chat"):
+        if client is None:
+            try:
+                import redis
+            except ImportError:
+                raise ImportError("The redis session backend needs the redis package: pip install redis")
+            client = redis.Redis.from_url(url)
+        self.client = client
+        self.prefix = prefix
+        self.ttl = int(SESSION_TTL)
+        self._sessions_key = f"{prefix}:~sessions"
+        self._messages_key = f"{prefix}:~messages"
+        self._bytes_key = f"{prefix}:~bytes"
+        self._totals_key = f"{prefix}:~totals"
+
+    def _keys(self, session_id: str) -> Tuple[str, str]:
+        return f"{self.prefix}:{session_id}:messages", f"{self.prefix}:{session_id}:meta"
+
+    def _count(self, pipe, session_id: str, messages: int, size: int):
+        pipe.hincrby(self._messages_key, session_id, messages)
+        pipe.hincrby(self._bytes_key, session_id, size)
+        pipe.hincrby(self._totals_key, "messages", messages)
+        pipe.hincrby(self._totals_key, "bytes", size)
+
+    def append(self, session_id: str, role: str, content: str):
+        messages_key, meta_key = self._keys(session_id)
+        item = json.dumps([role, content])
+        pipe = self.client.pipeline()
+        pipe.rpush(messages_key, item)
+        pipe.hincrby(meta_key, "tokens", approx_tokens(content))
+        pipe.expire(messages_key, self.ttl)
+        pipe.expire(meta_key, self.ttl)
+        pipe.zadd(self._sessions_key, {session_id: time.time()})
+        self._count(pipe, session_id, 1, len(item))
+        count, tokens = pipe.execute()[:2]
+        if not over_limits(count, tokens):
+            return
+
+        # Truncation reads the whole session, which only happens at the caps
+        stored = [json.loads(item) for item in self.client.lrange(messages_key, 0, -1)]
+        summary = self.client.hget(meta_key, "summary") or b""
+        dropped = []
+        while over_limits(count, tokens):
+            role, content = stored.pop(0)
+            dropped.append((role, content))
+            count -= 1
+            tokens -= approx_tokens(content)
+        pipe = self.client.pipeline()
+        pipe.ltrim(messages_key, len(dropped), -1)
+        pipe.hincrby(meta_key, "tokens", -sum(approx_tokens(content) for _, content in dropped))
+        pipe.hset(meta_key, "summary", fold_summary(summary.decode() if isinstance(summary, bytes) else summary, dropped))
+        self._count(pipe, session_id, -len(dropped), -sum(len(json.dumps([role, content])) for role, content in dropped))
+        pipe.execute()
+
+    def get(self, session_id: str) -> Tuple[List[Message], str]:
+        messages_key, meta_key = self._keys(session_id)
+        pipe = self.client.pipeline()
+        pipe.lrange(messages_key, 0, -1)
+        pipe.hget(meta_key, "summary")
+        pipe.expire(messages_key, self.ttl)
+        pipe.expire(meta_key, self.ttl)
+        stored, summary = pipe.execute()[:2]
+        if stored:
+            self.client.zadd(self._sessions_key, {session_id: time.time()}, xx=True)
+        if isinstance(summary, bytes):
+            summary = summary.decode()
+        return [tuple(json.loads(item)) for item in stored], summary or ""
+
+    def _forget(self, session_ids: List):
+        # Drops sessions from the counters; the session keys are deleted too
+        if not session_ids:
+            return
+        pipe = self.client.pipeline()
+        pipe.hmget(self._messages_key, session_ids)
+        pipe.hmget(self._bytes_key, session_ids)
+        messages, sizes = pipe.execute()
+        pipe = self.client.pipeline()
+        pipe.hincrby(self._totals_key, "messages", -sum(int(count or 0) for count in messages))
+        pipe.hincrby(self._totals_key, "bytes", -sum(int(size or 0) for size in sizes))
+        pipe.hdel(self._messages_key, *session_ids)
+        pipe.hdel(self._bytes_key, *session_ids)
+        pipe.zrem(self._sessions_key, *session_ids)
+        for session_id in session_ids:
+            if isinstance(session_id, bytes):
+                session_id = session_id.decode()
+            pipe.delete(*self._keys(session_id))
+        pipe.execute()
+
+    def clear(self, session_id: str):
+        self._forget([session_id])
+
+    def clear_all(self):
+        keys = list(self.client.scan_iter(match=f"{self.prefix}:*"))
+        if keys:
+            self.client.delete(*keys)
+
+    def stats(self) -> Dict[str, int]:
+        self._forget(self.client.zrangebyscore(self._sessions_key, "-inf", time.time() - self.ttl))
+        pipe = self.client.pipeline()
+        pipe.zcard(self._sessions_key)
+        pipe.hmget(self._totals_key, ["messages", "bytes"])
+        sessions, (messages, size) = pipe.execute()
+        return {
+            "sessions": sessions,
+            "messages": int(messages or 0),
+            "approx_bytes": int(size or 0),
+        }
+
+def create_session_store(backend: Optional[str] = None) -> SessionStore:
+    """
+    Build the session store selected by the SESSION_BACKEND setting.
+
+    Args:
+        backend (str): "memory", "sqlite" or "redis"; defaults to SESSION_BACKEND.
+
+    Returns:
+        SessionStore: The configured store.
+    """
+    backend = (backend or os.getenv("SESSION_BACKEND", "memory")).lower()
+    if backend == "memory":
+        return MemorySessionStore()
+    if backend == "sqlite":
+        return SQLiteSessionStore(os.getenv("SESSION_SQLITE_PATH", "db/sessions.sqlite3"))
+    if backend == "redis":
+        return RedisSessionStore(os.getenv("REDIS_URL", "redis://localhost:6379/0"))
+    raise ValueError(f"Unknown session backend: {backend}")
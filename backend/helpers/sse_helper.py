@@ -0,0 +1,137 @@
+"""
+Server-sent events framing for streamed chat responses.
+
+Chunks are coalesced into frames (at most SSE_COALESCE_MS old or
+SSE_COALESCE_BYTES large) so a stream of tiny tokens doesn't cost one write
+and one packet per token. The first chunk is always sent on its own to keep
+time-to-first-token unchanged. Multi-line text is framed with one `data:`
+line per line, and every stream ends with an explicit `end` event.
+"""
+from typing import AsyncIterator, Iterator, Optional
+import asyncio
+import os
+import re
+import time
+
+SSE_COALESCE_MS = float(os.getenv("SSE_COALESCE_MS", "30"))
+SSE_COALESCE_BYTES = int(os.getenv("SSE_COALESCE_BYTES", "1024"))
+
+_line_break = re.compile(r"\r\n|\r|\n")
+
+def encode_event(data: str, event: Optional[str] = None) -> str:
+    """
+    Encode one SSE frame, splitting multi-line data over several `data:` lines.
+
+    Args:
+        data (str): The payload; line breaks are preserved by the client.
+        event (str): Optional event name.
+
+    Returns:
+        str: The encoded frame, terminated by a blank line.
+    """
+    frame = f"event: {event}\n" if event else ""
+    for line in _line_break.split(data):
+        frame += f"data: {line}\n"
+    return frame + "\n"
+
+END_EVENT = encode_event("[DONE]", event="end")
+
+def coalesce(chunks: Iterator[str], window_ms: float = SSE_COALESCE_MS, max_bytes: int = SSE_COALESCE_BYTES) -> Iterator[str]:
+    """
+    Merge consecutive chunks until the window elapses or the batch is large enough.
+
+    The window is checked when the next chunk arrives, so a batch is never
+    held back by a timer; at worst it waits for the next token.
+
+    Args:
+        chunks (Iterator[str]): Text chunks from the model.
+        window_ms (float): Longest time a batch collects chunks; 0 disables batching.
+        max_bytes (int): Batch size that triggers a write.
+
+    Yields:
+        str: Batched text.
+    """
+    window = window_ms / 1000
+    buffer, size, deadline = [], 0, 0.0
+    first = True
+    for chunk in chunks:
+        if not chunk:
+            continue
+        if first or window <= 0:
+            first = False
+            yield chunk
+            continue
+        now = time.monotonic()
+        if not buffer:
+            deadline = now + window
+        buffer.append(chunk)
+        size += len(chunk.encode("utf-8"))
+        if size >= max_bytes or now >= deadline:
+            yield "".join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield "".join(buffer)
+
+async def acoalesce(chunks: AsyncIterator[str], window_ms: float = SSE_COALESCE_MS, max_bytes: int = SSE_COALESCE_BYTES) -> AsyncIterator[str]:
+    """
+    Async variant of coalesce that also flushes on a timer when the model stalls.
+    """
+    window = window_ms / 1000
+    iterator = chunks.__aiter__()
+    buffer, size, deadline = [], 0, None
+    first = True
+    pending = asyncio.ensure_future(iterator.__anext__())
+    try:
+        while True:
+            timeout = None if deadline is None else max(deadline - time.monotonic(), 0)
+            done, _ = await asyncio.wait({pending}, timeout=timeout)
+            if not done:
+                yield "".join(buffer)
+                buffer, size, deadline = [], 0, None
+                continue
+            try:
+                chunk = pending.result()
+            except StopAsyncIteration:
+                break
+            pending = asyncio.ensure_future(iterator.__anext__())
+            if not chunk:
+                continue
+            if first or window <= 0:
+                first = False
+                yield chunk
+                continue
+            if not buffer:
+                deadline = time.monotonic() + window
+            buffer.append(chunk)
+            size += len(chunk.encode("utf-8"))
+            if size >= max_bytes or time.monotonic() >= deadline:
+                yield "".join(buffer)
+                buffer, size, deadline = [], 0, None
+    finally:
+        pending.cancel()
+    if buffer:
+        yield "".join(buffer)
+
+def sse_stream(chunks: Iterator[str], window_ms: float = SSE_COALESCE_MS, max_bytes: int = SSE_COALESCE_BYTES) -> Iterator[str]:
+    """
+    Turn model chunks into coalesced SSE frames followed by the end event.
+
+    Args:
+        chunks (Iterator[str]): Text chunks from the model.
+        window_ms (float): Coalescing window in milliseconds.
+        max_bytes (int): Batch size that triggers a write.
+
+    Yields:
+        str: Encoded SSE frames.
+    """
+    for text in coalesce(chunks, window_ms, max_bytes):
+        yield encode_event(text)
+    yield END_EVENT
+
+async def asse_stream(chunks: AsyncIterator[str], window_ms: float = SSE_COALESCE_MS, max_bytes: int = SSE_COALESCE_BYTES) -> AsyncIterator[str]:
+    """
+    Async variant of sse_stream for the ASGI endpoint.
+    """
+    async for text in acoalesce(chunks, window_ms, max_bytes):
+        yield encode_event(text)
+    yield END_EVENT
@@ -1,79 +1,157 @@
-from langchain_community.vectorstores import Chroma
+from langchain_core.vectorstores import VectorStore
 from langchain_ollama import OllamaEmbeddings
-from langchain.docstore.document import Document
+from typing import Dict
 import os
 import json
-from helpers.museum_data import get_all_museum_data
+import threading
+from helpers.museum_catalog import MuseumCatalog, get_catalog, read_catalog, reload_catalog
+from helpers.indexer import reindex, get_document_id
+from helpers.embedding_cache import CachedEmbeddings
+from helpers.numpy_vectorstore import NumpyVectorStore
+from helpers.log_helper import get_logger
+
+logger = get_logger(__name__)
 
 # Define constants
 PERSIST_DIRECTORY = "db"
 COLLECTION_NAME = "museum_data"
-embeddings = OllamaEmbeddings(model="nomic-embed-text")
-
-def get_or_create_vectorstore() -> Chroma:
-    if os.path.exists(PERSIST_DIRECTORY) and os.path.exists(f"{PERSIST_DIRECTORY}/chroma.sqlite3"):
-        print("Loading existing vectorstore...")
-        return Chroma(
-            persist_directory=PERSIST_DIRECTORY,
-            embedding_function=embeddings,
-            collection_name=COLLECTION_NAME
-        )
+EMBEDDING_MODEL = "nomic-embed-text"
+# "chroma", or "numpy" for exact search over a memory-mapped matrix without
+# the Chroma client, see helpers/numpy_vectorstore.py
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "chroma").lower()
+NUMPY_INDEX_DIRECTORY = os.getenv("NUMPY_INDEX_DIRECTORY", f"{PERSIST_DIRECTORY}/vectors")
+# Re-index changed museum records whenever an existing vectorstore is opened.
+# Off by default, since every worker would diff the index at boot; after
+# editing the museum data run `python -m helpers.indexer` or POST
+# /api/admin/vectorstore/reindex instead.
+REINDEX_ON_START = os.getenv("VECTORSTORE_REINDEX_ON_START", "false").lower() == "true"
+# Repeated visitor questions skip the embedding round trip
+embeddings = CachedEmbeddings(
+    OllamaEmbeddings(model=EMBEDDING_MODEL),
+    model_name=EMBEDDING_MODEL,
+    max_entries=int(os.getenv("EMBEDDING_CACHE_SIZE", "1024")),
+    ttl=float(os.getenv("EMBEDDING_CACHE_TTL", "86400")),
+    disk_path=os.getenv("EMBEDDING_CACHE_PATH"),
+)
+
+# Process-wide vectorstore shared by all request threads
+_vectorstore = None
+_vectorstore_lock = threading.Lock()
+
+def open_vectorstore() -> VectorStore:
+    """
+    Open the persisted vectorstore of the configured backend as it is on
+    disk, creating an empty one if needed.
+
+    Returns:
+        VectorStore: A new Chroma or NumpyVectorStore instance.
+    """
+    os.makedirs(PERSIST_DIRECTORY, exist_ok=True)
+    if VECTOR_BACKEND == "numpy":
+        return NumpyVectorStore(NUMPY_INDEX_DIRECTORY, embedding_function=embeddings)
+    # Imported here so the numpy backend never loads the Chroma client
+    from langchain_community.vectorstores import Chroma
+    return Chroma(
+        persist_directory=PERSIST_DIRECTORY,
+        embedding_function=embeddings,
+        collection_name=COLLECTION_NAME
+    )
+
+def vectorstore_exists() -> bool:
+    """Whether the configured backend already has an index on disk."""
+    if VECTOR_BACKEND == "numpy":
+        return NumpyVectorStore.exists(NUMPY_INDEX_DIRECTORY)
+    return os.path.exists(f"{PERSIST_DIRECTORY}/chroma.sqlite3")
+
+def write_museum_data_json(catalog: MuseumCatalog):
+    """Write the museum data as JSON for easy access, replacing the file atomically."""
+    path = f"{PERSIST_DIRECTORY}/museum_data.json"
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(catalog.to_dict(), f, indent=2)
+    os.replace(tmp_path, path)
+
+def get_or_create_vectorstore() -> VectorStore:
+    if vectorstore_exists():
+        logger.info("Loading existing vectorstore", extra={"fields": {"backend": VECTOR_BACKEND}})
+        vectorstore = open_vectorstore()
+        # Pick up museum data edits made since the index was built
+        if REINDEX_ON_START:
+            reindex(vectorstore)
+        return vectorstore
     else:
-        print("Creating new vectorstore with museum data...")
-        os.makedirs(PERSIST_DIRECTORY, exist_ok=True)
-        
-        # Get museum data
-        museum_data = get_all_museum_data()
-        
-        # Convert museum data to documents
-        documents = []
-        
-        # Add exhibits
-        for exhibit in museum_data['exhibits']:
-            content = f"Exhibit: {exhibit['name']}\nDescription: {exhibit['description']}\nLocation: {exhibit['location']}\nDuration: {exhibit['duration']}\nHighlights: {', '.join(exhibit['highlights'])}"
-            documents.append(Document(page_content=content, metadata={"type": "exhibit", "id": exhibit['id']}))
-        
-        # Add ticket prices
-        for ticket in museum_data['ticket_prices']:
-            content = f"Ticket Type: {ticket['type']}\nPrice: ${ticket['price']}\nDescription: {ticket['description']}"
-            documents.append(Document(page_content=content, metadata={"type": "ticket", "type_name": ticket['type']}))
-        
-        # Add special offers
-        for offer in museum_data['special_offers']:
-            content = f"Special Offer: {offer['name']}\nDescription: {offer['description']}\nValidity: {offer['validity']}"
-            documents.append(Document(page_content=content, metadata={"type": "offer", "name": offer['name']}))
-        
-        # Add tour guides
-        for guide in museum_data['tour_guides']:
-            content = f"Tour Guide: {guide['name']}\nSpecialties: {', '.join(guide['specialties'])}\nLanguages: {', '.join(guide['languages'])}\nBio: {guide['bio']}"
-            documents.append(Document(page_content=content, metadata={"type": "guide", "id": guide['id']}))
-        
-        # Add tour types
-        for tour in museum_data['tour_types']:
-            content = f"Tour Type: {tour['name']}\nDuration: {tour['duration']}\nDescription: {tour['description']}\nPrice: ${tour['price']}\nMax Group Size: {tour['max_group_size']}"
-            documents.append(Document(page_content=content, metadata={"type": "tour", "id": tour['id']}))
-        
-        # Add museum info
-        info = museum_data['museum_info']
-        content = f"Museum: {info['name']}\nAddress: {info['address']}\nPhone: {info['phone']}\nEmail: {info['email']}\nWebsite: {info['website']}\nFacilities: {', '.join(info['facilities'])}"
-        documents.append(Document(page_content=content, metadata={"type": "museum_info"}))
+        logger.info("Creating new vectorstore with museum data", extra={"fields": {"backend": VECTOR_BACKEND}})
         
-        # Add hours
-        hours_content = "Museum Hours:\n"
-        for day, hours in info['hours'].items():
-            hours_content += f"{day}: {hours}\n"
-        documents.append(Document(page_content=hours_content, metadata={"type": "hours"}))
-        
-        # Create vectorstore
-        vectorstore = Chroma.from_documents(
-            documents=documents,
-            embedding=embeddings,
-            persist_directory=PERSIST_DIRECTORY,
-            collection_name=COLLECTION_NAME
-        )
-        
-        # Save museum data as JSON for easy access
-        with open(f"{PERSIST_DIRECTORY}/museum_data.json", 'w') as f:
-            json.dump(museum_data, f, indent=2)
+        # Indexing into an empty collection embeds every document
+        vectorstore = open_vectorstore()
+        reindex(vectorstore)
+        write_museum_data_json(get_catalog())
         
         return vectorstore
+
+def get_vectorstore() -> VectorStore:
+    """
+    Get the process-wide vectorstore, opening it on first use.
+
+    Both backends are safe to share between Flask worker threads, so the
+    store is built once instead of being reopened on every chat turn.
+
+    Returns:
+        VectorStore: The shared vectorstore instance.
+    """
+    global _vectorstore
+    if _vectorstore is None:
+        with _vectorstore_lock:
+            if _vectorstore is None:
+                _vectorstore = get_or_create_vectorstore()
+    return _vectorstore
+
+def init_vectorstore() -> VectorStore:
+    """
+    Warm up the shared vectorstore at application startup.
+
+    Returns:
+        VectorStore: The shared vectorstore instance.
+    """
+    return get_vectorstore()
+
+def reload_vectorstore() -> VectorStore:
+    """
+    Rebuild the shared vectorstore from disk and swap it in.
+
+    Requests already holding the previous instance finish with it; new
+    requests get the reloaded one.
+
+    Returns:
+        VectorStore: The newly loaded vectorstore instance.
+    """
+    global _vectorstore
+    with _vectorstore_lock:
+        _vectorstore = get_or_create_vectorstore()
+        return _vectorstore
+
+def reindex_vectorstore(reload_data: bool = False, dry_run: bool = False) -> Dict:
+    """
+    Re-index the shared vectorstore in place while the server runs.
+
+    Only documents whose content changed are embedded again; queries keep
+    using the same instance throughout. A dry run with reload_data diffs
+    against the data on disk without swapping it in.
+
+    Args:
+        reload_data (bool): Re-read helpers/museum_data.py and rebuild the catalog first.
+        dry_run (bool): Only report what would change.
+
+    Returns:
+        dict: The changes, as returned by helpers.indexer.reindex, and the
+        version of the catalog they were computed from.
+    """
+    if not reload_data:
+        catalog = get_catalog()
+    elif dry_run:
+        catalog = read_catalog()
+    else:
+        catalog = reload_catalog()
+        write_museum_data_json(catalog)
+    result = reindex(get_vectorstore(), catalog, dry_run=dry_run)
+    return {"catalog_version": catalog.version, **result}
@@ -0,0 +1,12 @@
+from helpers.admin_auth import check_admin_token
+
+def test_refused_when_no_token_is_configured():
+    assert check_admin_token(None, None) == ("Admin routes are disabled until ADMIN_TOKEN is set", 403)
+    assert check_admin_token("anything", "")[1] == 403
+
+def test_wrong_or_missing_token_is_unauthorized():
+    assert check_admin_token(None, "secret")[1] == 401
+    assert check_admin_token("Secret", "secret")[1] == 401
+
+def test_matching_token_is_allowed():
+    assert check_admin_token("secret", "secret") is None
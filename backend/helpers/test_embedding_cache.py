@@ -0,0 +1,43 @@
+from helpers.embedding_cache import CachedEmbeddings, normalize_query
+
+
+class RecordingEmbeddings:
+    def __init__(self):
+        self.queries = []
+
+    def embed_query(self, text):
+        self.queries.append(text)
+        return [float(len(text)), 1.0]
+
+    def embed_documents(self, texts):
+        return [self.embed_query(text) for text in texts]
+
+
+def test_normalize_query_folds_case_space_and_trailing_punctuation():
+    assert normalize_query("  When  does the Museum OPEN?? ") == "when does the museum open"
+
+
+def test_miss_embeds_the_original_text():
+    model = RecordingEmbeddings()
+    cache = CachedEmbeddings(model, "test-model")
+    cache.embed_query("When does the Museum open?")
+    assert model.queries == ["When does the Museum open?"]
+
+
+def test_normalized_repeat_is_a_hit():
+    model = RecordingEmbeddings()
+    cache = CachedEmbeddings(model, "test-model")
+    first = cache.embed_query("When does the Museum open?")
+    assert cache.embed_query("when does the museum open") == first
+    assert len(model.queries) == 1
+    assert cache.stats()["hits"] == 1
+
+
+def test_disk_tier_survives_a_restart(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    CachedEmbeddings(RecordingEmbeddings(), "test-model", disk_path=path).embed_query("Tickets?")
+    model = RecordingEmbeddings()
+    cache = CachedEmbeddings(model, "test-model", disk_path=path)
+    assert cache.embed_query("tickets") == [8.0, 1.0]
+    assert model.queries == []
+    assert cache.stats()["disk_hits"] == 1
@@ -0,0 +1,70 @@
+import os
+import shutil
+
+import httpx
+import pytest
+
+from benchmarks.fakes import FakeEmbeddings, MemoryVectorStore
+from helpers.embedding_pipeline import EmbeddingCheckpoint, EmbeddingPipeline, is_retryable
+
+
+class NamedEmbeddings(FakeEmbeddings):
+    def __init__(self, model_name, fail_after=None):
+        super().__init__()
+        self.model_name = model_name
+        self.fail_after = fail_after
+        self.embedded = []
+
+    def embed_documents(self, texts):
+        if self.fail_after is not None and len(self.embedded) >= self.fail_after:
+            raise ValueError("model unavailable")
+        self.embedded.extend(texts)
+        return super().embed_documents(texts)
+
+
+def _documents(count):
+    ids = [f"doc:{i}" for i in range(count)]
+    return ids, [f"document number {i}" for i in ids], [{"type": "doc"} for _ in ids]
+
+
+def _pipeline(tmp_path):
+    return EmbeddingPipeline(batch_size=2, concurrency=1, checkpoint_size=2, checkpoint_directory=str(tmp_path))
+
+
+def test_transient_errors_are_retryable():
+    assert is_retryable(httpx.ConnectError("refused"))
+    assert not is_retryable(ValueError("bad model"))
+
+
+def test_interrupted_build_resumes_from_its_checkpoint(tmp_path):
+    store = MemoryVectorStore(NamedEmbeddings("model-a", fail_after=4))
+    with pytest.raises(ValueError):
+        _pipeline(tmp_path).run(store, *_documents(8))
+
+    store.embedding_function = NamedEmbeddings("model-a")
+    stats = _pipeline(tmp_path).run(store, *_documents(8))
+    assert stats["resumed"] == 4 and stats["embedded"] == 4
+    assert len(store.records) == 8
+
+
+def test_checkpoint_of_another_model_is_not_reused(tmp_path):
+    store = MemoryVectorStore(NamedEmbeddings("model-a", fail_after=4))
+    with pytest.raises(ValueError):
+        _pipeline(tmp_path).run(store, *_documents(8))
+
+    store.embedding_function = NamedEmbeddings("model-b")
+    stats = _pipeline(tmp_path).run(store, *_documents(8))
+    assert stats["resumed"] == 0 and stats["embedded"] == 8
+
+
+def test_segments_record_their_model_and_store(tmp_path):
+    saved = EmbeddingCheckpoint(str(tmp_path), "model-a", "numpy:/a")
+    saved.write(["doc:0"], ["hash"], [[1.0, 2.0]])
+    assert list(saved.load()) == ["doc:0"]
+    assert EmbeddingCheckpoint(str(tmp_path), "model-a", "numpy:/b").load() == {}
+
+    # A segment copied in from another build is ignored
+    other = EmbeddingCheckpoint(str(tmp_path), "model-b", "numpy:/a")
+    os.makedirs(other.directory)
+    shutil.copy(saved._segments()[0], other.directory)
+    assert other._segments() and other.load() == {}
@@ -0,0 +1,64 @@
+import multiprocessing
+
+from helpers.feedback_aggregates import FeedbackAggregates
+from helpers.feedback_store import FeedbackStore
+
+
+def _record(label, day="2024-05-01"):
+    return {"timestamp": f"{day}T10:00:00", "overall_sentiment": {"sentiment": label, "polarity": 0.5}}
+
+
+def _append(path, records):
+    FeedbackStore(path, fsync=False).append_many(records)
+
+
+def _open(tmp_path):
+    store = FeedbackStore(str(tmp_path / "feedback.jsonl"), fsync=False)
+    return store, FeedbackAggregates(store, str(tmp_path / "aggregates.json"))
+
+
+def test_summary_counts_records_appended(tmp_path):
+    store, aggregates = _open(tmp_path)
+    store.append_many([_record("positive"), _record("negative", day="2024-05-02")])
+    assert aggregates.summary()["total_feedback"] == 2
+    assert aggregates.summary("2024-05-02")["sentiment_distribution"]["negative"] == 1
+
+
+def test_summary_includes_records_from_other_processes(tmp_path):
+    store, aggregates = _open(tmp_path)
+    store.append(_record("positive"))
+    worker = multiprocessing.get_context("fork").Process(
+        target=_append, args=(store.path, [_record("negative"), _record("negative")])
+    )
+    worker.start()
+    worker.join()
+    summary = aggregates.summary()
+    assert summary["total_feedback"] == 3
+    assert summary["sentiment_distribution"]["negative"] == 2
+    assert aggregates._state["offset"] == store.offset()
+
+
+def test_restart_replays_only_records_after_the_snapshot(tmp_path):
+    store, aggregates = _open(tmp_path)
+    store.append(_record("positive"))
+    aggregates.save()
+    store.append(_record("neutral"))
+    store.close()
+
+    _, reopened = _open(tmp_path)
+    assert reopened.summary()["total_feedback"] == 2
+    assert reopened.rebuild() == 2
+
+
+def test_snapshot_written_by_another_worker_is_reused(tmp_path):
+    store, aggregates = _open(tmp_path)
+    other = FeedbackStore(store.path, fsync=False)
+    other.append(_record("positive"))
+    aggregates.summary()
+    aggregates.save()
+    other.append(_record("negative"))
+
+    _, reopened = _open(tmp_path)
+    summary = reopened.summary()
+    assert summary["total_feedback"] == 2
+    assert summary["sentiment_distribution"] == {"positive": 1, "neutral": 0, "negative": 1}
@@ -0,0 +1,101 @@
+import os
+
+import pytest
+
+from helpers import feedback_queue, feedback_store
+from helpers.feedback_store import FeedbackStore
+
+def record(text="Loved the dinosaurs"):
+    return {"responses": {"q1": {"text": text}}, "overall_sentiment": {"sentiment": "positive", "polarity": 0.5}}
+
+def lines(path):
+    with open(path) as f:
+        return f.read().splitlines()
+
+@pytest.fixture
+def failing_fsync(monkeypatch):
+    """Make the next os.fsync in the store fail once."""
+    calls = {"failures": 1}
+    real_fsync = os.fsync
+
+    def fsync(fd):
+        if calls["failures"]:
+            calls["failures"] -= 1
+            raise OSError("fsync failed")
+        real_fsync(fd)
+
+    monkeypatch.setattr(feedback_store.os, "fsync", fsync)
+    return calls
+
+def test_retry_after_fsync_failure_stores_once(tmp_path, failing_fsync):
+    store = FeedbackStore(str(tmp_path / "feedback.jsonl"), fsync=True)
+    seen = []
+    store.subscribe(seen.append)
+    batch = [record(), record("Too crowded")]
+
+    with pytest.raises(OSError):
+        store.append_many(batch)
+    ids = store.append_many(batch)
+
+    assert len(lines(store.path)) == 2
+    assert [r["id"] for r in seen] == ids
+    assert store.count() == 2
+
+def test_ids_survive_a_restart(tmp_path):
+    path = str(tmp_path / "feedback.jsonl")
+    first = record()
+    FeedbackStore(path, fsync=False).append(first)
+
+    reopened = FeedbackStore(path, fsync=False)
+    reopened.append_many([dict(first), record("Great cafe")])
+
+    assert len(lines(path)) == 2
+    assert reopened.count() == 2
+
+def test_duplicates_within_a_batch_are_written_once(tmp_path):
+    store = FeedbackStore(str(tmp_path / "feedback.jsonl"), fsync=False)
+    duplicate = {**record(), "id": "same"}
+    store.append_many([duplicate, dict(duplicate)])
+    assert len(lines(store.path)) == 1
+
+def test_queue_reports_stored_after_fsync_retry(tmp_path, monkeypatch, failing_fsync):
+    store = FeedbackStore(str(tmp_path / "feedback.jsonl"), fsync=True)
+    monkeypatch.setattr(feedback_queue, "save_feedback_batch", store.append_many)
+    monkeypatch.setattr(feedback_queue, "analyze_feedback_batch", lambda batch: batch)
+    monkeypatch.setattr(feedback_queue, "FEEDBACK_SAVE_BACKOFF", 0)
+    queue = feedback_queue.FeedbackQueue(workers=1, spill_path=str(tmp_path / "pending.jsonl"))
+    try:
+        feedback_id = queue.submit(record())
+        queue.drain()
+    finally:
+        queue.shutdown()
+
+    assert queue.status(feedback_id)["status"] == feedback_queue.STORED
+    assert len(lines(store.path)) == 1
+    assert not os.path.exists(tmp_path / "pending.jsonl")
+
+def test_replayed_spill_skips_records_already_written(tmp_path, monkeypatch):
+    store = FeedbackStore(str(tmp_path / "feedback.jsonl"), fsync=False)
+    written, lost = record(), record("Audio guide broke")
+    store.append(written)
+    queue = feedback_queue.FeedbackQueue(workers=0, spill_path=str(tmp_path / "pending.jsonl"))
+    queue._spill([written, lost])
+    monkeypatch.setattr(feedback_queue, "save_feedback_batch", store.append_many)
+
+    assert queue.replay_spilled() == 2
+    assert len(lines(store.path)) == 2
+
+
+def test_other_processes_appends_reach_subscribers_in_order(tmp_path):
+    path = str(tmp_path / "feedback.jsonl")
+    store, other = FeedbackStore(path, fsync=False), FeedbackStore(path, fsync=False)
+    seen = []
+    store.subscribe(lambda record: seen.append(record["id"]))
+    store.append({"id": "a"})
+    other.append_many([{"id": "b"}, {"id": "a"}])
+    store.append({"id": "c"})
+    assert seen == ["a", "b", "c"]
+    assert [record["id"] for record in store] == ["a", "b", "c"]
+    assert store.count() == 3
+    other.refresh()
+    assert other.count() == 3
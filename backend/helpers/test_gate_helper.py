@@ -0,0 +1,54 @@
+import multiprocessing
+
+from helpers.gate_helper import UsedTicketIndex
+
+
+def _admit(path, ticket_id, results):
+    results.put(UsedTicketIndex(path, fsync=False).admit_many([ticket_id], gate="east")[0])
+
+
+def test_second_scan_is_rejected(tmp_path):
+    index = UsedTicketIndex(str(tmp_path / "used.log"), fsync=False)
+    first, second = index.admit_many(["T1", "T1"], gate="north")
+    assert first is None
+    assert second[1] == "north"
+
+
+def test_used_tickets_survive_a_restart(tmp_path):
+    path = str(tmp_path / "used.log")
+    UsedTicketIndex(path, fsync=False).admit_many(["T1"], gate="north")
+    assert UsedTicketIndex(path, fsync=False).get("T1")[1] == "north"
+
+
+def test_admissions_by_another_worker_are_seen(tmp_path):
+    path = str(tmp_path / "used.log")
+    north = UsedTicketIndex(path, fsync=False)
+    south = UsedTicketIndex(path, fsync=False)
+    assert north.admit_many(["T1"], gate="north") == [None]
+    assert south.get("T1")[1] == "north"
+    assert south.admit_many(["T1", "T2"], gate="south")[0][1] == "north"
+    assert north.admit_many(["T2"], gate="north")[0][1] == "south"
+
+
+def test_only_one_process_admits_a_ticket(tmp_path):
+    path = str(tmp_path / "used.log")
+    context = multiprocessing.get_context("fork")
+    results = context.Queue()
+    workers = [context.Process(target=_admit, args=(path, "T1", results)) for _ in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    outcomes = [results.get(timeout=5) for _ in workers]
+    assert outcomes.count(None) == 1
+    with open(path) as f:
+        assert len(f.readlines()) == 1
+
+
+def test_partial_line_from_a_crash_is_dropped(tmp_path):
+    path = tmp_path / "used.log"
+    path.write_bytes(b"T1\t2024-01-01T10:00:00\tnorth\nT2\t2024")
+    index = UsedTicketIndex(str(path), fsync=False)
+    assert index.get("T2") is None
+    index.admit_many(["T3"])
+    assert UsedTicketIndex(str(path), fsync=False).get("T3") is not None
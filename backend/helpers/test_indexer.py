@@ -0,0 +1,38 @@
+import fcntl
+import threading
+
+import pytest
+
+from benchmarks.fakes import FakeEmbeddings, MemoryVectorStore
+from helpers import indexer
+from helpers.embedding_pipeline import EmbeddingPipeline
+
+
+@pytest.fixture
+def pipeline(tmp_path, monkeypatch):
+    monkeypatch.setattr(indexer, "REINDEX_LOCK_PATH", str(tmp_path / "reindex.lock"))
+    return EmbeddingPipeline(checkpoint_directory=str(tmp_path / "checkpoint"))
+
+
+def test_unchanged_data_embeds_nothing(pipeline):
+    store = MemoryVectorStore(FakeEmbeddings())
+    first = indexer.reindex(store, pipeline=pipeline)
+    assert first["added"] and first["embedded"] == len(store.records)
+    calls = store.embeddings.calls
+    second = indexer.reindex(store, pipeline=pipeline)
+    assert second["embedded"] == 0
+    assert store.embeddings.calls == calls
+
+
+def test_reindex_waits_for_another_process(pipeline):
+    store = MemoryVectorStore(FakeEmbeddings())
+    # A separate open file description conflicts like another process would
+    with open(indexer.REINDEX_LOCK_PATH, "a") as held:
+        fcntl.flock(held, fcntl.LOCK_EX)
+        worker = threading.Thread(target=indexer.reindex, args=(store,), kwargs={"pipeline": pipeline})
+        worker.start()
+        worker.join(0.2)
+        assert worker.is_alive() and not store.records
+        fcntl.flock(held, fcntl.LOCK_UN)
+    worker.join(5)
+    assert store.records
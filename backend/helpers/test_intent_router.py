@@ -0,0 +1,44 @@
+import pytest
+
+from helpers.intent_router import GUIDE_LANGUAGE, HOURS, TICKET_PRICE, IntentRouter
+
+
+@pytest.fixture(scope="module")
+def router():
+    return IntentRouter()
+
+
+# Questions the catalog's hours or price table would answer wrongly
+MISROUTED = [
+    "Is the ticket price refundable?",
+    "How much are tickets for the special exhibition?",
+    "How much are tickets for the dinosaur exhibit?",
+    "Is entry free for kids?",
+    "Which exhibits are open on Sunday?",
+    "Is the Renaissance Art gallery closed on Tuesday?",
+    "When does Renaissance Art close?",
+    "Can I cancel my tickets for Saturday?",
+    "¿La entrada es gratis para niños?",
+    "Wann öffnet die Ausstellung am Montag?",
+    "门票可以退款吗？",
+]
+
+ROUTED = [
+    ("What time do you close on Wednesday?", HOURS),
+    ("When does the museum open?", HOURS),
+    ("¿A qué hora abre el museo el sábado?", HOURS),
+    ("How much is a child ticket?", TICKET_PRICE),
+    ("What are your ticket prices?", TICKET_PRICE),
+    ("Combien coûte un billet étudiant ?", TICKET_PRICE),
+    ("Do you have guides who speak Spanish?", GUIDE_LANGUAGE),
+]
+
+
+@pytest.mark.parametrize("question", MISROUTED)
+def test_policy_and_exhibit_questions_fall_through(router, question):
+    assert router.route(question) is None
+
+
+@pytest.mark.parametrize("question,intent", ROUTED)
+def test_catalog_questions_are_routed(router, question, intent):
+    assert router.route(question).intent == intent
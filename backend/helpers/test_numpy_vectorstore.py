@@ -0,0 +1,54 @@
+import multiprocessing
+
+import pytest
+
+from helpers.numpy_vectorstore import NumpyVectorStore, matches
+
+
+def _add(directory, start):
+    store = NumpyVectorStore(directory)
+    ids = [f"doc:{i}" for i in range(start, start + 10)]
+    store.add_embeddings(ids, [[1.0, float(i)] for i in range(start, start + 10)], [{"type": "doc"}] * 10, ids)
+
+
+def test_search_returns_the_nearest_documents_first(tmp_path):
+    store = NumpyVectorStore(str(tmp_path))
+    store.add_embeddings(
+        ["east", "north", "west"], [[1, 0], [0, 1], [-1, 0]],
+        [{"type": "a"}, {"type": "b"}, {"type": "a"}], ["e", "n", "w"],
+    )
+    results = store.similarity_search_with_score_by_vector([1, 0.1], k=2)
+    assert [document.page_content for document, _ in results] == ["east", "north"]
+    assert results[0][1] == pytest.approx(0.995, abs=1e-3)
+    filtered = store.similarity_search_by_vector([-0.2, 1], k=1, filter={"type": "a"})
+    assert [document.page_content for document in filtered] == ["west"]
+
+
+def test_upserts_and_deletes_persist(tmp_path):
+    store = NumpyVectorStore(str(tmp_path))
+    store.add_embeddings(["one", "two"], [[1, 0], [0, 1]], [{}, {}], ["1", "2"])
+    store.add_embeddings(["uno"], [[1, 0]], [{"lang": "es"}], ["1"])
+    store.delete(ids=["2"])
+
+    reopened = NumpyVectorStore(str(tmp_path))
+    assert NumpyVectorStore.exists(str(tmp_path))
+    assert reopened.get() == {"ids": ["1"], "documents": ["uno"], "metadatas": [{"lang": "es"}]}
+
+
+def test_writers_in_several_processes_lose_nothing(tmp_path):
+    context = multiprocessing.get_context("fork")
+    workers = [context.Process(target=_add, args=(str(tmp_path), start)) for start in (0, 10, 20)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    assert len(NumpyVectorStore(str(tmp_path)).get()["ids"]) == 30
+
+
+def test_where_clauses():
+    metadata = {"type": "ticket", "name": "Adult"}
+    assert matches(metadata, {"type": {"$in": ["ticket", "offer"]}})
+    assert matches(metadata, {"$or": [{"type": "hours"}, {"name": {"$ne": "Child"}}]})
+    assert not matches(metadata, {"$and": [{"type": "ticket"}, {"name": {"$nin": ["Adult"]}}]})
+    with pytest.raises(ValueError):
+        matches(metadata, {"type": {"$gt": 1}})
@@ -0,0 +1,40 @@
+from helpers.prompt_budget import PromptBudget, count_tokens
+
+
+def _turns(count, words=20):
+    return [
+        {"role": "user" if i % 2 == 0 else "assistant", "content": " ".join([f"turn{i}"] * words)}
+        for i in range(count)
+    ]
+
+
+def test_history_that_fits_is_sent_unchanged():
+    history = _turns(4)
+    kept, report = PromptBudget(context_window=2000, reserved_output_tokens=0).fit(100, history)
+    assert kept == history
+    assert report["dropped_messages"] == 0
+
+
+def test_oldest_turns_are_dropped_to_fit_the_budget():
+    history = _turns(10)
+    budget = PromptBudget(context_window=200, reserved_output_tokens=0)
+    kept, report = budget.fit(100, history)
+    assert kept == history[-len(kept):]
+    assert report["dropped_messages"] == 10 - len(kept)
+    assert report["history_tokens"] <= report["history_budget"] == 100
+
+
+def test_the_session_store_summary_is_kept_not_resummarized():
+    summary = {"role": "system", "content": "Earlier in this conversation the user asked: when do you open"}
+    history = [summary] + _turns(10)
+    kept, report = PromptBudget(context_window=200, reserved_output_tokens=0).fit(100, history)
+    assert kept[0] == summary
+    assert kept[1:] == history[-(len(kept) - 1):]
+    assert report["summary_tokens"] == count_tokens(summary["content"]) + 4
+    assert report["history_tokens"] <= 100
+
+
+def test_a_summary_over_its_budget_is_dropped():
+    summary = {"role": "system", "content": "question " * 100}
+    kept, _ = PromptBudget(context_window=200, reserved_output_tokens=0, summary_max_tokens=20).fit(100, [summary] + _turns(10))
+    assert all(message["role"] != "system" for message in kept)
@@ -0,0 +1,61 @@
+import sqlite3
+
+import fakeredis
+import pytest
+
+from helpers import session_store
+from helpers.session_store import ASSISTANT, USER, MemorySessionStore, RedisSessionStore, SQLiteSessionStore
+
+
+@pytest.fixture(params=["memory", "sqlite", "redis"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        return MemorySessionStore()
+    if request.param == "sqlite":
+        return SQLiteSessionStore(str(tmp_path / "sessions.sqlite3"))
+    return RedisSessionStore(client=fakeredis.FakeRedis())
+
+
+def test_messages_come_back_in_order(store):
+    store.append("s1", USER, "When do you open?")
+    store.append("s1", ASSISTANT, "At nine.")
+    assert store.get("s1") == ([(USER, "When do you open?"), (ASSISTANT, "At nine.")], "")
+    assert store.get("unknown") == ([], "")
+
+
+def test_long_sessions_drop_oldest_turns_into_the_summary(store, monkeypatch):
+    monkeypatch.setattr(session_store, "MAX_TURNS", 2)
+    for i in range(4):
+        store.append("s1", USER, f"question {i}")
+        store.append("s1", ASSISTANT, f"answer {i}")
+    messages, summary = store.get("s1")
+    assert messages == [(USER, "question 2"), (ASSISTANT, "answer 2"), (USER, "question 3"), (ASSISTANT, "answer 3")]
+    assert summary == "question 0; question 1"
+
+
+def test_clear_forgets_one_session(store):
+    store.append("s1", USER, "hello")
+    store.append("s2", USER, "hi")
+    store.clear("s1")
+    assert store.get("s1") == ([], "")
+    assert store.get("s2")[0] == [(USER, "hi")]
+    store.clear_all()
+    assert store.get("s2") == ([], "")
+    assert store.stats()["sessions"] == 0
+
+
+def test_sqlite_clear_rolls_back_a_failed_delete(tmp_path):
+    store = SQLiteSessionStore(str(tmp_path / "sessions.sqlite3"))
+    store.append("s1", USER, "hello")
+    connection = store._connection()
+    connection.execute(
+        "CREATE TEMP TRIGGER keep_sessions BEFORE DELETE ON chat_sessions "
+        "BEGIN SELECT RAISE(ABORT, 'locked'); END"
+    )
+    for clear in (lambda: store.clear("s1"), store.clear_all):
+        with pytest.raises(sqlite3.IntegrityError):
+            clear()
+        assert not connection.in_transaction
+    connection.execute("DROP TRIGGER keep_sessions")
+    store.append("s1", ASSISTANT, "hi")
+    assert len(store.get("s1")[0]) == 2
@@ -0,0 +1,66 @@
+from datetime import datetime
+
+import pytest
+
+from helpers import ticket_token
+from helpers.ticket_token import (
+    TOKEN_BYTES, InvalidTicketToken, base45_decode, base45_encode, check_price,
+    decode_token, issue_token, parse_visit_date, ref_to_token, token_to_ref,
+)
+
+
+@pytest.fixture(autouse=True)
+def signing_key(monkeypatch):
+    monkeypatch.setenv("TICKET_SIGNING_KEY", "test-key")
+    monkeypatch.setattr(ticket_token, "_key", None)
+    yield
+    ticket_token._key = None
+
+
+def test_base45_matches_rfc_9285():
+    assert base45_encode(b"AB") == "BB8"
+    assert base45_encode(b"Hello!!") == "%69 VD92EX0"
+    assert base45_decode("%69 VD92EX0") == b"Hello!!"
+
+
+def test_token_round_trips_and_fits_a_small_qr_code():
+    issued_at = datetime(2030, 1, 1, 9, 30)
+    token = issue_token("Adult", "2030-01-02", 25.5, issued_at=issued_at, ticket_id=bytes(range(8)))
+    assert len(token) == 42 and len(base45_decode(token)) == TOKEN_BYTES
+    assert decode_token(token) == {
+        "ticket_id": "0001020304050607",
+        "ticket_type": "Adult",
+        "visit_date": "2030-01-02",
+        "generated_at": issued_at.isoformat(),
+        "price": 25.5,
+    }
+    assert ref_to_token(token_to_ref(token)) == token
+
+
+def test_tampered_or_foreign_tokens_are_rejected(monkeypatch):
+    token = issue_token("Adult", "2030-01-02", 20)
+    raw = bytearray(base45_decode(token))
+    raw[-12] ^= 1
+    with pytest.raises(InvalidTicketToken):
+        decode_token(base45_encode(bytes(raw)))
+    with pytest.raises(InvalidTicketToken):
+        decode_token(token[:-3])
+    with pytest.raises(InvalidTicketToken):
+        decode_token("not a token")
+
+    monkeypatch.setenv("TICKET_SIGNING_KEY", "another-key")
+    ticket_token._key = None
+    with pytest.raises(InvalidTicketToken):
+        decode_token(token)
+
+
+@pytest.mark.parametrize("visit_date", ["2150-01-01", "1969-12-31", "tomorrow", None])
+def test_visit_dates_outside_the_token_are_refused(visit_date):
+    with pytest.raises(ValueError):
+        parse_visit_date(visit_date)
+
+
+@pytest.mark.parametrize("price", [-1, 655.36, True, "20"])
+def test_prices_outside_the_token_are_refused(price):
+    with pytest.raises(ValueError):
+        check_price(price)
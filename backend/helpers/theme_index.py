@@ -0,0 +1,368 @@
+"""
+Theme index over free-text feedback answers.
+
+Each answer is matched against the museum's known entities (exhibits and
+their highlights, tour guides, facilities) and split into unigrams and
+bigrams of the remaining words. Every theme found is counted once per
+answer, together with the answer's polarity, in several scopes: overall,
+per exhibit mentioned in the same answer, and per day, ISO week and month.
+
+Counts only grow, so each scope keeps a top-TOP_SIZE list that is updated
+in place; a top-k query sorts at most TOP_SIZE entries. Memory is bounded:
+a scope counts at most THEME_TRACKED_SIZE themes, dropping the least
+mentioned half of its long tail when it overflows, and day scopes older
+than THEME_DAY_RETENTION days are dropped. The top list is exact while a
+scope's distinct themes fit; after that a theme dropped from the tail
+starts counting again from zero. The index lives in memory and is rebuilt
+from the feedback log on start-up.
+"""
+from typing import Dict, List, Tuple
+from datetime import date, timedelta
+import os
+import re
+import threading
+from helpers.museum_catalog import MuseumCatalog, get_catalog
+from helpers.feedback_store import FeedbackStore, get_feedback_store
+from helpers.log_helper import get_logger
+
+logger = get_logger(__name__)
+
+# Longest top-k list a scope can answer
+TOP_SIZE = int(os.getenv("THEME_TOP_SIZE", "50"))
+# Most themes a scope counts before its long tail is pruned
+TRACKED_SIZE = int(os.getenv("THEME_TRACKED_SIZE", "5000"))
+# Days a day scope is kept after the newest feedback day
+DAY_RETENTION = int(os.getenv("THEME_DAY_RETENTION", "90"))
+WINDOWS = ("day", "week", "month")
+
+STOPWORDS = frozenset("""
+a about above after again all also am an and any are as at be because been before being
+but by can could did do does doing don didn during each even ever every few for from get
+got had has have having he her here hers him his how i if in into is it its itself just
+like ll lot lots me more most much my no nor not now of off on once only or other our out
+over own really re s same she should so some such t than that the their them then there
+these they this those through to too under until up us ve very was we were what when where
+which while who whom why will with would you your museum visit visited time day thing things
+bit quite maybe yes
+""".split())
+
+TITLES = frozenset(["dr", "prof", "mr", "mrs", "ms"])
+
+# Everyday words visitors use for the facilities
+FACILITY_ALIASES = {
+    "Cafeteria": ["cafe", "café", "coffee", "food"],
+    "Gift Shop": ["shop", "souvenir"],
+    "Wheelchair Access": ["wheelchair", "accessibility", "ramp"],
+    "Audio Guides": ["audio guide", "audioguide"],
+    "Free Wi-Fi": ["wifi", "wi fi", "internet"],
+    "Cloakroom": ["coat check", "lockers"],
+    "Restrooms": ["restroom", "toilet", "bathroom"],
+}
+
+_word = re.compile(r"\w+")
+_word_or_break = re.compile(r"\w+|[.!?;,:()]")
+
+def _stem(token: str) -> str:
+    # Fold simple plurals so "exhibits" and "exhibit" count together
+    if len(token) > 3 and token.endswith("s") and not token.endswith(("ss", "us", "is")):
+        return token[:-1]
+    return token
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens with simple plurals folded."""
+    return [_stem(token) for token in _word.findall(text.lower().replace("'", ""))]
+
+def _entities(catalog: MuseumCatalog) -> Dict[Tuple[str, ...], Tuple[str, str, str]]:
+    """Phrase (as tokens) -> (theme key, kind, display name)."""
+    phrases = {}
+
+    def add(phrase, key, kind, name):
+        tokens = tuple(tokenize(phrase))
+        if tokens:
+            phrases.setdefault(tokens, (key, kind, name))
+
+    for exhibit in catalog.exhibits:
+        key = f"exhibit:{exhibit['id']}"
+        add(exhibit['name'], key, "exhibit", exhibit['name'])
+        for highlight in exhibit.get('highlights', []):
+            add(highlight, key, "exhibit", exhibit['name'])
+    for guide in catalog.tour_guides:
+        key = f"guide:{guide['id']}"
+        tokens = guide['name'].replace(".", " ").split()
+        names = [token for token in tokens if token.lower() not in TITLES]
+        add(guide['name'], key, "guide", guide['name'])
+        add(" ".join(names), key, "guide", guide['name'])
+        add(names[-1], key, "guide", guide['name'])
+        if len(names) < len(tokens):
+            add(f"{tokens[0]} {names[-1]}", key, "guide", guide['name'])
+    for facility in catalog.museum_info['facilities']:
+        key = f"facility:{facility}"
+        add(facility, key, "facility", facility)
+        for alias in FACILITY_ALIASES.get(facility, []):
+            add(alias, key, "facility", facility)
+    return phrases
+
+def extract_themes(text: str, entities: Dict[Tuple[str, ...], Tuple[str, str, str]], max_phrase: int) -> Dict[str, Tuple[str, str]]:
+    """
+    Find the entities and n-grams in a text.
+
+    Args:
+        text (str): A feedback answer.
+        entities (dict): Entity phrases as built by _entities().
+        max_phrase (int): Token length of the longest entity phrase.
+
+    Returns:
+        dict: theme key -> (kind, display name), each theme once.
+    """
+    # Punctuation splits n-grams, except the dot after a title ("Dr. Chen")
+    tokens = []
+    for token in _word_or_break.findall(text.lower().replace("'", "")):
+        if token[0].isalnum() or token[0] == "_":
+            tokens.append(_stem(token))
+        elif not tokens or tokens[-1] not in TITLES:
+            tokens.append(None)
+    themes = {}
+    words = []
+    i = 0
+    while i < len(tokens):
+        if tokens[i] is None:
+            words.append(None)
+            i += 1
+            continue
+        # Longest entity phrase starting here wins
+        for length in range(min(max_phrase, len(tokens) - i), 0, -1):
+            match = entities.get(tuple(tokens[i:i + length]))
+            if match is not None:
+                themes[match[0]] = (match[1], match[2])
+                words.append(None)
+                i += length
+                break
+        else:
+            token = tokens[i]
+            keep = len(token) > 2 and token not in STOPWORDS and not token.isdigit()
+            words.append(token if keep else None)
+            i += 1
+
+    for j, word in enumerate(words):
+        if word is None:
+            continue
+        themes.setdefault(f"term:{word}", ("term", word))
+        if j + 1 < len(words) and words[j + 1] is not None:
+            phrase = f"{word} {words[j + 1]}"
+            themes.setdefault(f"term:{phrase}", ("term", phrase))
+    return themes
+
+class _TopK:
+    """Counts and polarity sums for one scope, with a top list."""
+
+    __slots__ = ("counts", "polarity", "top", "size", "tracked")
+
+    def __init__(self, size: int, tracked: int = TRACKED_SIZE):
+        self.counts: Dict[str, int] = {}
+        self.polarity: Dict[str, float] = {}
+        self.top: Dict[str, int] = {}
+        self.size = size
+        self.tracked = max(tracked, size)
+
+    def add(self, key: str, polarity: float):
+        count = self.counts[key] = self.counts.get(key, 0) + 1
+        self.polarity[key] = self.polarity.get(key, 0.0) + polarity
+        if len(self.counts) > self.tracked:
+            self._prune()
+        top = self.top
+        if key in top or len(top) < self.size:
+            top[key] = count
+            return
+        # Counts only grow, so a key can only enter by passing the current minimum
+        lowest = min(top, key=top.get)
+        if count > top[lowest]:
+            del top[lowest]
+            top[key] = count
+
+    def _prune(self):
+        # Keep the top list and the most mentioned half of the rest; pruning
+        # half at a time keeps the sort's cost constant per added theme
+        keep = max(self.size, self.tracked // 2)
+        tail = sorted((key for key in self.counts if key not in self.top), key=self.counts.get, reverse=True)
+        for key in tail[keep - len(self.top):]:
+            del self.counts[key]
+            del self.polarity[key]
+
+    def most_common(self, k: int) -> List[Tuple[str, int]]:
+        return sorted(self.top.items(), key=lambda item: (-item[1], item[0]))[:k]
+
+def _windows(day: str) -> List[str]:
+    try:
+        parsed = date.fromisoformat(day)
+    except ValueError:
+        return []
+    year, week, _ = parsed.isocalendar()
+    return [f"day:{day}", f"week:{year}-W{week:02d}", f"month:{day[:7]}"]
+
+def window_scope(window: str, day: str) -> str:
+    """Scope name of the day, ISO week or month containing a date."""
+    return _windows(day)[WINDOWS.index(window)]
+
+class ThemeIndex:
+    """
+    Incremental theme counts for feedback answers.
+
+    Args:
+        top_size (int): Longest top-k list each scope can answer.
+        tracked_size (int): Most themes each scope counts.
+        day_retention (int): Days a day scope is kept after the newest day seen.
+    """
+
+    def __init__(self, top_size: int = TOP_SIZE, tracked_size: int = TRACKED_SIZE, day_retention: int = DAY_RETENTION):
+        self.top_size = top_size
+        self.tracked_size = tracked_size
+        self.day_retention = day_retention
+        self._use_catalog(get_catalog())
+        # Entity key -> (kind, name); a term's name is its key without "term:"
+        self._names: Dict[str, Tuple[str, str]] = {}
+        # scope -> {"entity": _TopK, "term": _TopK}
+        self._scopes: Dict[str, Dict[str, _TopK]] = {}
+        self._latest_day = ""
+        self._answers = 0
+        self._lock = threading.Lock()
+
+    def _use_catalog(self, catalog: MuseumCatalog):
+        # Counts of renamed or removed entities stay under their old keys
+        entities = _entities(catalog)
+        # One attribute, so a concurrent answer never pairs old phrases with a new length
+        self._matcher = (entities, max(len(tokens) for tokens in entities))
+        self._catalog_version = catalog.version
+
+    def _scope(self, name: str) -> Dict[str, _TopK]:
+        scope = self._scopes.get(name)
+        if scope is None:
+            scope = self._scopes[name] = {
+                "entity": _TopK(self.top_size, self.tracked_size),
+                "term": _TopK(self.top_size, self.tracked_size),
+            }
+        return scope
+
+    def _expire_days(self, day: str):
+        # Caller holds self._lock; runs once per new newest day
+        self._latest_day = day
+        cutoff = f"day:{date.fromisoformat(day) - timedelta(days=self.day_retention)}"
+        for name in [name for name in self._scopes if name.startswith("day:") and name < cutoff]:
+            del self._scopes[name]
+
+    def add_text(self, text: str, polarity: float = 0.0, day: str = ""):
+        """
+        Index one answer.
+
+        Args:
+            text (str): The answer text.
+            polarity (float): The answer's sentiment polarity.
+            day (str): Submission date (YYYY-MM-DD) for the time windows.
+        """
+        catalog = get_catalog()
+        if catalog.version != self._catalog_version:
+            # The museum data was reloaded; match against its entities from now on
+            with self._lock:
+                if catalog.version != self._catalog_version:
+                    self._use_catalog(catalog)
+        themes = extract_themes(text, *self._matcher)
+        if not themes:
+            return
+        exhibits = [key for key in themes if key.startswith("exhibit:")]
+        windows = _windows(day)
+        scopes = ["all"] + windows + exhibits
+        with self._lock:
+            self._answers += 1
+            if windows and day > self._latest_day:
+                self._expire_days(day)
+            for key, (kind, name) in themes.items():
+                if kind != "term":
+                    self._names[key] = (kind, name)
+                group = "term" if kind == "term" else "entity"
+                for scope in scopes:
+                    if scope != key:
+                        self._scope(scope)[group].add(key, polarity)
+
+    def add_feedback(self, record: Dict):
+        """Index the free-text answers of a stored feedback record."""
+        day = (record.get('timestamp') or '')[:10]
+        for answer in (record.get('responses') or {}).values():
+            text = answer.get('text') if isinstance(answer, dict) else answer
+            if not isinstance(text, str) or not text.strip():
+                continue
+            sentiment = answer.get('sentiment') if isinstance(answer, dict) else None
+            self.add_text(text, (sentiment or {}).get('polarity', 0.0), day)
+
+    def top(self, k: int = 10, scope: str = "all") -> Dict[str, List[Dict]]:
+        """
+        The k most mentioned entities and terms in a scope.
+
+        Args:
+            k (int): Themes per list, at most the index's top_size.
+            scope (str): "all", "exhibit:<id>", "day:<date>", "week:<year>-W<nn>"
+                or "month:<year>-<mm>".
+
+        Returns:
+            dict: "entities" and "terms" lists with mention counts and
+            average polarity.
+        """
+        with self._lock:
+            lists = self._scopes.get(scope)
+            if lists is None:
+                return {"entities": [], "terms": []}
+            return {
+                "entities": self._describe(lists["entity"], k),
+                "terms": self._describe(lists["term"], k),
+            }
+
+    def _describe(self, counter: _TopK, k: int) -> List[Dict]:
+        return [
+            {
+                "theme": self._names[key][1] if key in self._names else key[len("term:"):],
+                "kind": self._names[key][0] if key in self._names else "term",
+                "key": key,
+                "mentions": count,
+                "average_polarity": counter.polarity[key] / count,
+            }
+            for key, count in counter.most_common(k)
+        ]
+
+    def stats(self) -> Dict:
+        with self._lock:
+            counted = self._scopes.get("all", {})
+            themes = sum(len(counter.counts) for counter in counted.values())
+            return {"answers": self._answers, "themes": themes, "scopes": len(self._scopes)}
+
+def build_theme_index(store: FeedbackStore) -> ThemeIndex:
+    """
+    Index every stored feedback record and keep following the store.
+
+    Args:
+        store (FeedbackStore): The feedback store.
+
+    Returns:
+        ThemeIndex: The populated index.
+    """
+    index = ThemeIndex()
+    with store.writes_paused():
+        for record in store:
+            index.add_feedback(record)
+        store.subscribe(index.add_feedback)
+    logger.info("Built feedback theme index", extra={"fields": index.stats()})
+    return index
+
+_theme_index = None
+_theme_index_lock = threading.Lock()
+
+def get_theme_index() -> ThemeIndex:
+    """
+    Get the process-wide theme index for the shared feedback store.
+
+    Returns:
+        ThemeIndex: The shared index.
+    """
+    global _theme_index
+    if _theme_index is None:
+        with _theme_index_lock:
+            if _theme_index is None:
+                _theme_index = build_theme_index(get_feedback_store())
+    return _theme_index
@@ -0,0 +1,240 @@
+"""
+Compact, signed ticket tokens for QR codes.
+
+A token is a fixed-width binary record signed with HMAC-SHA256 and encoded
+in base45 (RFC 9285), whose alphabet is exactly the QR alphanumeric set:
+
+    version      1 byte
+    ticket id    8 bytes (random)
+    ticket type  1 byte  (index into the catalog's ticket types)
+    visit date   2 bytes (days since 1970-01-01)
+    issued at    4 bytes (unix seconds)
+    price        2 bytes (cents)
+    signature   10 bytes (truncated HMAC-SHA256 of the fields above)
+
+28 bytes encode to 42 characters, which fits a version 2 QR code.
+"""
+from datetime import date, datetime, timedelta
+import base64
+import binascii
+import hashlib
+import hmac
+import os
+import secrets
+import struct
+from helpers.museum_catalog import get_catalog
+
+TOKEN_VERSION = 1
+SIGNATURE_BYTES = 10
+_FIELDS = struct.Struct(">B8sBHIH")
+TOKEN_BYTES = _FIELDS.size + SIGNATURE_BYTES
+
+# Type codes are positions in the catalog's ticket types, so new types must be appended
+UNKNOWN_TICKET_TYPE = 255
+
+KEY_FILE = "db/ticket_signing.key"
+EPOCH = date(1970, 1, 1)
+# Bounds of the 2-byte visit date and price fields
+LATEST_VISIT_DATE = EPOCH + timedelta(days=0xFFFF)
+MAX_PRICE = 0xFFFF / 100
+
+BASE45_ALPHABET = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ $%*+-./:"
+_BASE45_VALUES = {char: value for value, char in enumerate(BASE45_ALPHABET)}
+
+class InvalidTicketToken(ValueError):
+    """Raised when a token is malformed or its signature doesn't match."""
+
+def base45_encode(data: bytes) -> str:
+    """Encode bytes as base45 (RFC 9285)."""
+    chars = []
+    for i in range(0, len(data) - 1, 2):
+        n = data[i] * 256 + data[i + 1]
+        n, c = divmod(n, 45)
+        e, d = divmod(n, 45)
+        chars += (BASE45_ALPHABET[c], BASE45_ALPHABET[d], BASE45_ALPHABET[e])
+    if len(data) % 2:
+        d, c = divmod(data[-1], 45)
+        chars += (BASE45_ALPHABET[c], BASE45_ALPHABET[d])
+    return "".join(chars)
+
+def base45_decode(text: str) -> bytes:
+    """Decode base45 text (RFC 9285), raising InvalidTicketToken on bad input."""
+    try:
+        values = [_BASE45_VALUES[char] for char in text]
+    except KeyError:
+        raise InvalidTicketToken("Invalid character in ticket token")
+    if len(values) % 3 == 1:
+        raise InvalidTicketToken("Invalid ticket token length")
+    out = bytearray()
+    for i in range(0, len(values) - 2, 3):
+        n = values[i] + values[i + 1] * 45 + values[i + 2] * 2025
+        if n > 0xFFFF:
+            raise InvalidTicketToken("Invalid ticket token")
+        out += n.to_bytes(2, "big")
+    if len(values) % 3 == 2:
+        n = values[-2] + values[-1] * 45
+        if n > 0xFF:
+            raise InvalidTicketToken("Invalid ticket token")
+        out.append(n)
+    return bytes(out)
+
+def parse_visit_date(visit_date: str) -> date:
+    """
+    Parse a visit date the token can carry.
+
+    Args:
+        visit_date (str): ISO date (YYYY-MM-DD), optionally followed by a time.
+
+    Returns:
+        date: The visit date.
+
+    Raises:
+        ValueError: If the date isn't ISO formatted or falls outside 1970-2149.
+    """
+    try:
+        parsed = date.fromisoformat(visit_date[:10])
+    except (TypeError, ValueError):
+        raise ValueError("visit_date must be an ISO date (YYYY-MM-DD)")
+    if not EPOCH <= parsed <= LATEST_VISIT_DATE:
+        raise ValueError(f"visit_date must be between {EPOCH.isoformat()} and {LATEST_VISIT_DATE.isoformat()}")
+    return parsed
+
+def check_price(price: float) -> int:
+    """
+    Convert a ticket price to the cents the token carries.
+
+    Args:
+        price (float): Ticket price in dollars.
+
+    Returns:
+        int: The price in cents.
+
+    Raises:
+        ValueError: If the price is negative or above MAX_PRICE.
+    """
+    if isinstance(price, bool) or not isinstance(price, (int, float)) or not 0 <= price <= MAX_PRICE:
+        raise ValueError(f"price must be between 0 and {MAX_PRICE:.2f}")
+    return int(round(price * 100))
+
+def _load_key() -> bytes:
+    key = os.getenv("TICKET_SIGNING_KEY")
+    if key:
+        return key.encode()
+    # Development fallback: a random key kept next to the other local data
+    if os.path.exists(KEY_FILE):
+        with open(KEY_FILE, "rb") as f:
+            return f.read()
+    os.makedirs(os.path.dirname(KEY_FILE), exist_ok=True)
+    key = secrets.token_bytes(32)
+    # Written to a private temp file and linked into place, so a worker that
+    # loses the race reads the winner's complete key
+    tmp_path = f"{KEY_FILE}.{os.getpid()}.{secrets.token_hex(4)}.tmp"
+    with os.fdopen(os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), "wb") as f:
+        f.write(key)
+    try:
+        os.link(tmp_path, KEY_FILE)
+    except FileExistsError:
+        with open(KEY_FILE, "rb") as f:
+            key = f.read()
+    finally:
+        os.remove(tmp_path)
+    return key
+
+_key = None
+
+def _signing_key() -> bytes:
+    global _key
+    if _key is None:
+        _key = _load_key()
+    return _key
+
+def _sign(fields: bytes) -> bytes:
+    return hmac.new(_signing_key(), fields, hashlib.sha256).digest()[:SIGNATURE_BYTES]
+
+def issue_token(ticket_type: str, visit_date: str, price: float, issued_at: datetime = None, ticket_id: bytes = None) -> str:
+    """
+    Create a signed ticket token.
+
+    Args:
+        ticket_type (str): Ticket type name, e.g. "Adult".
+        visit_date (str): Visit date in ISO format (YYYY-MM-DD).
+        price (float): Ticket price.
+        issued_at (datetime): Issue time; defaults to now.
+        ticket_id (bytes): 8-byte ID; random when omitted.
+
+    Returns:
+        str: The base45 token to put in the QR code.
+
+    Raises:
+        ValueError: If the visit date or price doesn't fit the token.
+    """
+    issued_at = issued_at or datetime.now()
+    ticket_id = ticket_id or secrets.token_bytes(8)
+    ticket_types = get_catalog().ticket_types
+    type_code = ticket_types.index(ticket_type) if ticket_type in ticket_types else UNKNOWN_TICKET_TYPE
+    visit_days = (parse_visit_date(visit_date) - EPOCH).days
+    fields = _FIELDS.pack(
+        TOKEN_VERSION,
+        ticket_id,
+        type_code,
+        visit_days,
+        int(issued_at.timestamp()),
+        check_price(price),
+    )
+    return base45_encode(fields + _sign(fields))
+
+def decode_token(token: str) -> dict:
+    """
+    Decode a ticket token and verify its signature.
+
+    Args:
+        token (str): The base45 token read from a QR code.
+
+    Returns:
+        dict: The ticket fields.
+
+    Raises:
+        InvalidTicketToken: If the token is malformed or forged.
+    """
+    raw = base45_decode(token)
+    if len(raw) != TOKEN_BYTES:
+        raise InvalidTicketToken("Invalid ticket token length")
+    fields, signature = raw[:-SIGNATURE_BYTES], raw[-SIGNATURE_BYTES:]
+    if not hmac.compare_digest(signature, _sign(fields)):
+        raise InvalidTicketToken("Invalid ticket signature")
+    version, ticket_id, type_code, visit_days, issued_at, price_cents = _FIELDS.unpack(fields)
+    if version != TOKEN_VERSION:
+        raise InvalidTicketToken("Unsupported ticket token version")
+    ticket_types = get_catalog().ticket_types
+    return {
+        'ticket_id': ticket_id.hex(),
+        'ticket_type': ticket_types[type_code] if type_code < len(ticket_types) else 'Unknown',
+        'visit_date': (EPOCH + timedelta(days=visit_days)).isoformat(),
+        'generated_at': datetime.fromtimestamp(issued_at).isoformat(),
+        'price': price_cents / 100,
+    }
+
+def token_to_ref(token: str) -> str:
+    """
+    Turn a token into a URL-safe reference (base64url of the same bytes).
+
+    Args:
+        token (str): The base45 token.
+
+    Returns:
+        str: A 38-character reference usable in URL paths.
+    """
+    return base64.urlsafe_b64encode(base45_decode(token)).rstrip(b"=").decode()
+
+def ref_to_token(ref: str) -> str:
+    """
+    Turn a URL reference back into its token, without verifying it.
+
+    Raises:
+        InvalidTicketToken: If the reference is not valid base64url.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(ref + "=" * (-len(ref) % 4))
+    except (binascii.Error, ValueError):
+        raise InvalidTicketToken("Invalid ticket reference")
+    return base45_encode(raw)
@@ -1,51 +1,162 @@
 from flask import Flask, request, Response, jsonify
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
-from handlers.response_handler import get_response
-from helpers.qr_helper import generate_ticket_qr, validate_ticket_qr, create_mock_ticket
-from helpers.sentiment_helper import collect_feedback, get_feedback_summary, create_mock_feedback
-from helpers.museum_data import get_all_museum_data
+from handlers.response_handler import get_response, response_cache
+from helpers.chat_helper import ChatHistory
+from helpers.sse_helper import sse_stream
+from helpers.qr_helper import generate_ticket_qr, create_mock_ticket, issue_tickets, get_ticket_price, qr_image_cache, QR_IMAGE_FORMATS, MAX_TICKETS_PER_REQUEST
+from helpers.ticket_token import decode_token, ref_to_token, parse_visit_date, check_price, InvalidTicketToken
+from helpers.gate_helper import validate_scans, get_used_ticket_index, MAX_SCANS_PER_BATCH
+from helpers.sentiment_helper import get_feedback_summary, create_mock_feedback
+from helpers.feedback_aggregates import get_feedback_aggregates
+from helpers.feedback_store import get_feedback_store
+from helpers.feedback_queue import get_feedback_queue, QueueFull, QUEUED
+from helpers.theme_index import get_theme_index, window_scope, TOP_SIZE as THEME_TOP_SIZE, WINDOWS as THEME_WINDOWS
+from helpers.sentiment_service import sentiment_service
+from helpers.museum_catalog import get_catalog, json_default
+from helpers.intent_router import intent_router
+from helpers.admin_auth import check_admin_token
+from helpers.storage_helper import init_vectorstore, reload_vectorstore, reindex_vectorstore, embeddings
+import os
 import uuid
 import json
 from datetime import datetime, timedelta
 
+class CatalogJSONProvider(DefaultJSONProvider):
+    """JSON provider that also serializes the catalog's read-only records."""
+
+    @staticmethod
+    def default(o):
+        try:
+            return json_default(o)
+        except TypeError:
+            return DefaultJSONProvider.default(o)
+
 app = Flask(__name__)
+app.json = CatalogJSONProvider(app)
 # Enable CORS for all routes and origins
 CORS(app, resources={r"/*": {"origins": "*"}})
 
+def warm_up():
+    """
+    Open the vectorstore once so the first chat turn doesn't pay for it.
+
+    Called by the entry points rather than at import: QR rendering workers
+    are spawned processes that re-import this module, and must not open,
+    build or re-index the vectorstore.
+    """
+    init_vectorstore()
+
+def admin_denial():
+    """The error response for a request without the admin token, or None."""
+    denial = check_admin_token(request.headers.get('X-Admin-Token'), os.getenv('ADMIN_TOKEN'))
+    if denial is not None:
+        message, status = denial
+        return jsonify({"error": message}), status
+    return None
+
 @app.route('/api/chat', methods=['POST'])
 def chat():
     data = request.json
     user_input = data.get('message')
-    session_id = data.get('session_id', str(uuid.uuid4()))
+    session_id = data.get('session_id') or str(uuid.uuid4())
     stream = data.get('stream', False)
+    # Clients that send only the new message get the history kept in the session store
     messages = data.get('messages', [])
     
     if not user_input:
         return jsonify({"error": "No message provided"}), 400
     
     if stream:
-        def generate():
-            for chunk in get_response(user_input, session_id=session_id, stream=True, messages=messages):
-                yield f"data: {chunk}\n\n"
+        chunks = get_response(user_input, session_id=session_id, stream=True, messages=messages)
         
-        return Response(generate(), mimetype='text/event-stream', headers={
+        return Response(sse_stream(chunks), mimetype='text/event-stream', headers={
             'Cache-Control': 'no-cache',
-            'Access-Control-Allow-Origin': '*'
+            'Access-Control-Allow-Origin': '*',
+            'Access-Control-Expose-Headers': 'X-Session-Id',
+            'X-Session-Id': session_id
         })
     else:
         response = get_response(user_input, session_id=session_id, stream=False, messages=messages)
         return jsonify({"response": response, "session_id": session_id})
 
+@app.route('/api/chat/session/<session_id>', methods=['DELETE'])
+def clear_chat_session(session_id):
+    """Forget the chat history of a session."""
+    ChatHistory.clear_session(session_id)
+    return jsonify({"success": True})
+
 @app.route('/api/health', methods=['GET'])
 def health_check():
     return jsonify({"status": "healthy"})
 
+@app.route('/api/admin/vectorstore/reload', methods=['POST'])
+def reload_vectorstore_route():
+    """Reload the shared vectorstore from disk."""
+    denied = admin_denial()
+    if denied:
+        return denied
+    
+    reload_vectorstore()
+    
+    return jsonify({"success": True})
+
+@app.route('/api/admin/vectorstore/reindex', methods=['POST'])
+def reindex_vectorstore_route():
+    """Embed and upsert changed museum records into the live vectorstore."""
+    denied = admin_denial()
+    if denied:
+        return denied
+    
+    data = request.get_json(silent=True) or {}
+    result = reindex_vectorstore(
+        reload_data=bool(data.get('reload_data', True)),
+        dry_run=bool(data.get('dry_run', False))
+    )
+    
+    return jsonify({"success": True, **result})
+
+@app.route('/api/admin/stats', methods=['GET'])
+def admin_stats():
+    """Get cache and memory statistics."""
+    denied = admin_denial()
+    if denied:
+        return denied
+    
+    return jsonify({
+        "embedding_cache": embeddings.stats(),
+        "response_cache": response_cache.stats(),
+        "chat_history": ChatHistory.stats(),
+        "gate": get_used_ticket_index().stats(),
+        "qr_cache": qr_image_cache.stats(),
+        "sentiment_cache": sentiment_service.stats(),
+        "feedback_queue": get_feedback_queue().stats(),
+        "intent_router": intent_router.stats()
+    })
+
+@app.route('/api/admin/feedback/aggregates/rebuild', methods=['POST'])
+def rebuild_feedback_aggregates():
+    """Recompute the feedback summary aggregates from the raw feedback log."""
+    denied = admin_denial()
+    if denied:
+        return denied
+    
+    records = get_feedback_aggregates().rebuild()
+    return jsonify({"success": True, "records": records})
+
 # New endpoints for museum ticketing system
 
 @app.route('/api/museum/data', methods=['GET'])
 def get_museum_data():
     """Get all museum data including exhibits, ticket prices, and tour schedules."""
-    return jsonify(get_all_museum_data())
+    catalog = get_catalog()
+    # The catalog version is a content hash, so it doubles as the ETag
+    if request.if_none_match.contains(catalog.version):
+        return Response(status=304, headers={'ETag': f'"{catalog.version}"'})
+    
+    response = Response(catalog.json, mimetype='application/json')
+    response.set_etag(catalog.version)
+    return response
 
 @app.route('/api/museum/tickets', methods=['POST'])
 def create_ticket():
@@ -55,15 +166,60 @@ def create_ticket():
     ticket_type = data.get('ticket_type')
     visit_date = data.get('visit_date')
     num_tickets = data.get('num_tickets', 1)
+    # QR images are served from their URLs unless the client asks for them inline
+    inline_qr = data.get('inline_qr', False)
+    stream = data.get('stream', False) or 'application/x-ndjson' in request.headers.get('Accept', '')
     
     if not all([visitor_name, ticket_type, visit_date]):
         return jsonify({"error": "Missing required fields"}), 400
     
+    if not isinstance(num_tickets, int) or not 1 <= num_tickets <= MAX_TICKETS_PER_REQUEST:
+        return jsonify({"error": f"num_tickets must be between 1 and {MAX_TICKETS_PER_REQUEST}"}), 400
+    
+    # The token has fixed-width date and price fields; reject what won't fit before streaming starts
+    try:
+        parse_visit_date(visit_date)
+        check_price(get_ticket_price(ticket_type))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    # Stream one ticket per line so the first tickets arrive while the rest render
+    if stream:
+        def generate():
+            for ticket in issue_tickets(visitor_name, ticket_type, visit_date, num_tickets, inline_qr):
+                yield json.dumps(ticket) + "\n"
+        
+        return Response(generate(), mimetype='application/x-ndjson')
+    
     # Create mock ticket (in a real system, this would create a real ticket in a database)
-    tickets = create_mock_ticket(visitor_name, ticket_type, visit_date, num_tickets)
+    tickets = create_mock_ticket(visitor_name, ticket_type, visit_date, num_tickets, inline_qr)
     
     return jsonify({"tickets": tickets})
 
+@app.route('/api/museum/tickets/<ticket_ref>/qr.<image_format>', methods=['GET'])
+def ticket_qr_image(ticket_ref, image_format):
+    """Render a ticket's QR code as PNG or SVG."""
+    if image_format not in QR_IMAGE_FORMATS:
+        return jsonify({"error": "Unsupported image format"}), 404
+    
+    # Only genuine tickets get rendered
+    try:
+        token = ref_to_token(ticket_ref)
+        decode_token(token)
+    except InvalidTicketToken:
+        return jsonify({"error": "Ticket not found"}), 404
+    
+    # The image never changes, so clients and proxies may keep it forever
+    headers = {'Cache-Control': 'public, max-age=31536000, immutable'}
+    etag = qr_image_cache.etag(token, image_format)
+    if request.if_none_match.contains(etag):
+        return Response(status=304, headers={**headers, 'ETag': f'"{etag}"'})
+    
+    image, etag = qr_image_cache.get(token, image_format)
+    response = Response(image, mimetype=QR_IMAGE_FORMATS[image_format][1], headers=headers)
+    response.set_etag(etag)
+    return response
+
 @app.route('/api/museum/tickets/validate', methods=['POST'])
 def validate_ticket():
     """Validate a ticket QR code."""
@@ -72,55 +228,122 @@ def validate_ticket():
     
     if not qr_data:
         return jsonify({"error": "No QR data provided"}), 400
+    admit = data.get('admit', False)
+    if not isinstance(admit, bool):
+        return jsonify({"error": "admit must be true or false"}), 400
     
-    # Validate the ticket
-    result = validate_ticket_qr(qr_data)
+    # Validate the ticket, admitting it at the gate when asked to
+    result = validate_scans([qr_data], gate=data.get('gate', ''), admit=admit)[0]
     
     return jsonify(result)
 
+@app.route('/api/museum/tickets/validate/batch', methods=['POST'])
+def validate_ticket_batch():
+    """Validate and admit a batch of gate scans."""
+    data = request.json or {}
+    scans = data.get('scans')
+    
+    if not isinstance(scans, list) or not all(isinstance(scan, str) for scan in scans):
+        return jsonify({"error": "scans must be a list of QR data strings"}), 400
+    if len(scans) > MAX_SCANS_PER_BATCH:
+        return jsonify({"error": f"At most {MAX_SCANS_PER_BATCH} scans per batch"}), 400
+    admit = data.get('admit', True)
+    if not isinstance(admit, bool):
+        return jsonify({"error": "admit must be true or false"}), 400
+    
+    results = validate_scans(scans, gate=data.get('gate', ''), admit=admit)
+    admitted = sum(1 for result in results if result['valid'])
+    
+    return jsonify({
+        "results": results,
+        "admitted": admitted,
+        "rejected": len(results) - admitted
+    })
+
 @app.route('/api/museum/feedback', methods=['POST'])
 def submit_feedback():
     """Submit visitor feedback."""
     data = request.json
     
-    if not data or 'responses' not in data:
+    if not data or not isinstance(data.get('responses'), dict):
         return jsonify({"error": "Invalid feedback data"}), 400
     
-    # Collect and analyze feedback
-    feedback = collect_feedback(data)
+    # Analysis and storage happen in the background
+    try:
+        feedback_id = get_feedback_queue().submit(data)
+    except QueueFull as e:
+        return jsonify({"error": str(e)}), 503, {'Retry-After': '1'}
     
-    return jsonify({"success": True, "feedback": feedback})
+    return jsonify({
+        "success": True,
+        "id": feedback_id,
+        "status": QUEUED,
+        "status_url": f"/api/museum/feedback/{feedback_id}"
+    }), 202
+
+@app.route('/api/museum/feedback/themes', methods=['GET'])
+def feedback_themes():
+    """Get the most mentioned exhibits, facilities, guides and terms in feedback."""
+    k = request.args.get('k', 10, type=int)
+    exhibit = request.args.get('exhibit')
+    window = request.args.get('window')
+    day = request.args.get('date', datetime.now().strftime('%Y-%m-%d'))
+    
+    if not 1 <= k <= THEME_TOP_SIZE:
+        return jsonify({"error": f"k must be between 1 and {THEME_TOP_SIZE}"}), 400
+    
+    scope = 'all'
+    if exhibit:
+        scope = f"exhibit:{exhibit}"
+    elif window:
+        try:
+            datetime.strptime(day, '%Y-%m-%d')
+            scope = window_scope(window, day)
+        except ValueError:
+            return jsonify({"error": f"window must be one of {', '.join(THEME_WINDOWS)} and date YYYY-MM-DD"}), 400
+    
+    index = get_theme_index()
+    # Take in feedback other workers stored since this one last wrote
+    get_feedback_store().refresh()
+    return jsonify({"scope": scope, **index.top(k, scope)})
+
+@app.route('/api/museum/feedback/<feedback_id>', methods=['GET'])
+def feedback_status(feedback_id):
+    """Get the processing status of a feedback submission."""
+    status = get_feedback_queue().status(feedback_id)
+    
+    if status is None:
+        return jsonify({"error": "Unknown feedback ID"}), 404
+    
+    return jsonify({"id": feedback_id, **status})
 
 @app.route('/api/museum/feedback/summary', methods=['GET'])
 def feedback_summary():
-    """Get a summary of all feedback."""
-    summary = get_feedback_summary()
+    """Get a summary of all feedback, optionally limited to a date range."""
+    date_from = request.args.get('from')
+    date_to = request.args.get('to')
+    
+    try:
+        for value in (date_from, date_to):
+            if value is not None:
+                datetime.strptime(value, '%Y-%m-%d')
+    except ValueError:
+        return jsonify({"error": "from and to must be dates in YYYY-MM-DD format"}), 400
+    
+    summary = get_feedback_summary(date_from, date_to)
     return jsonify(summary)
 
 @app.route('/api/museum/tours', methods=['GET'])
 def get_tours():
     """Get available tour guides and schedules."""
-    museum_data = get_all_museum_data()
+    catalog = get_catalog()
     
-    # Get current day of week
+    # Guides available today, precomputed per day of week
     current_day = datetime.now().strftime('%A')
     
-    # Filter guides available today
-    available_guides = []
-    for guide in museum_data['tour_guides']:
-        if current_day in guide['availability']:
-            available_guides.append({
-                'id': guide['id'],
-                'name': guide['name'],
-                'specialties': guide['specialties'],
-                'languages': guide['languages'],
-                'availability': guide['availability'][current_day],
-                'rating': guide['rating']
-            })
-    
     return jsonify({
-        'tour_types': museum_data['tour_types'],
-        'available_guides': available_guides
+        'tour_types': catalog.tour_types,
+        'available_guides': catalog.guide_schedule(current_day)
     })
 
 @app.route('/api/museum/tours/book', methods=['POST'])
@@ -158,4 +381,5 @@ def book_tour():
     })
 
 if __name__ == '__main__':
+    warm_up()
     app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
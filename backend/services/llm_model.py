@@ -1,7 +1,146 @@
 from langchain_groq import ChatGroq
+import asyncio
+import groq
+import hashlib
+import httpx
+import math
+import os
+import threading
+import time
+
+# Bounded connection pool shared by each long-lived Groq client
+MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "20"))
+MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("LLM_MAX_KEEPALIVE_CONNECTIONS", "10"))
+KEEPALIVE_EXPIRY = float(os.getenv("LLM_KEEPALIVE_EXPIRY", "60"))
+REQUEST_TIMEOUT = float(os.getenv("LLM_REQUEST_TIMEOUT", "60"))
+# Seconds a client replaced by a rotated key stays open for turns still using it
+RETIRED_CLIENT_GRACE = float(os.getenv("LLM_RETIRED_CLIENT_GRACE", "600"))
+
+# (model_name, temperature, key fingerprint) -> (ChatGroq, httpx.Client, httpx.AsyncClient)
+_models = {}
+_chains = {}
+_registry_lock = threading.Lock()
+# (retired_at, client) waiting to be closed. Sync clients are closed from any
+# thread; async ones only from the event loop, since their connections belong to it
+_retired_clients = []
+_retired_async_clients = []
+
+def _key_fingerprint(api_key: str) -> str:
+    # Keeps the key itself out of the registry keys
+    return hashlib.sha256(api_key.encode()).hexdigest()[:16]
+
+def _pool_limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=MAX_CONNECTIONS,
+        max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=KEEPALIVE_EXPIRY,
+    )
+
+def _build_llm(model_name: str, temperature: float, api_key: str):
+    # GROQ_API_BASE points the clients at a proxy or a local fake server
+    base_url = os.getenv("GROQ_API_BASE")
+    http_client = httpx.Client(limits=_pool_limits(), timeout=REQUEST_TIMEOUT)
+    async_http_client = httpx.AsyncClient(limits=_pool_limits(), timeout=REQUEST_TIMEOUT)
+    client = groq.Groq(api_key=api_key, base_url=base_url, http_client=http_client)
+    async_client = groq.AsyncGroq(api_key=api_key, base_url=base_url, http_client=async_http_client)
+    llm = ChatGroq(
+        model=model_name,
+        temperature=temperature,
+        api_key=api_key,
+        client=client.chat.completions,
+        async_client=async_client.chat.completions,
+    )
+    return llm, http_client, async_http_client
+
+def _retire(entries, retired_at: float):
+    # Caller holds _registry_lock
+    for _, http_client, async_http_client in entries:
+        _retired_clients.append((retired_at, http_client))
+        _retired_async_clients.append((retired_at, async_http_client))
+
+def _due(retired: list, until: float) -> list:
+    # Caller holds _registry_lock; removes and returns the clients retired before until
+    due = [client for retired_at, client in retired if retired_at <= until]
+    retired[:] = [(retired_at, client) for retired_at, client in retired if retired_at > until]
+    return due
+
+def _close_retired():
+    with _registry_lock:
+        due = _due(_retired_clients, time.monotonic() - RETIRED_CLIENT_GRACE)
+    for http_client in due:
+        http_client.close()
+
+async def aclose_retired(everything: bool = False):
+    """
+    Close the async HTTP clients of retired models, from the event loop
+    that served their turns.
+
+    Args:
+        everything (bool): Close them all, not only those past the grace period.
+    """
+    if not _retired_async_clients:
+        return
+    with _registry_lock:
+        due = _due(_retired_async_clients, math.inf if everything else time.monotonic() - RETIRED_CLIENT_GRACE)
+    for async_http_client in due:
+        await async_http_client.aclose()
 
 def get_llm_model(model_name: str = "llama3-8b-8192", temperature: float = 0.5, api_key: str = None) -> ChatGroq:
+    """
+    Get a long-lived ChatGroq client from the model registry.
+
+    Clients are keyed by (model_name, temperature, API key) and keep their
+    HTTP connections alive, so chat turns reuse an already open connection.
+    A rotated GROQ_API_KEY gets a new client; the old one is dropped from
+    the registry and closed once RETIRED_CLIENT_GRACE has passed, leaving
+    turns still streaming from it time to finish.
+    """
     if not api_key:
         raise ValueError("Groq API key is required.")
 
-    return ChatGroq(model=model_name, temperature=temperature, api_key=api_key)
+    if _retired_clients:
+        _close_retired()
+    key = (model_name, temperature, _key_fingerprint(api_key))
+    entry = _models.get(key)
+    if entry is None:
+        with _registry_lock:
+            entry = _models.get(key)
+            if entry is None:
+                stale = [k for k in _models if k[:2] == key[:2]]
+                _retire([_models.pop(k) for k in stale], time.monotonic())
+                entry = _models[key] = _build_llm(model_name, temperature, api_key)
+    return entry[0]
+
+def get_chain(prompt, model_name: str = "llama3-8b-8192", temperature: float = 0.5, api_key: str = None):
+    """
+    Get the cached `prompt | llm` chain for a prompt and model.
+
+    The prompt should be long-lived (see ChatHelper.get_prompt), since the
+    cache keeps it for the life of the process.
+    """
+    key = (id(prompt), model_name, temperature, _key_fingerprint(api_key or ""))
+    entry = _chains.get(key)
+    if entry is None or entry[0] is not prompt:
+        llm = get_llm_model(model_name=model_name, temperature=temperature, api_key=api_key)
+        entry = (prompt, prompt | llm)
+        with _registry_lock:
+            _chains[key] = entry
+    return entry[1]
+
+def clear_registry():
+    """
+    Drop every cached client and chain.
+
+    Sync connection pools are closed now; async ones are closed by the next
+    aclose_retired() on the event loop.
+    """
+    with _registry_lock:
+        _retire(_models.values(), -math.inf)
+        _models.clear()
+        _chains.clear()
+    _close_retired()
+
+async def shutdown_llm_clients():
+    """Close every client's connection pool; for the ASGI app's shutdown."""
+    clear_registry()
+    await aclose_retired(everything=True)
@@ -0,0 +1,44 @@
+import asyncio
+
+import pytest
+
+from services import llm_model
+
+
+@pytest.fixture(autouse=True)
+def registry():
+    yield
+    asyncio.run(llm_model.shutdown_llm_clients())
+
+
+def _clients(llm):
+    return llm.client._client._client, llm.async_client._client._client
+
+
+def test_clients_are_reused_per_key():
+    first = llm_model.get_llm_model(api_key="key-1")
+    assert llm_model.get_llm_model(api_key="key-1") is first
+
+
+def test_rotated_key_retires_the_old_clients_after_the_grace_period(monkeypatch):
+    old = llm_model.get_llm_model(api_key="key-1")
+    http_client, async_http_client = _clients(old)
+    assert llm_model.get_llm_model(api_key="key-2") is not old
+
+    # Still inside the grace period: turns streaming from the old client keep it
+    llm_model.get_llm_model(api_key="key-2")
+    asyncio.run(llm_model.aclose_retired())
+    assert not http_client.is_closed and not async_http_client.is_closed
+
+    monkeypatch.setattr(llm_model, "RETIRED_CLIENT_GRACE", 0)
+    llm_model.get_llm_model(api_key="key-2")
+    assert http_client.is_closed and not async_http_client.is_closed
+    asyncio.run(llm_model.aclose_retired())
+    assert async_http_client.is_closed
+
+
+def test_shutdown_closes_every_client():
+    http_client, async_http_client = _clients(llm_model.get_llm_model(api_key="key-1"))
+    asyncio.run(llm_model.shutdown_llm_clients())
+    assert http_client.is_closed and async_http_client.is_closed
+    assert not llm_model._retired_clients and not llm_model._retired_async_clients
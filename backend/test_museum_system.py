@@ -4,6 +4,7 @@ This script tests the main functionality of the system.
 """
 import requests
 import json
+import time
 from datetime import datetime, timedelta
 import base64
 from io import BytesIO
@@ -58,10 +59,10 @@ def test_create_ticket():
         print(f"Created {len(result['tickets'])} tickets")
         
         # Save the first ticket QR code as an image
-        if result['tickets'] and 'qr_code' in result['tickets'][0]:
-            qr_data = result['tickets'][0]['qr_code']
-            img_data = base64.b64decode(qr_data)
-            img = Image.open(BytesIO(img_data))
+        if result['tickets'] and 'qr_url' in result['tickets'][0]:
+            qr_response = requests.get(f"{BASE_URL}{result['tickets'][0]['qr_url']}")
+            print(f"QR image: {qr_response.status_code}, ETag {qr_response.headers.get('ETag')}")
+            img = Image.open(BytesIO(qr_response.content))
             img.save("test_ticket_qr.png")
             print("Saved QR code as test_ticket_qr.png")
     else:
@@ -90,13 +91,7 @@ def test_validate_ticket():
         
         # Now validate the ticket
         validate_data = {
-            "qr_data": json.dumps({
-                "ticket_id": ticket['ticket_id'],
-                "visitor_name": ticket['visitor_name'],
-                "ticket_type": ticket['ticket_type'],
-                "visit_date": ticket['visit_date'],
-                "generated_at": ticket['generated_at']
-            })
+            "qr_data": ticket['qr_data']
         }
         
         validate_response = requests.post(f"{BASE_URL}/api/museum/tickets/validate", json=validate_data)
@@ -176,9 +171,18 @@ def test_feedback():
     response = requests.post(f"{BASE_URL}/api/museum/feedback", json=feedback_data)
     print(f"Status: {response.status_code}")
     
-    if response.status_code == 200:
+    if response.status_code == 202:
         print("Feedback submitted successfully")
         
+        # Wait for the background worker to analyze and store it
+        status_url = f"{BASE_URL}{response.json()['status_url']}"
+        for _ in range(20):
+            status = requests.get(status_url).json()
+            if status['status'] in ('stored', 'failed'):
+                break
+            time.sleep(0.1)
+        print(f"Feedback status: {status}")
+        
         # Get feedback summary
         summary_response = requests.get(f"{BASE_URL}/api/museum/feedback/summary")
         print(f"Summary Status: {summary_response.status_code}")
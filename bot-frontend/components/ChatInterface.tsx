@@ -265,11 +265,9 @@ export default function ChatInterface({
       const currentConversation = updatedConversations.find(c => c.id === conversation.id);
       if (!currentConversation) throw new Error('Conversation not found');
 
-      const response = await sendMessage(
-        message, 
-        currentConversation.sessionId || null,
-        currentConversation.messages
-      );
+      // Random, so two visitors starting a chat in the same millisecond never share history
+      const sessionId = currentConversation.sessionId || `session-${crypto.randomUUID()}`;
+      const response = await sendMessage(message, sessionId);
 
       if (!response.ok) throw new Error(`Server responded with ${response.status}`);
 
@@ -289,45 +287,61 @@ export default function ChatInterface({
             ? { 
                 ...c, 
                 messages: [...c.messages, tempAiMessage],
-                sessionId: c.sessionId || `session-${Date.now()}`
+                sessionId
               } 
             : c
         )
       );
 
       let accumulatedContent = '';
+      let buffered = '';
+      let streamEnded = false;
       const decoder = new TextDecoder();
 
-      while (true) {
+      while (!streamEnded) {
         const { done, value } = await reader.read();
         if (done) break;
 
-        const chunk = decoder.decode(value, { stream: true });
-        const lines = chunk.split('\n\n');
-        
-        for (const line of lines) {
-          if (line.startsWith('data: ')) {
-            const data = line.substring(6);
-            if (data) {
-              accumulatedContent += data;
-              setStreamedResponse(accumulatedContent);
-              
-              setConversations(prev => 
-                prev.map(c => 
-                  c.id === conversation.id 
-                    ? { 
-                        ...c, 
-                        messages: c.messages.map(m => 
-                          m.id === tempAiMessage.id 
-                            ? { ...m, content: accumulatedContent } 
-                            : m
-                        ) 
-                      } 
-                    : c
-                )
-              );
+        // Frames can span reads, so only parse complete ones (terminated by a blank line)
+        buffered += decoder.decode(value, { stream: true });
+        const frames = buffered.split('\n\n');
+        buffered = frames.pop() ?? '';
+
+        for (const frame of frames) {
+          let event = 'message';
+          const dataLines: string[] = [];
+          for (const line of frame.split('\n')) {
+            if (line.startsWith('event:')) {
+              event = line.slice(6).trim();
+            } else if (line.startsWith('data:')) {
+              dataLines.push(line.slice(line.startsWith('data: ') ? 6 : 5));
             }
           }
+
+          if (event === 'end') {
+            streamEnded = true;
+            break;
+          }
+          if (dataLines.length === 0) continue;
+
+          // Multi-line chunks arrive as several data: lines joined by newlines
+          accumulatedContent += dataLines.join('\n');
+          setStreamedResponse(accumulatedContent);
+          
+          setConversations(prev => 
+            prev.map(c => 
+              c.id === conversation.id 
+                ? { 
+                    ...c, 
+                    messages: c.messages.map(m => 
+                      m.id === tempAiMessage.id 
+                        ? { ...m, content: accumulatedContent } 
+                        : m
+                    ) 
+                  } 
+                : c
+            )
+          );
         }
       }
 
@@ -1,17 +1,9 @@
 import '@/utils/polyfills';
 
-interface Message {
-  id: number;
-  content: string;
-  role: 'user' | 'assistant';
-  timestamp: Date;
-}
-
 interface ChatRequest {
   message: string;
-  session_id?: string;
+  session_id: string;
   stream: boolean;
-  messages: { role: string; content: string }[];
 }
 
 const API_URL = 'http://localhost:5000';
@@ -25,22 +17,15 @@ const mockResponses = [
   "Backend connection failed. I'm providing a simulated response since I can't reach the server."
 ];
 
+// Only the new message is sent; the backend keeps the history for the session
 export const sendMessage = async (
   message: string, 
-  sessionId: string | null = null,
-  messages: Message[] = []
+  sessionId: string
 ): Promise<Response> => {
-  // Convert our frontend message format to the backend format
-  const messageHistory = messages.map(msg => ({
-    role: msg.role,
-    content: msg.content
-  }));
-
   const payload: ChatRequest = {
     message,
-    session_id: sessionId || undefined,
-    stream: true,
-    messages: messageHistory
+    session_id: sessionId,
+    stream: true
   };
 
   try {
@@ -65,7 +50,7 @@ export const sendMessage = async (
       start(controller) {
         // Add a small delay to simulate network latency
         setTimeout(() => {
-          controller.enqueue(encoder.encode(`data: ${mockResponse}\n\n`));
+          controller.enqueue(encoder.encode(`data: ${mockResponse}\n\nevent: end\ndata: [DONE]\n\n`));
           controller.close();
         }, 500);
       }